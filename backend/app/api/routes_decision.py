@@ -10,25 +10,139 @@ Endpoints:
     1. Grid Capacity (GNN predicted headroom or manual override).
     2. Physical Safety (Thermal limits).
     3. Policy Rules (Battery SOC, Ramp rates).
+  - **POST /decision/batch**: Evaluates many candidate shifts against one thermal snapshot,
+    persisting all of them in one transaction. Results keep request order.
+  - **GET /decision/frontier**: Read-only feasibility frontier (max safe export/import per
+    ramp rate and horizon) precomputed by the tick loop from the current state.
+  - **GET /decision/metrics**: Planner counters (plan cache hits/misses, frontier hits,
+    surrogate hit/fallback rates, ...) and decision pool queue wait / execution times.
 
 Contract:
   - **Headroom Source**: If `grid_headroom_kw` is provided, it OVERRIDES the GNN.
     Otherwise, the GNN is queried automatically.
   - **Response**: Returns `DecisionResponse` with `status="APPROVED"` or `"BLOCKED"`,
     along with a structured `trace` explaining the decision chain.
+  - **Trace Level**: `trace_level=final|summary|full` selects how many planner candidate
+    events are returned (deployment default: `TRACE_LEVEL` env).
+  - **Deadline**: `deadline_ms` bounds planning time from request arrival (queue wait
+    included). When it expires the best candidate proven feasible so far is returned and
+    `prediction_debug.planner_partial` is 1.0, with the remaining search bracket width in
+    `search_bracket_kw`. Thermal limits are never relaxed, only the search is cut short.
+  - **Confidence**: `confidence` is the probability, over a Monte Carlo ensemble of perturbed
+    twins (`ENSEMBLE_SIZE`, default 256; 0 falls back to a heuristic), that the approved plan
+    keeps the rack under T_max; `ensemble` carries its percentile temperature bands.
+  - **Execution**: Decisions run on a bounded worker pool (`DECISION_WORKERS`), never on the
+    event loop. When `DECISION_QUEUE_DEPTH` requests are already waiting, the API answers
+    503 with `Retry-After`.
 """
 from __future__ import annotations
 
+import time
+
 from fastapi import APIRouter, Query, HTTPException
-from typing import Optional, List
+from typing import Any, Dict, Optional, List, Tuple
 from datetime import datetime
 from sqlmodel import Session, select
-from app.deps import get_twin_service
-from app.models.domain import DecisionResponse, DecisionLogResponse, DecisionLogEntry
+from app.deps import get_decision_executor, get_twin_service
+from app.models.domain import (
+    DecisionBatchRequest,
+    DecisionBatchResponse,
+    DecisionResponse,
+    DecisionLogResponse,
+    DecisionLogEntry,
+    RuleStatus,
+    SeverityLevel,
+)
 from app.models.db import engine, DecisionRecord
+from app.services.decision_executor import DecisionQueueFull
 
 router = APIRouter()
 
+
+def _resolve_headroom(svc, P_site_kw: float, grid_headroom_kw: Optional[float]) -> Tuple[float, str]:
+    """
+    Returns (grid_headroom_kw, source) where source is MANUAL, GNN or FALLBACK.
+    """
+    if grid_headroom_kw is not None:
+        return float(grid_headroom_kw), "MANUAL"
+    try:
+        # Check if GNN is available
+        if svc.gnn and svc.gnn.is_ready():
+            # Predict safe shift at DC bus (default 18)
+            # We assume DC bus is 18 for this topology
+            return float(svc.gnn.predict_safe_shift_kw(
+                target_bus_label=18,
+                dc_bus_label=18,
+                dc_p_kw=P_site_kw
+            )), "GNN"
+        return 1500.0, "FALLBACK"
+    except Exception as e:
+        print(f"[WARN] GNN prediction failed in route: {e}")
+        return 1500.0, "FALLBACK"
+
+
+def _headroom_source_event(out: Dict[str, Any], headroom_kw: float, source: str) -> Dict[str, Any]:
+    return {
+        "ts": datetime.now().isoformat(),
+        "component": "API",
+        "rule_id": "HEADROOM_SOURCE",
+        "status": RuleStatus.INFO.value,
+        "severity": SeverityLevel.LOW.value,
+        "message": f"Headroom determined by {source}",
+        "value": float(headroom_kw),
+        "threshold": None,
+        "phase": "final",
+        "decision_id": out.get("decision_id"),
+    }
+
+
+async def _run_decision(fn, *args, **kwargs):
+    """
+    Runs a blocking decision function on the decision pool (503 when saturated).
+    """
+    try:
+        return await get_decision_executor().submit(fn, *args, **kwargs)
+    except DecisionQueueFull as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Decision queue full",
+            headers={"Retry-After": str(e.retry_after_s)},
+        )
+
+
+def _decide_latest(svc, P_site_kw: float, grid_headroom_kw: Optional[float], **kwargs) -> Dict[str, Any]:
+    # 1. Determine Headroom Source
+    grid_headroom_kw, headroom_source = _resolve_headroom(svc, P_site_kw, grid_headroom_kw)
+
+    out = svc.decide(P_site_kw=P_site_kw, grid_headroom_kw=float(grid_headroom_kw), **kwargs)
+
+    # Inject traceability: record where the headroom came from as a trace event.
+    if "trace" in out:
+        out["trace"].append(_headroom_source_event(out, grid_headroom_kw, headroom_source))
+    return out
+
+
+def _decide_batch(svc, body: DecisionBatchRequest) -> Dict[str, Any]:
+    resolved: Dict[float, Tuple[float, str]] = {}
+    requests: List[Dict[str, Any]] = []
+    sources: List[Tuple[float, str]] = []
+    for item in body.items:
+        if item.grid_headroom_kw is not None:
+            headroom = (float(item.grid_headroom_kw), "MANUAL")
+        else:
+            if item.P_site_kw not in resolved:
+                resolved[item.P_site_kw] = _resolve_headroom(svc, item.P_site_kw, None)
+            headroom = resolved[item.P_site_kw]
+        sources.append(headroom)
+        requests.append({**item.model_dump(), "grid_headroom_kw": headroom[0]})
+
+    result = svc.decide_batch(requests, trace_level=body.trace_level)
+
+    for out, (headroom_kw, source) in zip(result["items"], sources):
+        out["trace"].append(_headroom_source_event(out, headroom_kw, source))
+    return result
+
+
 @router.get("/latest", response_model=DecisionResponse)
 async def decision_latest(
     deltaP_request_kw: float = Query(
@@ -42,6 +156,17 @@ async def decision_latest(
     horizon_s: int = Query(30, ge=10, le=300, description="Optimization horizon (seconds)"),
     dt_s: int = Query(1, ge=1, le=10, description="Time step (seconds)"),
     ramp_rate_kw_per_s: float = Query(50.0, ge=1.0, le=1000.0, description="Max ramp rate (kW/s)"),
+    trace_level: Optional[str] = Query(
+        None,
+        pattern="^(final|summary|full)$",
+        description="Planner trace verbosity (defaults to TRACE_LEVEL env, else summary)",
+    ),
+    deadline_ms: Optional[int] = Query(
+        None,
+        ge=1,
+        le=60000,
+        description="Planning latency budget (ms); past it the best proven-feasible plan so far is returned",
+    ),
 ) -> DecisionResponse:
     # 0. Safety Check for NaN/Inf (Pydantic might allow Inf by default for floats)
     import math
@@ -51,72 +176,57 @@ async def decision_latest(
     if grid_headroom_kw is not None and (math.isnan(grid_headroom_kw) or math.isinf(grid_headroom_kw)):
         raise HTTPException(status_code=422, detail="Invalid value for grid_headroom_kw")
 
-    svc = get_twin_service()
-    
-    # 1. Determine Headroom Source
-    headroom_source = "MANUAL"
-    if grid_headroom_kw is None:
-        headroom_source = "GNN"
-        try:
-            # Check if GNN is available
-            if svc.gnn and svc.gnn.is_ready():
-                # Predict safe shift at DC bus (default 18)
-                # We assume DC bus is 18 for this topology
-                grid_headroom_kw = svc.gnn.predict_safe_shift_kw(
-                    target_bus_label=18,
-                    dc_bus_label=18,
-                    dc_p_kw=P_site_kw
-                )
-            else:
-                 headroom_source = "FALLBACK"
-                 grid_headroom_kw = 1500.0
-        except Exception as e:
-            print(f"[WARN] GNN prediction failed in route: {e}")
-            headroom_source = "FALLBACK"
-            grid_headroom_kw = 1500.0
-
-    out = svc.decide(
-        deltaP_request_kw=deltaP_request_kw,
+    # Counted from arrival, so time spent waiting for a worker is part of the budget.
+    deadline = time.perf_counter() + deadline_ms / 1000.0 if deadline_ms is not None else None
+    out = await _run_decision(
+        _decide_latest,
+        get_twin_service(),
         P_site_kw=P_site_kw,
-        grid_headroom_kw=float(grid_headroom_kw),
+        grid_headroom_kw=grid_headroom_kw,
+        deltaP_request_kw=deltaP_request_kw,
         horizon_s=horizon_s,
         dt_s=dt_s,
         ramp_rate_kw_per_s=ramp_rate_kw_per_s,
+        trace_level=trace_level,
+        deadline=deadline,
     )
-    
-    # Inject traceability
-    # 'trace' is a list of dicts. We can add a specialized event or add fields to the top-level response?
-    # DecisionResponse is strict. The user said: result.decision_trace["grid_headroom_source"] = ...
-    # 'out' is a dict that matches DecisionResponse (or close to it).
-    # DecisionResponse definition in domain.py might not have arbitrary dict 'decision_trace'.
-    # It has 'trace': List[DecisionTraceEvent].
-    # But wait, logic suggests adding "trace visibility".
-    # I can add a synthetic trace event to 'trace' list?
-    # Or rely on 'debug' / 'meta' field if it exists?
-    # Let's verify 'DecisionResponse' schema first? 
-    # Actually, the user code is pseudo-code for `result`.
-    # `out` is returned as `DecisionResponse(**out)`.
-    # I will add a trace event to `out["trace"]` list.
-    
-    from app.models.domain import DecisionTraceEvent, RuleStatus, SeverityLevel, ComponentType
-    from datetime import datetime
-    import uuid
+    return DecisionResponse(**out)
 
-    if "trace" in out:
-        out["trace"].append({
-            "ts": datetime.now().isoformat(),
-            "component": "API",
-            "rule_id": "HEADROOM_SOURCE",
-            "status": RuleStatus.INFO.value,
-            "severity": SeverityLevel.LOW.value,
-            "message": f"Headroom determined by {headroom_source}",
-            "value": float(grid_headroom_kw),
-            "threshold": None,
-            "phase": "final",
-            "decision_id": out.get("decision_id")
-        })
 
-    return DecisionResponse(**out)
+@router.post("/batch", response_model=DecisionBatchResponse)
+async def decision_batch(body: DecisionBatchRequest) -> DecisionBatchResponse:
+    """
+    Evaluates a list of candidate load shifts against a single thermal snapshot.
+    Headroom is resolved once per distinct site load when not provided.
+    """
+    result = await _run_decision(_decide_batch, get_twin_service(), body)
+    return DecisionBatchResponse(**result)
+
+
+@router.get("/frontier")
+async def decision_frontier() -> Dict[str, Any]:
+    """
+    Max safe export/import magnitudes (kW), rows = ramp rates, columns = horizons.
+    Values are hints computed for `state` and `P_site_kw`; decisions always re-verify.
+    """
+    svc = get_twin_service()
+    frontier = svc.get_frontier()
+    if frontier is None:
+        raise HTTPException(status_code=503, detail="Feasibility frontier not computed yet")
+    return {**frontier, "ts": datetime.now().isoformat(), "computed_at": frontier["ts"]}
+
+
+@router.get("/metrics")
+async def decision_metrics() -> Dict[str, Any]:
+    """
+    Planner performance counters (read-only).
+    """
+    svc = get_twin_service()
+    return {
+        "ts": datetime.now().isoformat(),
+        **svc.get_planner_metrics(),
+        "executor": get_decision_executor().stats(),
+    }
 
 
 @router.get("/recent", response_model=DecisionLogResponse)
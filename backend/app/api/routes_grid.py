@@ -65,7 +65,7 @@ async def grid_predict(
     # We use get_trace for now as a proxy, or reuse get_timeseries
     # Ideally digital twin should have a lightweight "current_state"
     # Using get_timeseries(window=1) is an efficient way to get "now"
-    latest_series = twin.get_timeseries(window_s=5, mode="live")
+    latest_series = twin.get_timeseries(window_s=5, mode="live", max_points=1)
     
     if not latest_series:
         raise HTTPException(status_code=503, detail="No telemetry available")
@@ -0,0 +1,88 @@
+"""
+routes_sim.py
+
+Purpose:
+  What-if simulation endpoints that run the digital twin offline, away from
+  the live 1 Hz tick loop.
+
+Endpoints:
+  - **POST /sim/fastforward**: Clones the current twin (thermal state, tick RNG, demo
+    scenario) and simulates `duration_s` of ticks back to back, without sleeping.
+    Streams downsampled telemetry as NDJSON, one JSON object per line per
+    `sample_every_s` window.
+
+Contract:
+  - The live twin is never modified; the clone is discarded when the stream ends.
+  - `scenario_id` starts that demo scenario at t=0 on the clone (e.g. a heat wave
+    ahead of time); without it a running scenario is cloned at its current time.
+  - The simulation runs on a worker thread as the client reads, so a slow reader
+    throttles the run instead of buffering it.
+  - Runs are pure-Python loops holding the GIL: a request may run at most
+    FASTFORWARD_MAX_TICKS ticks (422 beyond), and at most SIM_FASTFORWARD_RUNS
+    (default 2) run at once (503 with Retry-After beyond), so what-if runs
+    cannot starve the decision workers and the live streams.
+"""
+from __future__ import annotations
+
+import json
+import weakref
+from typing import Iterator
+
+from fastapi import APIRouter, HTTPException
+from starlette.responses import StreamingResponse
+
+from app.deps import get_sim_run_slots, get_twin_service
+from app.models.domain import FastForwardRequest
+
+router = APIRouter()
+
+# Upper bound on streamed points per request.
+FASTFORWARD_MAX_POINTS = 100_000
+# Upper bound on simulated ticks per request (a week at 1 s ticks, a few seconds of CPU).
+FASTFORWARD_MAX_TICKS = 604_800
+# Retry-After (s) when every run slot is busy.
+FASTFORWARD_RETRY_AFTER_S = 5
+
+
+@router.post("/fastforward")
+async def sim_fastforward(body: FastForwardRequest) -> StreamingResponse:
+    svc = get_twin_service()
+    if body.scenario_id is not None and body.scenario_id not in {s["id"] for s in svc.list_demo_scenarios()}:
+        raise HTTPException(status_code=400, detail="Unknown scenario")
+    if body.duration_s / max(body.sample_every_s, body.dt_s) > FASTFORWARD_MAX_POINTS:
+        raise HTTPException(status_code=422, detail=f"More than {FASTFORWARD_MAX_POINTS} points requested")
+    if body.duration_s / body.dt_s > FASTFORWARD_MAX_TICKS:
+        raise HTTPException(status_code=422, detail=f"More than {FASTFORWARD_MAX_TICKS} ticks requested")
+
+    slots = get_sim_run_slots()
+    if not slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=503,
+            detail="Fast-forward runs busy",
+            headers={"Retry-After": str(FASTFORWARD_RETRY_AFTER_S)},
+        )
+    try:
+        points = svc.fast_forward(
+            duration_s=body.duration_s,
+            dt_s=body.dt_s,
+            sample_every_s=body.sample_every_s,
+            scenario_id=body.scenario_id,
+            scenario_speed=body.scenario_speed,
+        )
+    except BaseException:
+        slots.release()
+        raise
+
+    def ndjson() -> Iterator[bytes]:
+        # Sync iterator: Starlette advances it on the threadpool, off the event loop.
+        try:
+            for p in points:
+                yield (json.dumps(p, separators=(",", ":")) + "\n").encode()
+        finally:
+            release()
+
+    stream = ndjson()
+    # Frees the slot exactly once: when the stream ends, or when it is dropped
+    # unfinished (client disconnect, possibly before the first chunk).
+    release = weakref.finalize(stream, slots.release)
+    return StreamingResponse(stream, media_type="application/x-ndjson")
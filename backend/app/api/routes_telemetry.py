@@ -1,10 +1,12 @@
 from __future__ import annotations
 
-from typing import List, Optional
+from datetime import datetime
+from typing import Any, Dict, List, Optional
 from fastapi import APIRouter, Query, HTTPException
 
 from app.deps import get_twin_service
 from app.models.domain import TelemetryTimeseriesPoint
+from app.services.telemetry_buffer import ROLLUP_MAX_POINTS
 
 from sse_starlette.sse import EventSourceResponse
 import asyncio
@@ -17,17 +19,15 @@ async def telemetry_timeseries(
     window_s: int = Query(900, ge=60, le=86400, description="Lookback window (seconds, max 24h)"),
     end_ts: Optional[str] = Query(None, description="Optional REPLAY end timestamp (ISO)"),
     mode: str = Query("live", pattern="^(live|replay)$", description="Mode: live or replay"),
+    points: int = Query(240, ge=1, le=ROLLUP_MAX_POINTS, description="Max points, from the coarsest rollup tier that yields them"),
+    stat: str = Query("mean", pattern="^(mean|min|max|last)$", description="Per-bucket statistic: mean, min, max or last"),
 ) -> List[TelemetryTimeseriesPoint]:
     svc = get_twin_service()
-    points = svc.get_timeseries(window_s=window_s, end_ts=end_ts, mode=mode)
-
-    # Downsample to ~240 points for performance if window is large
-    if len(points) > 240:
-        step = len(points) // 240
-        points = points[::step]
+    # Pre-aggregated rollups (1 s / 10 s / 1 min / 15 min): a 24 h window costs about what a 1 min one does
+    series = svc.get_timeseries(window_s=window_s, end_ts=end_ts, mode=mode, max_points=points, stat=stat)
 
     # enforce typed output (keeps schema stable)
-    return [TelemetryTimeseriesPoint(**p) for p in points]
+    return [TelemetryTimeseriesPoint(**p) for p in series]
 
 
 @router.get("/latest", response_model=TelemetryTimeseriesPoint)
@@ -49,6 +49,31 @@ async def telemetry_latest() -> TelemetryTimeseriesPoint:
     return TelemetryTimeseriesPoint(**latest)
 
 
+@router.get("/calibration")
+async def telemetry_calibration() -> Dict[str, Any]:
+    """
+    Thermal parameters fitted online from tick telemetry (recursive least squares),
+    each with its one-sigma uncertainty, next to the configured values.
+    """
+    svc = get_twin_service()
+    result = svc.get_calibration()
+    if result is None:
+        raise HTTPException(status_code=404, detail="Thermal calibration is disabled")
+    cfg = svc.therm_cfg
+    return {
+        "ts": datetime.now().isoformat(),
+        "fitted": result.to_dict(),
+        "configured": {
+            "K_transfer": float(cfg.K_transfer),
+            "Cooling_COP": float(cfg.Cooling_COP),
+            "coolant_volume_m3": float(cfg.coolant_volume_m3),
+            "C_mass": float(cfg.C_mass),
+        },
+        "skipped": float(svc.calibrator.skipped),
+        "apply_every_s": float(svc.calibration_apply_s),
+    }
+
+
 @router.get("/stream", response_class=EventSourceResponse)
 async def telemetry_stream():
     """
@@ -20,3 +20,11 @@ def env_int(name: str, default: int) -> int:
         return int(val.strip())
     except Exception:
         return default
+
+
+def env_str(name: str, default: str) -> str:
+    val = os.getenv(name)
+    if val is None:
+        return default
+    val = val.strip()
+    return val or default
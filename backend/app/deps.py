@@ -8,6 +8,8 @@ Purpose:
 
 Services Managed:
   - `DigitalTwinService` (The Physics Engine State)
+  - `DecisionExecutor` (Bounded worker pool for decisions)
+  - Fast-forward run slots (Bounded concurrent `/sim/fastforward` runs)
   - `CarbonService` (Environmental Data)
   - `ComparisonService` (if active)
 
@@ -17,8 +19,10 @@ Pattern:
 """
 from __future__ import annotations
 
+import threading
 from functools import lru_cache
-from app.config import env_flag
+from app.config import env_flag, env_int
+from app.services.decision_executor import DecisionExecutor
 from app.services.digital_twin import DigitalTwinService
 
 # Optional services (safe if missing)
@@ -43,3 +47,16 @@ def get_twin_service() -> DigitalTwinService:
     carbon = CarbonService() if CarbonService is not None and carbon_enabled else None
     gnn = GNNHeadroomService() if GNNHeadroomService is not None and gnn_enabled else None
     return DigitalTwinService(gnn=gnn, carbon=carbon)
+
+
+@lru_cache(maxsize=1)
+def get_decision_executor() -> DecisionExecutor:
+    return DecisionExecutor(
+        workers=env_int("DECISION_WORKERS", 2),
+        queue_depth=env_int("DECISION_QUEUE_DEPTH", 32),
+    )
+
+
+@lru_cache(maxsize=1)
+def get_sim_run_slots() -> threading.BoundedSemaphore:
+    return threading.BoundedSemaphore(max(1, env_int("SIM_FASTFORWARD_RUNS", 2)))
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 from enum import Enum
-from typing import Any, Dict, List, Optional
-from pydantic import BaseModel, Field
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+from pydantic import BaseModel, ConfigDict, Field, model_serializer, model_validator
 
 
 # ============================================================
@@ -161,6 +163,112 @@ class RampPlanStep(BaseModel):
     reason: str  # StepReasonCode (string)
 
 
+# StepReasonCode values; `RampPlanColumns.reason` stores indices into this tuple.
+STEP_REASON_CODES: Tuple[str, ...] = (
+    "OK",
+    "THERMAL_MARGIN_TOO_THIN",
+    "THERMAL_OVER_TEMP",
+    "BATTERY_WEAR_BLOCKED",
+)
+
+_STEP_COLUMNS: Tuple[str, ...] = (
+    "t_offset_s",
+    "proposed_deltaP_kw",
+    "rack_temp_c",
+    "cooling_kw",
+    "thermal_headroom_kw",
+)
+
+
+class RampPlanColumns(BaseModel):
+    """
+    Ramp plan steps as a struct of arrays (entry i = step i).
+
+    Serializes to JSON columns (one list per field, `reason` as strings and a
+    derived `thermal_ok`), so a plan dumps without one object per step.
+    """
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    t_offset_s: np.ndarray
+    proposed_deltaP_kw: np.ndarray
+    rack_temp_c: np.ndarray
+    cooling_kw: np.ndarray
+    thermal_headroom_kw: np.ndarray
+    reason: np.ndarray  # int8 index into STEP_REASON_CODES
+
+    @model_validator(mode="before")
+    @classmethod
+    def _coerce_columns(cls, data: Any) -> Any:
+        # Accepts the JSON column form back (lists, reason strings).
+        if not isinstance(data, dict):
+            return data
+        out = {name: np.asarray(data[name], dtype=float) for name in _STEP_COLUMNS if name in data}
+        if "t_offset_s" in out:
+            out["t_offset_s"] = out["t_offset_s"].astype(np.int64)
+        if "reason" in data:
+            reason = np.asarray(data["reason"])
+            if reason.dtype.kind not in "iu":
+                reason = np.asarray([STEP_REASON_CODES.index(str(r)) for r in reason.ravel()])
+            out["reason"] = reason.astype(np.int8)
+        return out
+
+    @classmethod
+    def empty(cls) -> "RampPlanColumns":
+        return cls.from_rows([])
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[int, float, float, float, float, int]]) -> "RampPlanColumns":
+        """
+        Builds columns from (t_offset_s, deltaP, temp, cooling, headroom, reason index) tuples.
+        """
+        arr = np.array(list(rows), dtype=float).reshape(-1, 6)
+        return cls.model_construct(
+            t_offset_s=arr[:, 0].astype(np.int64),
+            proposed_deltaP_kw=arr[:, 1],
+            rack_temp_c=arr[:, 2],
+            cooling_kw=arr[:, 3],
+            thermal_headroom_kw=arr[:, 4],
+            reason=arr[:, 5].astype(np.int8),
+        )
+
+    @classmethod
+    def from_steps(cls, steps: Iterable[Union[RampPlanStep, Dict[str, Any]]]) -> "RampPlanColumns":
+        rows = []
+        for step in steps:
+            s = step if isinstance(step, RampPlanStep) else RampPlanStep(**step)
+            rows.append(
+                (s.t_offset_s, s.proposed_deltaP_kw, s.rack_temp_c, s.cooling_kw,
+                 s.thermal_headroom_kw, STEP_REASON_CODES.index(s.reason))
+            )
+        return cls.from_rows(rows)
+
+    @property
+    def thermal_ok(self) -> np.ndarray:
+        return self.reason == 0
+
+    def __len__(self) -> int:
+        return int(self.t_offset_s.shape[0])
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, RampPlanColumns):
+            return NotImplemented
+        return all(np.array_equal(getattr(self, n), getattr(other, n)) for n in _STEP_COLUMNS + ("reason",))
+
+    def to_steps(self) -> List[RampPlanStep]:
+        d = self.model_dump()
+        return [
+            RampPlanStep(**{name: d[name][i] for name in d})
+            for i in range(len(self))
+        ]
+
+    @model_serializer
+    def _to_json_columns(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {name: getattr(self, name).tolist() for name in _STEP_COLUMNS}
+        out["thermal_ok"] = self.thermal_ok.tolist()
+        out["reason"] = [STEP_REASON_CODES[c] for c in self.reason.tolist()]
+        return out
+
+
 class RampPlan(BaseModel):
     requested_deltaP_kw: float
     approved_deltaP_kw: float
@@ -172,7 +280,24 @@ class RampPlan(BaseModel):
     constraint_value: Optional[float] = None
     constraint_threshold: Optional[float] = None
     
-    steps: List[RampPlanStep] = Field(default_factory=list)
+    columns: RampPlanColumns = Field(default_factory=RampPlanColumns.empty)
+
+    @model_validator(mode="before")
+    @classmethod
+    def _steps_to_columns(cls, data: Any) -> Any:
+        # Compatibility: RampPlan(steps=[...]) still builds the columns.
+        if isinstance(data, dict) and "steps" in data:
+            data = dict(data)
+            steps = data.pop("steps")
+            data.setdefault("columns", RampPlanColumns.from_steps(steps))
+        return data
+
+    @property
+    def steps(self) -> List[RampPlanStep]:
+        """
+        Per-step view of `columns` (compatibility adapter: one model per step).
+        """
+        return self.columns.to_steps()
 
 
 # ============================================================
@@ -203,6 +328,8 @@ class TelemetryTimeseriesPoint(BaseModel):
     price_usd_per_mwh: Optional[float] = None
     scenario_id: Optional[str] = None
     t_sim_s: Optional[float] = None
+    # Seconds of ticks aggregated into this point (rollup queries only)
+    bucket_s: Optional[float] = None
 
 
 class DecisionResponse(BaseModel):
@@ -219,6 +346,43 @@ class DecisionResponse(BaseModel):
 
     prediction_debug: Optional[Dict[str, float]] = None
 
+    # Decision confidence; `ensemble` holds the Monte Carlo evidence behind it
+    # (members, P(T < T_max), percentile temperature bands) when enabled.
+    confidence: Optional[float] = None
+    ensemble: Optional[Dict[str, Any]] = None
+
+
+class DecisionBatchItem(BaseModel):
+    # Same bounds as the /decision/latest query parameters.
+    deltaP_request_kw: float = Field(..., ge=-5000.0, le=5000.0)
+    P_site_kw: float = Field(..., ge=0.0, le=100000.0)
+    grid_headroom_kw: Optional[float] = Field(None, ge=0.0, le=100000.0)
+    horizon_s: int = Field(30, ge=10, le=300)
+    dt_s: int = Field(1, ge=1, le=10)
+    ramp_rate_kw_per_s: float = Field(50.0, ge=1.0, le=1000.0)
+
+
+class DecisionBatchRequest(BaseModel):
+    items: List[DecisionBatchItem] = Field(..., min_length=1, max_length=500)
+    trace_level: Optional[str] = Field(None, pattern="^(final|summary|full)$")
+
+
+class DecisionBatchResponse(BaseModel):
+    ts: str
+    snapshot: Dict[str, float]
+    items: List[DecisionResponse]
+
+
+class FastForwardRequest(BaseModel):
+    # Simulated span (up to a week) and tick length, both in seconds.
+    duration_s: float = Field(3600.0, gt=0.0, le=7 * 86400.0)
+    dt_s: float = Field(1.0, ge=0.1, le=60.0)
+    # One streamed point per window of this many simulated seconds.
+    sample_every_s: float = Field(60.0, ge=1.0, le=86400.0)
+    # Start this demo scenario at t=0 on the clone (default: clone the running one, if any).
+    scenario_id: Optional[str] = None
+    scenario_speed: float = Field(1.0, ge=0.1, le=20.0)
+
 
 class TraceLatestResponse(BaseModel):
     ts: str
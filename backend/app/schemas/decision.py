@@ -1 +1 @@
-from app.models.domain import DecisionResponse, DecisionTraceEvent, RampPlan, RampPlanStep
+from app.models.domain import DecisionResponse, DecisionTraceEvent, RampPlan, RampPlanColumns, RampPlanStep
@@ -0,0 +1,307 @@
+"""
+calibration.py
+
+Purpose:
+  Online calibration of the twin's thermal parameters (K_transfer, thermal mass,
+  Cooling_COP) from recorded (it_load, cooling, rack_temp) telemetry, published
+  with their uncertainty.
+
+Method:
+  - The Euler step is linear in three parameters. With C(T) = s * C_ref(T), where
+    C_ref is the configured thermal mass (the coolant table at the configured
+    volume, or C_mass) and s a dimensionless scale:
+
+        C_ref(T_k) * (T_k+1 - T_k) / dt = a * P_it - b * (T_k - T_amb) - c * P_cool_k+1
+        a = 1 / s,   b = K_transfer / s,   c = Cooling_COP / s
+
+  - `fit_window`: vectorized least squares over a window of recorded samples.
+  - `ThermalCalibrator`: recursive least squares with exponential forgetting,
+    one sample per tick in plain floats (a few microseconds). It starts from the
+    configured parameters with CALIBRATION_PRIOR_REL_STD uncertainty, so
+    directions the telemetry does not excite stay at the configured values.
+  - Parameter standard deviations come from the (a, b, c) covariance through
+    the delta method.
+
+Invariant:
+  - Samples where the rack sits on the T_min floor (the step is clamped, not
+    physical) or with dt <= 0 are skipped. The service also skips demo-scenario
+    ticks, whose scaled COP and ambient are not the plant's own.
+  - The covariance never exceeds the prior: unexcited directions do not wind up.
+  - Calibration only observes. Fitted values reach the planner only through
+    `CalibrationResult.apply` (THERMAL_CALIBRATION_APPLY_S in the service).
+"""
+from __future__ import annotations
+
+import math
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from app.models.domain import ThermalTwinConfig
+from app.services.physics_engine import coolant_table
+
+
+# Forgetting factor per sample (memory of about 1 / (1 - lambda) = 3600 ticks).
+CALIBRATION_FORGETTING = 1.0 - 1.0 / 3600.0
+# Prior relative standard deviation of each parameter around the configured value.
+CALIBRATION_PRIOR_REL_STD = 0.25
+# Floor on the residual variance (kW^2): keeps the gain finite on noiseless data.
+CALIBRATION_NOISE_FLOOR_KW2 = 1e-6
+# Largest relative std for a fitted parameter to replace the configured one.
+CALIBRATION_APPLY_MAX_REL_STD = 0.02
+
+
+@dataclass
+class CalibrationResult:
+    """
+    Fitted parameters with one-sigma uncertainties. `C_mass` is the effective
+    thermal mass (kJ/°C) at `T_ref_c`; `mass_scale` multiplies the configured
+    coolant volume (or C_mass when the dynamic mass is off). `residual_kw` is
+    the RMS one-step heat-balance residual.
+    """
+    K_transfer: float
+    K_transfer_std: float
+    Cooling_COP: float
+    Cooling_COP_std: float
+    mass_scale: float
+    mass_scale_std: float
+    C_mass: float
+    C_mass_std: float
+    T_ref_c: float
+    residual_kw: float
+    samples: int
+
+    def to_dict(self) -> Dict[str, Optional[float]]:
+        return {k: float(v) if math.isfinite(v) else None for k, v in asdict(self).items()}
+
+    def apply(
+        self, cfg: ThermalTwinConfig, max_rel_std: float = CALIBRATION_APPLY_MAX_REL_STD
+    ) -> ThermalTwinConfig:
+        """
+        Copy of `cfg` with every parameter fitted to within `max_rel_std` replaced.
+        """
+        updates: Dict[str, float] = {}
+        if _tight(self.K_transfer, self.K_transfer_std, max_rel_std):
+            updates["K_transfer"] = self.K_transfer
+        if _tight(self.Cooling_COP, self.Cooling_COP_std, max_rel_std):
+            updates["Cooling_COP"] = self.Cooling_COP
+        if _tight(self.mass_scale, self.mass_scale_std, max_rel_std):
+            if cfg.use_dynamic_coolant_mass:
+                updates["coolant_volume_m3"] = float(cfg.coolant_volume_m3) * self.mass_scale
+            else:
+                updates["C_mass"] = float(cfg.C_mass) * self.mass_scale
+        return cfg.model_copy(update=updates)
+
+
+def _tight(value: float, std: float, max_rel_std: float) -> bool:
+    return value > 0.0 and math.isfinite(std) and std <= max_rel_std * value
+
+
+def _reference_mass(cfg: ThermalTwinConfig, T_c):
+    """
+    Configured thermal mass C_ref(T) in kJ/°C (scalar or array).
+    """
+    if cfg.use_dynamic_coolant_mass:
+        table = coolant_table(cfg.glycol_pct)
+        if np.ndim(T_c):
+            return table.heat_capacity_kj_per_c_array(T_c, cfg.coolant_volume_m3)
+        return table.heat_capacity_kj_per_c(float(T_c), cfg.coolant_volume_m3)
+    if np.ndim(T_c):
+        return np.full(np.shape(T_c), float(cfg.C_mass))
+    return float(cfg.C_mass)
+
+
+def _result(
+    cfg: ThermalTwinConfig, theta: np.ndarray, cov: np.ndarray, residual_kw: float, samples: int, T_ref_c: float
+) -> CalibrationResult:
+    a, b, c = (float(v) for v in theta)
+    if not a > 0.0:
+        nan = float("nan")
+        return CalibrationResult(nan, nan, nan, nan, nan, nan, nan, nan, T_ref_c, residual_kw, samples)
+    # Jacobian of (s, K, COP) = (1/a, b/a, c/a) with respect to (a, b, c).
+    J = np.array(
+        [
+            [-1.0 / (a * a), 0.0, 0.0],
+            [-b / (a * a), 1.0 / a, 0.0],
+            [-c / (a * a), 0.0, 1.0 / a],
+        ]
+    )
+    std = np.sqrt(np.maximum(np.diag(J @ cov @ J.T), 0.0))
+    C_ref = float(_reference_mass(cfg, T_ref_c))
+    return CalibrationResult(
+        K_transfer=b / a,
+        K_transfer_std=float(std[1]),
+        Cooling_COP=c / a,
+        Cooling_COP_std=float(std[2]),
+        mass_scale=1.0 / a,
+        mass_scale_std=float(std[0]),
+        C_mass=C_ref / a,
+        C_mass_std=C_ref * float(std[0]),
+        T_ref_c=float(T_ref_c),
+        residual_kw=float(residual_kw),
+        samples=int(samples),
+    )
+
+
+def fit_window(
+    cfg: ThermalTwinConfig,
+    it_load_kw: np.ndarray,
+    cooling_kw: np.ndarray,
+    rack_temp_c: np.ndarray,
+    dt_s: float,
+    T_ambient_c: Optional[np.ndarray] = None,
+) -> Optional[CalibrationResult]:
+    """
+    Batch least squares over consecutive telemetry rows (row k: the load during
+    step k, the cooling and rack temperature at its start). None when fewer than
+    three usable steps remain.
+    """
+    P_it = np.asarray(it_load_kw, dtype=float)[:-1]
+    P_cool = np.asarray(cooling_kw, dtype=float)[1:]
+    T = np.asarray(rack_temp_c, dtype=float)
+    T0, T1 = T[:-1], T[1:]
+    T_amb = np.broadcast_to(
+        np.asarray(cfg.T_ambient if T_ambient_c is None else T_ambient_c, dtype=float), T.shape
+    )[:-1]
+
+    usable = (T1 > cfg.T_min) & np.isfinite(T1) & np.isfinite(T0) & (float(dt_s) > 0.0)
+    if int(usable.sum()) < 3:
+        return None
+    X = np.stack([P_it, -(T0 - T_amb), -P_cool], axis=1)[usable]
+    y = (_reference_mass(cfg, T0) * (T1 - T0) / float(dt_s))[usable]
+
+    theta, *_ = np.linalg.lstsq(X, y, rcond=None)
+    residual = y - X @ theta
+    dof = max(y.size - 3, 1)
+    sigma2 = max(float(residual @ residual) / dof, CALIBRATION_NOISE_FLOOR_KW2)
+    cov = sigma2 * np.linalg.pinv(X.T @ X)
+    return _result(cfg, theta, cov, math.sqrt(float(np.mean(residual ** 2))), y.size, float(T0[usable][-1]))
+
+
+class ThermalCalibrator:
+    """
+    Recursive least squares over one telemetry sample per tick. The 3x3
+    covariance is kept as its six upper-triangle floats.
+    """
+
+    __slots__ = (
+        "cfg", "forgetting", "samples", "skipped", "T_last", "_theta", "_P", "_P0", "_noise_kw2", "_mass",
+    )
+
+    def __init__(
+        self,
+        cfg: ThermalTwinConfig,
+        forgetting: float = CALIBRATION_FORGETTING,
+        prior_rel_std: float = CALIBRATION_PRIOR_REL_STD,
+    ):
+        self.forgetting = float(forgetting)
+        self.reset(cfg, prior_rel_std)
+
+    def reset(self, cfg: ThermalTwinConfig, prior_rel_std: float = CALIBRATION_PRIOR_REL_STD) -> None:
+        """
+        Restarts from `cfg`'s parameters (s = 1) with the prior uncertainty.
+        """
+        self.cfg = cfg
+        self.samples = 0
+        self.skipped = 0
+        self.T_last = float(cfg.T_setpoint)
+        self._theta = [1.0, float(cfg.K_transfer), float(cfg.Cooling_COP)]
+        v = [(prior_rel_std * x) ** 2 for x in self._theta]
+        self._P0 = v
+        # (P00, P01, P02, P11, P12, P22)
+        self._P = [v[0], 0.0, 0.0, v[1], 0.0, v[2]]
+        self._noise_kw2 = CALIBRATION_NOISE_FLOOR_KW2
+        if cfg.use_dynamic_coolant_mass:
+            table, volume = coolant_table(cfg.glycol_pct), float(cfg.coolant_volume_m3)
+            self._mass = lambda T: table.heat_capacity_kj_per_c(T, volume)
+        else:
+            C = float(cfg.C_mass)
+            self._mass = lambda T: C
+
+    def update(
+        self,
+        it_load_kw: float,
+        cooling_kw: float,
+        rack_temp_prev_c: float,
+        rack_temp_c: float,
+        dt_s: float,
+        T_ambient_c: Optional[float] = None,
+    ) -> bool:
+        """
+        Folds in one step: load during the step, cooling and temperature at its
+        end, temperature at its start. Returns False for a skipped sample.
+        """
+        if not (dt_s > 0.0 and rack_temp_c > self.cfg.T_min):
+            self.skipped += 1
+            return False
+        T0 = rack_temp_prev_c
+        x0 = it_load_kw
+        x1 = -(T0 - (self.cfg.T_ambient if T_ambient_c is None else T_ambient_c))
+        x2 = -cooling_kw
+        y = self._mass(T0) * (rack_temp_c - T0) / dt_s
+
+        th = self._theta
+        P00, P01, P02, P11, P12, P22 = self._P
+        # Px = P x
+        g0 = P00 * x0 + P01 * x1 + P02 * x2
+        g1 = P01 * x0 + P11 * x1 + P12 * x2
+        g2 = P02 * x0 + P12 * x1 + P22 * x2
+        err = y - (th[0] * x0 + th[1] * x1 + th[2] * x2)
+        lam = self.forgetting
+        noise = lam * self._noise_kw2 + (1.0 - lam) * err * err
+        if noise < CALIBRATION_NOISE_FLOOR_KW2:
+            noise = CALIBRATION_NOISE_FLOOR_KW2
+        self._noise_kw2 = noise
+        inv = 1.0 / (noise + x0 * g0 + x1 * g1 + x2 * g2)
+        k0, k1, k2 = g0 * inv, g1 * inv, g2 * inv
+        th[0] += k0 * err
+        th[1] += k1 * err
+        th[2] += k2 * err
+
+        inv_lam = 1.0 / lam
+        P = [
+            (P00 - k0 * g0) * inv_lam,
+            (P01 - k0 * g1) * inv_lam,
+            (P02 - k0 * g2) * inv_lam,
+            (P11 - k1 * g1) * inv_lam,
+            (P12 - k1 * g2) * inv_lam,
+            (P22 - k2 * g2) * inv_lam,
+        ]
+        # Cap each variance at the prior (scaling its row and column keeps P positive).
+        P0 = self._P0
+        for i, d in ((0, 0), (1, 3), (2, 5)):
+            if P[d] > P0[i]:
+                r = math.sqrt(P0[i] / P[d])
+                for j in _ROW[i]:
+                    P[j] *= r
+                P[d] = P0[i]
+        self._P = P
+        self.samples += 1
+        self.T_last = rack_temp_c
+        return True
+
+    def covariance(self) -> np.ndarray:
+        P00, P01, P02, P11, P12, P22 = self._P
+        return np.array([[P00, P01, P02], [P01, P11, P12], [P02, P12, P22]])
+
+    def result(self) -> CalibrationResult:
+        return _result(
+            self.cfg,
+            np.asarray(self._theta),
+            self.covariance(),
+            math.sqrt(self._noise_kw2),
+            self.samples,
+            self.T_last,
+        )
+
+    def estimate(self) -> Tuple[float, float, float]:
+        """
+        (K_transfer, Cooling_COP, mass_scale) without the uncertainty math.
+        """
+        a, b, c = self._theta
+        return b / a, c / a, 1.0 / a
+
+
+# Off-diagonal upper-triangle slots of each covariance row.
+_ROW = {0: (1, 2), 1: (1, 4), 2: (2, 4)}
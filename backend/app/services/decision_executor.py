@@ -0,0 +1,128 @@
+"""
+decision_executor.py
+
+Purpose:
+  Runs decisions (GNN headroom, planner search, SQLite commit) on a bounded
+  worker pool so they never block the event loop that serves WebSocket and
+  SSE streams.
+
+Admission control:
+  - At most `workers` decisions execute at once; up to `queue_depth` more may wait.
+  - Beyond that `submit` raises `DecisionQueueFull` instead of queueing, and the
+    route answers 503 with `Retry-After` (estimated from recent execution times).
+  - A slot is held until the pool job is done, even if the awaiting request is
+    cancelled first (client disconnect): cancelled requests cannot pile work
+    into the pool's unbounded queue.
+
+Metrics:
+  - Queue wait (submit -> worker start) and execution time, p50/p95/max over
+    the last `window` decisions, plus completed/rejected/failed counters.
+"""
+from __future__ import annotations
+
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+
+class DecisionQueueFull(RuntimeError):
+    """
+    Raised when every worker is busy and the wait queue is full.
+    """
+
+    def __init__(self, retry_after_s: int):
+        super().__init__(f"decision queue full; retry after {retry_after_s}s")
+        self.retry_after_s = retry_after_s
+
+
+def _percentiles(values: deque) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"p50": None, "p95": None, "max": None}
+    arr = np.fromiter(values, dtype=float)
+    return {
+        "p50": float(np.percentile(arr, 50)),
+        "p95": float(np.percentile(arr, 95)),
+        "max": float(arr.max()),
+    }
+
+
+class DecisionExecutor:
+    """
+    Bounded thread pool with admission control and latency counters.
+    """
+
+    def __init__(self, workers: int = 2, queue_depth: int = 32, window: int = 512):
+        self.workers = max(1, int(workers))
+        self.queue_depth = max(0, int(queue_depth))
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="decision")
+        self._lock = threading.Lock()
+        self._outstanding = 0  # running + waiting
+
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+        self._wait_ms: deque = deque(maxlen=window)
+        self._exec_ms: deque = deque(maxlen=window)
+
+    def _retry_after_s(self) -> int:
+        # Time for the current backlog to drain at the recent execution rate.
+        exec_s = (sum(self._exec_ms) / len(self._exec_ms) / 1000.0) if self._exec_ms else 0.1
+        return int(min(30, max(1, math.ceil(exec_s * self._outstanding / self.workers))))
+
+    async def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            if self._outstanding >= self.workers + self.queue_depth:
+                self.rejected += 1
+                raise DecisionQueueFull(self._retry_after_s())
+            self._outstanding += 1
+        enqueued = time.perf_counter()
+
+        def run() -> Any:
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                finished = time.perf_counter()
+                with self._lock:
+                    self._wait_ms.append((started - enqueued) * 1000.0)
+                    self._exec_ms.append((finished - started) * 1000.0)
+
+        def release(job: Future) -> None:
+            # The slot follows the pool job, not the awaiting request: a cancelled
+            # request keeps its slot until its job finishes (or is dropped unstarted).
+            with self._lock:
+                self._outstanding -= 1
+                if job.cancelled():
+                    return
+                if job.exception() is not None:
+                    self.failed += 1
+                else:
+                    self.completed += 1
+
+        try:
+            job = self._pool.submit(run)
+        except BaseException:
+            with self._lock:
+                self._outstanding -= 1
+            raise
+        job.add_done_callback(release)
+        return await asyncio.wrap_future(job)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_depth": self.queue_depth,
+                "outstanding": self._outstanding,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "failed": self.failed,
+                "queue_wait_ms": _percentiles(self._wait_ms),
+                "exec_ms": _percentiles(self._exec_ms),
+            }
@@ -14,18 +14,22 @@ Key Responsibilities:
 
 Flow:
   1. `tick()`: Advances time, updates physics (`ThermalTwin`), and emits telemetry.
-  2. `decide()`: Takes a load shift request, fuses constraints (Grid, Thermal, Policy), and returns an approved plan.
+  2. `refresh_frontier()`: Precomputes the feasibility frontier from the new state
+     (off the tick path; skipped while unchanged or unused).
+  3. `decide()`: Takes a load shift request, fuses constraints (Grid, Thermal, Policy), and returns an approved plan.
 """
 from __future__ import annotations
 
 import asyncio
 import math
 import random
+import threading
+import time
 import uuid
 from collections import deque
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Set
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
 from collections import Counter
 import torch
 
@@ -37,9 +41,15 @@ from app.models.domain import (
     RuleStatus,
     SeverityLevel
 )
-from app.config import env_flag, env_int
-from app.services.physics_engine import ThermalTwin
-from app.services.policy_engine import build_ramp_plan
+from app.config import env_flag, env_int, env_str
+from app.services.physics_engine import THERMAL_INTEGRATORS, ThermalPrediction, ThermalTwin, TwinState
+from app.services.ensemble import ENSEMBLE_MAX_MEMBER_STEPS, EnsembleResult, ramp_profile, run_ensemble
+from app.services.policy_engine import PLANNER_ENGINES, PLANNER_RESOLUTIONS, TRACE_LEVELS, build_ramp_plan
+from app.services.plan_cache import PlanCache, PlanCacheEntry, config_hash, plan_cache_key
+from app.services.frontier import FeasibilityFrontier, compute_frontier
+from app.services.surrogate import PlannerSurrogate, SURROGATE_PATH, load_surrogate
+from app.services.calibration import CalibrationResult, ThermalCalibrator
+from app.services.telemetry_buffer import ROLLUP_MAX_POINTS, TELEMETRY_HISTORY_ROWS, TelemetryRing
 
 # Optional dependencies
 try:
@@ -172,6 +182,83 @@ class DemoScenarioState:
     emitted: Set[str] = field(default_factory=set)
 
 
+# Demo scenario event log: (t_sim threshold s, event key, message) in firing order.
+DEMO_SCENARIO_EVENTS: Dict[str, Tuple[Tuple[float, str, str], ...]] = {
+    "heat_wave": (
+        (1.0, "heat_wave_start", "Heat wave begins. Ambient temp rising."),
+        (140.0, "heat_wave_peak", "Peak heat. Cooling efficiency degraded."),
+        (400.0, "heat_wave_recover", "Heat wave easing. Thermal margin recovering."),
+    ),
+    "price_spike": (
+        (60.0, "price_spike_start", "Price spike detected. Shift value increased."),
+        (75.0, "price_spike_peak", "Price spike peak window."),
+        (200.0, "price_spike_end", "Price spike ending. Conditions stabilizing."),
+    ),
+}
+
+
+def demo_scenario_effects(scenario_id: str, t_sim: float) -> Dict[str, float]:
+    """
+    Effects of a running demo scenario at simulated time t_sim (s). Pure, so
+    the live tick loop and fast-forward runs share one timeline.
+    """
+    effects: Dict[str, float] = {
+        "t_sim_s": float(t_sim),
+        "load_delta_kw": 0.0,
+        "ambient_delta_c": 0.0,
+        "cooling_cop_scale": 1.0,
+        "price_multiplier": 1.0,
+        "freq_bias_hz": 0.0,
+    }
+
+    if scenario_id == "heat_wave":
+        # Ramp up 0-120s, peak 120-360s, cool down 360-600s
+        if t_sim < 120:
+            ramp = t_sim / 120.0
+        elif t_sim < 360:
+            ramp = 1.0
+        else:
+            ramp = max(0.0, 1.0 - (t_sim - 360.0) / 240.0)
+
+        effects["load_delta_kw"] = 800.0 * ramp
+        effects["ambient_delta_c"] = 10.0 * ramp
+        effects["cooling_cop_scale"] = 1.0 - 0.3 * ramp
+        effects["freq_bias_hz"] = -0.03 * ramp
+
+    elif scenario_id == "price_spike":
+        # Spike 60-180s, cool down 180-240s
+        if t_sim < 60:
+            mult = 1.0
+        elif t_sim < 180:
+            mult = 6.0
+        elif t_sim < 240:
+            mult = 3.0
+        else:
+            mult = 1.0
+
+        effects["price_multiplier"] = mult
+        effects["load_delta_kw"] = 500.0 if 60 <= t_sim <= 180 else 200.0
+        effects["freq_bias_hz"] = -0.015 if 60 <= t_sim <= 180 else 0.0
+
+    return effects
+
+
+def demo_scenario_config(cfg: ThermalTwinConfig, demo_effects: Dict[str, float]) -> ThermalTwinConfig:
+    """
+    Copy of `cfg` with the scenario's ambient and cooling-COP effects applied.
+    """
+    try:
+        cfg = cfg.model_copy(deep=True)
+    except Exception:
+        try:
+            cfg = ThermalTwinConfig(**cfg.model_dump())
+        except Exception:
+            cfg = ThermalTwinConfig(**cfg.dict())
+    cfg.T_ambient = float(cfg.T_ambient) + float(demo_effects.get("ambient_delta_c", 0.0))
+    cfg.Cooling_COP = float(cfg.Cooling_COP) * float(demo_effects.get("cooling_cop_scale", 1.0))
+    return cfg
+
+
 # ============================================================
 # DIGITAL TWIN SERVICE
 # ============================================================
@@ -195,9 +282,82 @@ class DigitalTwinService:
         self.therm_cfg = ThermalTwinConfig()
         # Start in a realistic steady-state range for demos.
         self.therm_state = ThermalTwinState(T_c=27.0, P_cool_kw=250.0)
+        # Guards therm_state and planner bookkeeping: decisions run on worker threads
+        # while the tick loop steps the twin on the event loop. Held only for copies/commits.
+        self._state_lock = threading.Lock()
         
         # Trace Buffer
         self.trace = deque(maxlen=600)
+        # Recorded tick telemetry behind /telemetry/timeseries (24 h at 1 Hz by default)
+        self.telemetry = TelemetryRing(max(1, env_int("TELEMETRY_HISTORY_ROWS", TELEMETRY_HISTORY_ROWS)))
+        # Planner trace verbosity (deployment default; requests may override)
+        self.trace_level = env_str("TRACE_LEVEL", "summary")
+        if self.trace_level not in TRACE_LEVELS:
+            self.trace_level = "summary"
+        # Planner engine ("vector" | "scalar" | "newton" | "trajectory"); see build_ramp_plan
+        self.planner_engine = env_str("PLANNER_ENGINE", "vector")
+        if self.planner_engine not in PLANNER_ENGINES:
+            self.planner_engine = "vector"
+        # Planner time resolution; "adaptive" and "fine" give identical plans
+        self.planner_resolution = env_str("PLANNER_RESOLUTION", "adaptive")
+        if self.planner_resolution not in PLANNER_RESOLUTIONS:
+            self.planner_resolution = "adaptive"
+        # Twin integrator for the tick loop and the history window ("euler" | "exponential");
+        # the exponential one stays accurate at the history's coarse steps (window / 60)
+        self.thermal_integrator = env_str("THERMAL_INTEGRATOR", "euler")
+        if self.thermal_integrator not in THERMAL_INTEGRATORS:
+            self.thermal_integrator = "euler"
+        # Interval pre-screening before the search (PLANNER_PRESCREEN=0 disables)
+        self.prescreen_enabled = env_flag("PLANNER_PRESCREEN", True)
+        # peak_temp_c_per_100kw on every plan (PLANNER_SENSITIVITY=1); trace_level "full" always has it
+        self.sensitivity_enabled = env_flag("PLANNER_SENSITIVITY", False)
+        self._screen_stats: Dict[str, int] = {"blocked": 0, "safe": 0, "searched": 0}
+        # Monte Carlo members behind each decision's confidence (ENSEMBLE_SIZE=0: heuristic)
+        self.ensemble_members = max(0, env_int("ENSEMBLE_SIZE", 256))
+        # Members x steps budget; long horizons run a smaller ensemble (see app.services.ensemble)
+        self.ensemble_max_member_steps = max(1, env_int("ENSEMBLE_MAX_MEMBER_STEPS", ENSEMBLE_MAX_MEMBER_STEPS))
+
+        # Planner memoization (PLAN_CACHE_SIZE=0 disables)
+        cache_size = env_int("PLAN_CACHE_SIZE", 256)
+        self.plan_cache: Optional[PlanCache] = (
+            PlanCache(maxsize=cache_size, ttl_s=env_int("PLAN_CACHE_TTL_MS", 2000) / 1000.0)
+            if cache_size > 0
+            else None
+        )
+
+        # Warm-start bounds of the last search per (sign, ramp rate, horizon):
+        # (largest feasible magnitude, smallest infeasible magnitude) in kW.
+        self.warm_start_enabled = env_flag("PLANNER_WARM_START", True)
+        self._search_bounds: Dict[Tuple[int, float, int], Tuple[float, float]] = {}
+
+        # Feasibility frontier, refreshed by the tick loop (PLANNER_FRONTIER=0 disables)
+        self.frontier_enabled = env_flag("PLANNER_FRONTIER", True)
+        self._frontier: Optional[FeasibilityFrontier] = None
+        self._frontier_stats: Dict[str, int] = {
+            "hits": 0, "misses": 0, "verify_failed": 0, "refreshes": 0, "refresh_skipped": 0
+        }
+        # Refresh only while someone uses it: within this many seconds of the last decision
+        # or frontier read (PLANNER_FRONTIER_IDLE_S=0: every tick).
+        self.frontier_idle_s = max(0, env_int("PLANNER_FRONTIER_IDLE_S", 30))
+        self._frontier_demand_at: Optional[float] = None
+        # Learned planner hint when the frontier has none (PLANNER_SURROGATE=1; see surrogate.py)
+        self.surrogate: Optional[PlannerSurrogate] = (
+            load_surrogate(env_str("PLANNER_SURROGATE_PATH", SURROGATE_PATH))
+            if env_flag("PLANNER_SURROGATE", False)
+            else None
+        )
+        self._surrogate_stats: Dict[str, int] = {"hits": 0, "fallbacks": 0, "skipped": 0}
+        # Decisions answered with a partial search because their deadline passed.
+        self._deadline_partial = 0
+        # Plans whose first step was not committed: the twin moved during the search.
+        self._stale_commits = 0
+        # Online thermal-parameter fit from tick telemetry (THERMAL_CALIBRATION=0 disables).
+        # THERMAL_CALIBRATION_APPLY_S > 0 feeds tight estimates into therm_cfg at that cadence.
+        self.calibrator: Optional[ThermalCalibrator] = (
+            ThermalCalibrator(self.therm_cfg) if env_flag("THERMAL_CALIBRATION", True) else None
+        )
+        self.calibration_apply_s = max(0, env_int("THERMAL_CALIBRATION_APPLY_S", 0))
+        self._calibration_applied_at = 0
 
         # Optional services
         self.gnn = gnn
@@ -316,57 +476,10 @@ class DigitalTwinService:
             return {}
 
         sid = self._demo_scenario.scenario_id
-        effects: Dict[str, float] = {
-            "t_sim_s": float(t_sim),
-            "load_delta_kw": 0.0,
-            "ambient_delta_c": 0.0,
-            "cooling_cop_scale": 1.0,
-            "price_multiplier": 1.0,
-            "freq_bias_hz": 0.0,
-        }
-
-        if sid == "heat_wave":
-            # Ramp up 0-120s, peak 120-360s, cool down 360-600s
-            if t_sim < 120:
-                ramp = t_sim / 120.0
-            elif t_sim < 360:
-                ramp = 1.0
-            else:
-                ramp = max(0.0, 1.0 - (t_sim - 360.0) / 240.0)
-
-            effects["load_delta_kw"] = 800.0 * ramp
-            effects["ambient_delta_c"] = 10.0 * ramp
-            effects["cooling_cop_scale"] = 1.0 - 0.3 * ramp
-            effects["freq_bias_hz"] = -0.03 * ramp
-
-            if t_sim >= 1.0:
-                self._demo_emit_event("heat_wave_start", "Heat wave begins. Ambient temp rising.", t_sim)
-            if t_sim >= 140.0:
-                self._demo_emit_event("heat_wave_peak", "Peak heat. Cooling efficiency degraded.", t_sim)
-            if t_sim >= 400.0:
-                self._demo_emit_event("heat_wave_recover", "Heat wave easing. Thermal margin recovering.", t_sim)
-
-        elif sid == "price_spike":
-            # Spike 60-180s, cool down 180-240s
-            if t_sim < 60:
-                mult = 1.0
-            elif t_sim < 180:
-                mult = 6.0
-            elif t_sim < 240:
-                mult = 3.0
-            else:
-                mult = 1.0
-
-            effects["price_multiplier"] = mult
-            effects["load_delta_kw"] = 500.0 if 60 <= t_sim <= 180 else 200.0
-            effects["freq_bias_hz"] = -0.015 if 60 <= t_sim <= 180 else 0.0
-
-            if t_sim >= 60.0:
-                self._demo_emit_event("price_spike_start", "Price spike detected. Shift value increased.", t_sim)
-            if t_sim >= 75.0:
-                self._demo_emit_event("price_spike_peak", "Price spike peak window.", t_sim)
-            if t_sim >= 200.0:
-                self._demo_emit_event("price_spike_end", "Price spike ending. Conditions stabilizing.", t_sim)
+        effects = demo_scenario_effects(sid, t_sim)
+        for at_s, key, message in DEMO_SCENARIO_EVENTS.get(sid, ()):
+            if t_sim >= at_s:
+                self._demo_emit_event(key, message, t_sim)
 
         self._demo_price_multiplier = float(effects.get("price_multiplier", 1.0))
         self._demo_last_effects = effects
@@ -411,14 +524,30 @@ class DigitalTwinService:
     def get_current_thermal_state(self) -> ThermalTwinState:
         return self.therm_state
 
+    def snapshot_thermal_state(self) -> ThermalTwinState:
+        with self._state_lock:
+            return ThermalTwinState(T_c=float(self.therm_state.T_c), P_cool_kw=float(self.therm_state.P_cool_kw))
+
     # -----------------------------
     # Telemetry Generation
     # -----------------------------
-    def get_timeseries(self, window_s: int = 900, end_ts: Optional[str] = None, mode: str = "live") -> List[Dict[str, Any]]:
+    def get_timeseries(
+        self,
+        window_s: int = 900,
+        end_ts: Optional[str] = None,
+        mode: str = "live",
+        max_points: Optional[int] = None,
+        stat: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
         """
-        Generates telemetry. 
-        Mode 'live': uses seeded randomness + current state.
-        Mode 'replay': queries DB for decisions around the window to influence the "simulated" past.
+        Recorded tick telemetry over (end - window_s, end], oldest first, strided
+        down to `max_points` (the newest point always included). With `stat`
+        ("mean" | "min" | "max" | "last"), at most `max_points` aggregates from
+        the coarsest rollup tier that still yields them instead.
+        Mode 'live': the window ends now.
+        Mode 'replay': the window ends at `end_ts`.
+        Windows with nothing recorded (before the first tick, or older than the
+        ring's retention) fall back to `_synthetic_timeseries`.
         """
         now = datetime.now()
         if end_ts and mode == "replay":
@@ -428,6 +557,23 @@ class DigitalTwinService:
                 pass
 
         window_s = max(60, int(window_s))
+        start = now - timedelta(seconds=window_s)
+        if stat is not None:
+            points = self.telemetry.rollup(start, now, max_points or ROLLUP_MAX_POINTS, stat=stat)
+        else:
+            points = self.telemetry.window(start, now, max_points=max_points)
+        if points:
+            return points
+        return self._synthetic_timeseries(window_s, now, end_ts, mode)
+
+    def _synthetic_timeseries(
+        self, window_s: int, now: datetime, end_ts: Optional[str], mode: str
+    ) -> List[Dict[str, Any]]:
+        """
+        60 simulated points ending at `now`.
+        Mode 'live': uses seeded randomness + current state.
+        Mode 'replay': seed shifted by the replay end timestamp.
+        """
         num_points = 60
         step_size = max(1, window_s // num_points)
 
@@ -480,7 +626,7 @@ class DigitalTwinService:
 
             # Thermal prediction for this point (what-if history)
             sim_state = ThermalTwinState(T_c=temp, P_cool_kw=cooling)
-            sim_twin = ThermalTwin(self.therm_cfg, sim_state)
+            sim_twin = ThermalTwin(self.therm_cfg, sim_state, integrator=self.thermal_integrator)
             pred = sim_twin.predict(it_load, dt_s=float(step_size))
 
             temp = pred["rack_temp_c_next"]
@@ -545,42 +691,117 @@ class DigitalTwinService:
     # -----------------------------
     # Decisions
     # -----------------------------
-    def decide(
+    def _gnn_headroom_limit_kw(self, P_site_kw: float) -> Optional[float]:
+        """
+        If GNN is active, we ask it for the "safe headroom" so it can clamp the grid headroom.
+        This prevents the heuristic/static limit from being the only guardrail.
+        """
+        if not (self.gnn and self.gnn.is_ready()):
+            return None
+        try:
+             x_node = torch.zeros(33, 3)
+             x_node[:, 0] = torch.rand(33) * 0.2
+             x_node[:, 1] = x_node[:, 0] * 0.3
+             
+             # Inject current actual site load
+             dc_load_mw = P_site_kw / 1000.0
+             x_node[17, 0] = float(dc_load_mw)
+             
+             return self.gnn.predict_safe_shift_kw(x_node)
+        except Exception as e:
+            print(f"[WARN] GNN inference failed: {e}")
+            return None
+
+    @staticmethod
+    def _heuristic_confidence(plan: Any, approved_kw: float, deltaP_request_kw: float) -> float:
+        # Heuristic confidence for UI (until model provides it)
+        confidence = 0.85
+        if plan.blocked:
+            confidence = 0.4
+        elif abs(float(approved_kw)) + 1e-9 < abs(float(deltaP_request_kw)):
+            confidence = 0.65
+        if plan.constraint_value is not None and plan.constraint_threshold is not None:
+            try:
+                margin = float(plan.constraint_threshold) - float(plan.constraint_value)
+                if margin < 0:
+                    confidence = min(confidence, 0.35)
+                elif margin < 0.5:
+                    confidence = min(confidence, 0.55)
+                elif margin < 1.0:
+                    confidence = min(confidence, 0.7)
+            except Exception:
+                pass
+        return confidence
+
+    def _plan_ensemble(
+        self,
+        plan: Any,
+        pred: Optional[Dict[str, Any]],
+        state: ThermalTwinState,
+        P_site_kw: float,
+        horizon_s: int,
+        dt_s: int,
+        ramp_rate_kw_per_s: float,
+    ) -> Optional[Tuple[EnsembleResult, float]]:
+        """
+        (ensemble, confidence) from perturbed replays (see app.services.ensemble).
+        Approved plan: probability it keeps the rack under T_max. Thermal block:
+        probability that the ramp to the grid cap fails the thermal gate too.
+        None when disabled or no thermal outcome is in question (grid, wear
+        and deadline blocks).
+        """
+        if self.ensemble_members <= 0:
+            return None
+        if not plan.blocked:
+            profile = plan.columns.proposed_deltaP_kw
+        elif plan.reason == "THERMAL_BLOCKED" and pred:
+            steps_n = max(1, int(horizon_s // dt_s))
+            profile = ramp_profile(float(pred["grid_cap_kw"]), steps_n, dt_s, ramp_rate_kw_per_s)
+        else:
+            return None
+        result = run_ensemble(
+            P_site_kw,
+            self.therm_cfg,
+            state,
+            profile,
+            dt_s,
+            members=self.ensemble_members,
+            max_member_steps=self.ensemble_max_member_steps,
+            seed=self._demo_seed if self.deterministic else None,
+        )
+        confidence = result.p_under_t_max if not plan.blocked else 1.0 - result.p_within_margin
+        return result, confidence
+
+    def _evaluate_decision(
         self,
+        decision_id: str,
+        state: ThermalTwinState,
         deltaP_request_kw: float,
         P_site_kw: float,
         grid_headroom_kw: float,
-        horizon_s: int = 30,
-        dt_s: int = 1,
-        ramp_rate_kw_per_s: float = 50.0,
-    ) -> Dict[str, Any]:
+        gnn_limit_kw: Optional[float],
+        horizon_s: int,
+        dt_s: int,
+        ramp_rate_kw_per_s: float,
+        trace_level: str,
+        warm_start: Optional[Tuple[float, float]] = None,
+        plan_cache: Optional[PlanCache] = None,
+        verify_kw: Optional[float] = None,
+        deadline: Optional[float] = None,
+        verify_source: str = "frontier",
+    ) -> Tuple[Dict[str, Any], Any, float]:
         """
-        Runs the constraint pipeline.
-        Commits successful plans to persistent state.
+        Plans one request against `state` without side effects on the twin or DB.
+        Returns (response dict, RampPlan, confidence). Partial (deadline-cut)
+        plans are not cached. The confidence comes from the Monte Carlo
+        ensemble when enabled, else from `_heuristic_confidence`; a cache hit
+        reuses the entry's ensemble and confidence.
+        `verify_source` ("frontier" | "surrogate") names where `verify_kw` came
+        from; a verified surrogate hint reports `planner_surrogate` instead of
+        `planner_frontier`.
         """
-        decision_id = str(uuid.uuid4())
         trace: List[Dict[str, Any]] = []
 
-        # ==================================
-        # GNN HEADROOM CHECK
-        # ==================================
-        # If GNN is active, we ask it for the "safe headroom" and clamp the grid_headroom
-        # This prevents the heuristic/static limit from being the only guardrail.
-        gnn_limit_kw = None
-        if self.gnn and self.gnn.is_ready():
-            try:
-                 x_node = torch.zeros(33, 3)
-                 x_node[:, 0] = torch.rand(33) * 0.2
-                 x_node[:, 1] = x_node[:, 0] * 0.3
-                 
-                 # Inject current actual site load
-                 dc_load_mw = P_site_kw / 1000.0
-                 x_node[17, 0] = float(dc_load_mw)
-                 
-                 gnn_limit_kw = self.gnn.predict_safe_shift_kw(x_node)
-            except Exception as e:
-                print(f"[WARN] GNN inference failed: {e}")
-        
         effective_headroom = grid_headroom_kw
         if gnn_limit_kw is not None:
             # Check if GNN is stricter
@@ -599,27 +820,84 @@ class DigitalTwinService:
                     "decision_id": decision_id,
                 })
 
-        current_state = self.get_current_thermal_state()
-
-        approved_kw, plan, pred = build_ramp_plan(
-            P_site_kw=P_site_kw,
-            grid_headroom_kw=effective_headroom,
-            cfg=self.therm_cfg,
-            state=current_state,
-            deltaP_request_kw=deltaP_request_kw,
-            horizon_s=horizon_s,
-            dt_s=dt_s,
-            ramp_rate_kw_per_s=ramp_rate_kw_per_s,
-            trace_sink=trace,
-            decision_id=decision_id,
-        )
+        # Plan cache: identical (quantized) inputs reuse the previous search result;
+        # only decision_id and timestamps are new.
+        cache_key = None
+        cached: Optional[PlanCacheEntry] = None
+        if plan_cache is not None:
+            cfg_hash = config_hash(self.therm_cfg)
+            plan_cache.ensure_config(cfg_hash)
+            cache_key = plan_cache_key(
+                state=state,
+                P_site_kw=P_site_kw,
+                effective_headroom_kw=effective_headroom,
+                deltaP_request_kw=deltaP_request_kw,
+                horizon_s=horizon_s,
+                dt_s=dt_s,
+                ramp_rate_kw_per_s=ramp_rate_kw_per_s,
+                cfg_hash=cfg_hash,
+                trace_level=trace_level,
+            )
+            cached = plan_cache.get(cache_key)
+
+        ensemble: Optional[Tuple[EnsembleResult, float]] = None
+        if cached is not None:
+            approved_kw = cached.approved_kw
+            plan = cached.plan
+            plan_dump = cached.plan_dump
+            pred = dict(cached.prediction_debug) if cached.prediction_debug is not None else None
+            if cached.ensemble is not None and cached.confidence is not None:
+                ensemble = (cached.ensemble, cached.confidence)
+            ts_now = datetime.now().isoformat()
+            trace.extend({**e, "ts": ts_now, "decision_id": decision_id} for e in cached.trace)
+        else:
+            planner_trace: List[Dict[str, Any]] = []
+            approved_kw, plan, pred = build_ramp_plan(
+                P_site_kw=P_site_kw,
+                grid_headroom_kw=effective_headroom,
+                cfg=self.therm_cfg,
+                state=state,
+                deltaP_request_kw=deltaP_request_kw,
+                horizon_s=horizon_s,
+                dt_s=dt_s,
+                ramp_rate_kw_per_s=ramp_rate_kw_per_s,
+                trace_sink=planner_trace,
+                decision_id=decision_id,
+                trace_level=trace_level,
+                warm_start=warm_start,
+                verify_kw=verify_kw,
+                resolution=self.planner_resolution,
+                engine=self.planner_engine,
+                deadline=deadline,
+                prescreen=self.prescreen_enabled,
+                sensitivity=self.sensitivity_enabled or trace_level == "full",
+            )
+            plan_dump = plan.model_dump()
+            if isinstance(pred, dict):
+                from_surrogate = verify_source == "surrogate" and bool(pred.get("planner_frontier"))
+                pred["planner_surrogate"] = 1.0 if from_surrogate else 0.0
+                if from_surrogate:
+                    pred["planner_frontier"] = 0.0
+            ensemble = self._plan_ensemble(
+                plan, pred if isinstance(pred, dict) else None, state, P_site_kw, horizon_s, dt_s, ramp_rate_kw_per_s
+            )
+            if cache_key is not None and not (isinstance(pred, dict) and pred.get("planner_partial")):
+                plan_cache.put(
+                    cache_key,
+                    PlanCacheEntry(
+                        approved_kw=float(approved_kw),
+                        plan=plan,
+                        plan_dump=plan_dump,
+                        trace=planner_trace,
+                        prediction_debug=dict(pred) if isinstance(pred, dict) else None,
+                        ensemble=ensemble[0] if ensemble is not None else None,
+                        confidence=ensemble[1] if ensemble is not None else None,
+                    ),
+                )
+            trace.extend(planner_trace)
 
-        # PERSISTENT STATE UPDATE & DB LOGGING
-        # 1. Update Thermal State
-        if not plan.blocked and len(plan.steps) > 0:
-            first_step = plan.steps[0]
-            self.therm_state.T_c = first_step.rack_temp_c
-            self.therm_state.P_cool_kw = first_step.cooling_kw
+        if isinstance(pred, dict):
+            pred["plan_cache_hit"] = 1.0 if cached is not None else 0.0
 
         # Prepare output dictionary
         out = {
@@ -629,83 +907,324 @@ class DigitalTwinService:
             "approved_deltaP_kw": float(approved_kw),
             "blocked": bool(plan.blocked),
             "reason": str(plan.reason),
-            "plan": plan.model_dump() if hasattr(plan, "model_dump") else dict(plan),
+            "plan": dict(plan_dump),
             "trace": trace,
             "prediction_debug": pred if isinstance(pred, dict) else None,
         }
+        if ensemble is not None:
+            out["ensemble"] = ensemble[0].as_dict()
+            confidence = ensemble[1]
+        else:
+            out["ensemble"] = None
+            confidence = self._heuristic_confidence(plan, approved_kw, deltaP_request_kw)
+        out["confidence"] = float(confidence)
+        return out, plan, confidence
 
-        # Heuristic confidence for UI (until model provides it)
-        confidence = 0.85
-        if plan.blocked:
-            confidence = 0.4
-        elif abs(float(approved_kw)) + 1e-9 < abs(float(deltaP_request_kw)):
-            confidence = 0.65
-        if plan.constraint_value is not None and plan.constraint_threshold is not None:
-            try:
-                margin = float(plan.constraint_threshold) - float(plan.constraint_value)
-                if margin < 0:
-                    confidence = min(confidence, 0.35)
-                elif margin < 0.5:
-                    confidence = min(confidence, 0.55)
-                elif margin < 1.0:
-                    confidence = min(confidence, 0.7)
-            except Exception:
-                pass
-
-        # 2. Persist to DB
+    def _persist_decisions(self, rows: List[Tuple[Dict[str, Any], Any, float, float, float]]) -> None:
+        """
+        Writes decisions and their traces in a single transaction.
+        rows: (out, plan, confidence, P_site_kw, grid_headroom_kw)
+        """
         from sqlmodel import Session
         from app.models.db import engine, DecisionRecord, TraceRecord
 
         try:
             with Session(engine) as session:
-                # Create Decision Record
-                dr = DecisionRecord(
-                    decision_id=decision_id,
-                    ts=datetime.fromisoformat(out["ts"]),
-                    
-                    requested_kw=float(deltaP_request_kw),
-                    site_load_kw=float(P_site_kw),
-                    grid_headroom_kw=float(grid_headroom_kw),
-                    
-                    approved_kw=float(approved_kw),
-                    blocked=bool(plan.blocked),
-                    reason_code=str(plan.reason),
-                    confidence=float(confidence),
-                    
-                    primary_constraint=str(plan.primary_constraint.value) if plan.primary_constraint else None,
-                    constraint_value=float(plan.constraint_value) if plan.constraint_value is not None else None,
-                    constraint_threshold=float(plan.constraint_threshold) if plan.constraint_threshold is not None else None,
-                )
-                session.add(dr)
-                # Need to commit/refresh to get ID if needed, 
-                # but we can rely on relationship auto-persistence if we add traces to `dr` 
-                # or add them separately linked by `decision_id`
-                
-                # Bulk create traces
-                for e in trace:
-                    tr = TraceRecord(
+                for out, plan, confidence, P_site_kw, grid_headroom_kw in rows:
+                    decision_id = out["decision_id"]
+                    # Create Decision Record
+                    dr = DecisionRecord(
                         decision_id=decision_id,
-                        ts=datetime.fromisoformat(e["ts"]),
-                        component=str(e["component"]),
-                        rule_id=str(e["rule_id"]),
-                        status=str(e["status"]),
-                        severity=str(e["severity"]),
-                        message=str(e["message"]),
-                        value=float(e["value"]) if e.get("value") is not None else None,
-                        threshold=float(e["threshold"]) if e.get("threshold") is not None else None,
+                        ts=datetime.fromisoformat(out["ts"]),
+                        
+                        requested_kw=float(out["requested_deltaP_kw"]),
+                        site_load_kw=float(P_site_kw),
+                        grid_headroom_kw=float(grid_headroom_kw),
+                        
+                        approved_kw=float(out["approved_deltaP_kw"]),
+                        blocked=bool(plan.blocked),
+                        reason_code=str(plan.reason),
+                        confidence=float(confidence),
+                        
+                        primary_constraint=str(plan.primary_constraint.value) if plan.primary_constraint else None,
+                        constraint_value=float(plan.constraint_value) if plan.constraint_value is not None else None,
+                        constraint_threshold=float(plan.constraint_threshold) if plan.constraint_threshold is not None else None,
                     )
-                    session.add(tr)
+                    session.add(dr)
+                    
+                    # Bulk create traces (linked by `decision_id`)
+                    for e in out["trace"]:
+                        tr = TraceRecord(
+                            decision_id=decision_id,
+                            ts=datetime.fromisoformat(e["ts"]),
+                            component=str(e["component"]),
+                            rule_id=str(e["rule_id"]),
+                            status=str(e["status"]),
+                            severity=str(e["severity"]),
+                            message=str(e["message"]),
+                            value=float(e["value"]) if e.get("value") is not None else None,
+                            threshold=float(e["threshold"]) if e.get("threshold") is not None else None,
+                        )
+                        session.add(tr)
                 
                 session.commit()
         except Exception as ex:
             print(f"[ERROR] Failed to persist decision: {ex}")
 
+    def decide(
+        self,
+        deltaP_request_kw: float,
+        P_site_kw: float,
+        grid_headroom_kw: float,
+        horizon_s: int = 30,
+        dt_s: int = 1,
+        ramp_rate_kw_per_s: float = 50.0,
+        trace_level: Optional[str] = None,
+        deadline: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        Runs the constraint pipeline.
+        Commits successful plans to persistent state, unless the twin state
+        changed while planning (counted as `stale_commits`).
+        `trace_level` overrides the deployment default (TRACE_LEVEL env).
+        `deadline` (`time.perf_counter()` instant) bounds the planner search;
+        see `build_ramp_plan`.
+        """
+        decision_id = str(uuid.uuid4())
+        self._frontier_demand_at = time.monotonic()
+        gnn_limit_kw = self._gnn_headroom_limit_kw(P_site_kw)
+        state = self.snapshot_thermal_state()
+
+        bounds_key = (1 if deltaP_request_kw >= 0.0 else -1, float(ramp_rate_kw_per_s), int(horizon_s))
+        with self._state_lock:
+            warm_start = self._search_bounds.get(bounds_key) if self.warm_start_enabled else None
+        frontier_kw = self._frontier_hint(state, deltaP_request_kw, P_site_kw, horizon_s, dt_s, ramp_rate_kw_per_s)
+        surrogate_kw = None
+        if frontier_kw is None and self.surrogate is not None:
+            surrogate_kw = self.surrogate.hint_kw(
+                state, P_site_kw, deltaP_request_kw, ramp_rate_kw_per_s, horizon_s, dt_s, config_hash(self.therm_cfg)
+            )
+        verify_kw = frontier_kw if frontier_kw is not None else surrogate_kw
+
+        out, plan, confidence = self._evaluate_decision(
+            decision_id=decision_id,
+            state=state,
+            deltaP_request_kw=deltaP_request_kw,
+            P_site_kw=P_site_kw,
+            grid_headroom_kw=grid_headroom_kw,
+            gnn_limit_kw=gnn_limit_kw,
+            horizon_s=horizon_s,
+            dt_s=dt_s,
+            ramp_rate_kw_per_s=ramp_rate_kw_per_s,
+            trace_level=trace_level or self.trace_level,
+            warm_start=warm_start,
+            plan_cache=self.plan_cache,
+            verify_kw=verify_kw,
+            deadline=deadline,
+            verify_source="frontier" if frontier_kw is not None else "surrogate",
+        )
+        pred = out["prediction_debug"]
+        fresh = bool(pred) and pred.get("planner_candidates", 0.0) > 0.0 and not pred.get("plan_cache_hit")
+        partial = bool(pred) and bool(pred.get("planner_partial"))
+        screened = bool(pred) and bool(pred.get("planner_screen_blocked") or pred.get("planner_screen_safe"))
+        verified = bool(pred) and bool(pred.get("planner_frontier") or pred.get("planner_surrogate"))
+        with self._state_lock:
+            if partial:
+                self._deadline_partial += 1
+            if fresh:
+                self._count_screen(pred)
+            if fresh and frontier_kw is not None and not screened:
+                self._frontier_stats["hits" if verified else "verify_failed"] += 1
+            elif fresh:
+                self._frontier_stats["misses"] += 1
+            if fresh and frontier_kw is None and self.surrogate is not None and not screened:
+                outcome = "skipped" if surrogate_kw is None else "hits" if verified else "fallbacks"
+                self._surrogate_stats[outcome] += 1
+            # A verified plan (frontier or surrogate hint) did not bisect, so its bracket is no
+            # tighter than the hint's; a deadline-cut search is no tighter than the previous one.
+            if fresh and not verified and not partial:
+                self._search_bounds[bounds_key] = (float(pred["search_low_kw"]), float(pred["search_high_kw"]))
+
+            # PERSISTENT STATE UPDATE & DB LOGGING
+            # 1. Update Thermal State, only if nothing (e.g. a tick) moved the twin since the
+            #    snapshot: a first step computed from the old state would overwrite that update.
+            if not plan.blocked and len(plan.columns) > 0:
+                if self.therm_state.T_c == state.T_c and self.therm_state.P_cool_kw == state.P_cool_kw:
+                    self.therm_state.T_c = float(plan.columns.rack_temp_c[0])
+                    self.therm_state.P_cool_kw = float(plan.columns.cooling_kw[0])
+                else:
+                    self._stale_commits += 1
+
+        # 2. Persist to DB
+        self._persist_decisions([(out, plan, confidence, P_site_kw, grid_headroom_kw)])
+
         # Persist trace to memory buffer (for immediate UI view)
-        for e in trace:
+        for e in out["trace"]:
             self.push_trace(DecisionTraceEvent(**e))
 
         return out
 
+    def decide_batch(
+        self,
+        requests: List[Dict[str, Any]],
+        trace_level: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Evaluates many candidate shifts against ONE snapshot of the thermal state.
+
+        - The twin state is not committed (the requests are alternatives, not a sequence).
+        - GNN headroom is inferred once per distinct site load.
+        - Requests sharing (sign, site load, horizon, dt, ramp rate) warm-start each other,
+          largest first; identical requests are answered from the plan cache.
+        - All decisions are persisted in one transaction.
+        Results are returned in request order.
+        """
+        snapshot = self.snapshot_thermal_state()
+        level = trace_level or self.trace_level
+        cache = self.plan_cache or PlanCache(maxsize=max(1, len(requests)), ttl_s=3600.0)
+
+        gnn_limits: Dict[float, Optional[float]] = {}
+        group_bounds: Dict[Tuple[Any, ...], Tuple[float, float]] = {}
+        results: List[Optional[Tuple[Dict[str, Any], Any, float, float, float]]] = [None] * len(requests)
+
+        order = sorted(range(len(requests)), key=lambda i: -abs(float(requests[i]["deltaP_request_kw"])))
+        for i in order:
+            r = requests[i]
+            P_site_kw = float(r["P_site_kw"])
+            horizon_s = int(r.get("horizon_s", 30))
+            dt_s = int(r.get("dt_s", 1))
+            ramp = float(r.get("ramp_rate_kw_per_s", 50.0))
+            req_kw = float(r["deltaP_request_kw"])
+            if P_site_kw not in gnn_limits:
+                gnn_limits[P_site_kw] = self._gnn_headroom_limit_kw(P_site_kw)
+
+            group = (1 if req_kw >= 0.0 else -1, P_site_kw, horizon_s, dt_s, ramp)
+            out, plan, confidence = self._evaluate_decision(
+                decision_id=str(uuid.uuid4()),
+                state=snapshot,
+                deltaP_request_kw=req_kw,
+                P_site_kw=P_site_kw,
+                grid_headroom_kw=float(r["grid_headroom_kw"]),
+                gnn_limit_kw=gnn_limits[P_site_kw],
+                horizon_s=horizon_s,
+                dt_s=dt_s,
+                ramp_rate_kw_per_s=ramp,
+                trace_level=level,
+                warm_start=group_bounds.get(group),
+                plan_cache=cache,
+            )
+            pred = out["prediction_debug"]
+            if pred and pred.get("planner_candidates", 0.0) > 0.0 and not pred.get("plan_cache_hit"):
+                group_bounds[group] = (float(pred["search_low_kw"]), float(pred["search_high_kw"]))
+                with self._state_lock:
+                    self._count_screen(pred)
+            results[i] = (out, plan, confidence, P_site_kw, float(r["grid_headroom_kw"]))
+
+        rows = [row for row in results if row is not None]
+        self._persist_decisions(rows)
+        for out, *_ in rows:
+            for e in out["trace"]:
+                self.push_trace(DecisionTraceEvent(**e))
+
+        return {
+            "ts": datetime.now().isoformat(),
+            "snapshot": {"T_c": float(snapshot.T_c), "P_cool_kw": float(snapshot.P_cool_kw)},
+            "items": [row[0] for row in rows],
+        }
+
+    def _count_screen(self, pred: Dict[str, float]) -> None:
+        # Caller holds _state_lock; pred is a freshly planned (not cached) decision.
+        if pred.get("planner_screen_blocked"):
+            self._screen_stats["blocked"] += 1
+        elif pred.get("planner_screen_safe"):
+            self._screen_stats["safe"] += 1
+        else:
+            self._screen_stats["searched"] += 1
+
+    def get_planner_metrics(self) -> Dict[str, Any]:
+        """
+        Planner-side counters for `/decision/metrics`.
+        """
+        frontier = self._frontier
+        return {
+            "plan_cache": self.plan_cache.stats() if self.plan_cache is not None else None,
+            "frontier": {
+                **{k: float(v) for k, v in self._frontier_stats.items()},
+                "compute_ms": float(frontier.compute_ms) if frontier is not None else None,
+            }
+            if self.frontier_enabled
+            else None,
+            "deadline_partial": float(self._deadline_partial),
+            "stale_commits": float(self._stale_commits),
+            "prescreen": {k: float(v) for k, v in self._screen_stats.items()} if self.prescreen_enabled else None,
+            "surrogate": self._surrogate_metrics() if self.surrogate is not None else None,
+        }
+
+    def _surrogate_metrics(self) -> Dict[str, Any]:
+        stats = {k: float(v) for k, v in self._surrogate_stats.items()}
+        consulted = sum(stats.values())
+        return {
+            **stats,
+            "hit_rate": stats["hits"] / consulted if consulted else None,
+            "fallback_rate": stats["fallbacks"] / consulted if consulted else None,
+            "rmse_kw": self.surrogate.rmse_kw,
+            "samples": float(self.surrogate.samples),
+        }
+
+    # -----------------------------
+    # Feasibility Frontier
+    # -----------------------------
+    async def refresh_frontier(self) -> Optional[FeasibilityFrontier]:
+        """
+        Recomputes the feasibility frontier from the current state and site load.
+        Runs in a worker thread; the result is discarded by `_frontier_hint` if a
+        decision moved the state meanwhile. Skipped (the current frontier is
+        returned) when it still matches the state, site load and config, or when
+        nothing asked for a frontier within `frontier_idle_s`.
+        """
+        if not self.frontier_enabled or self._latest is None:
+            return None
+        state = self.snapshot_thermal_state()
+        P_site_kw = float(self._latest["total_load_kw"])
+        cfg_hash = config_hash(self.therm_cfg)
+        frontier = self._frontier
+        demand_at = self._frontier_demand_at
+        idle = self.frontier_idle_s > 0 and (
+            demand_at is None or time.monotonic() - demand_at > self.frontier_idle_s
+        )
+        if idle or (frontier is not None and frontier.matches(state, P_site_kw, cfg_hash, frontier.dt_s)):
+            with self._state_lock:
+                self._frontier_stats["refresh_skipped"] += 1
+            return frontier
+        self._frontier = await asyncio.to_thread(compute_frontier, self.therm_cfg, state, P_site_kw, cfg_hash)
+        with self._state_lock:
+            self._frontier_stats["refreshes"] += 1
+        return self._frontier
+
+    def get_frontier(self) -> Optional[Dict[str, Any]]:
+        self._frontier_demand_at = time.monotonic()
+        return self._frontier.to_dict() if self._frontier is not None else None
+
+    def _frontier_hint(
+        self,
+        state: ThermalTwinState,
+        deltaP_request_kw: float,
+        P_site_kw: float,
+        horizon_s: int,
+        dt_s: int,
+        ramp_rate_kw_per_s: float,
+    ) -> Optional[float]:
+        """
+        Signed known-feasible deltaP for this request, if the frontier applies to it.
+        """
+        frontier = self._frontier
+        if frontier is None or not frontier.matches(state, P_site_kw, config_hash(self.therm_cfg), dt_s):
+            return None
+        hit = frontier.lookup(deltaP_request_kw, ramp_rate_kw_per_s, horizon_s)
+        if hit is None or hit[0] <= 0.0:
+            return None
+        return math.copysign(hit[0], deltaP_request_kw)
+
     # -----------------------------
     # Tick Loop (Background Sim)
     # -----------------------------
@@ -716,30 +1235,28 @@ class DigitalTwinService:
         Made async to prevent GNN inference from blocking the event loop.
         """
         # 1. Simulate a random walk for IT load if no decision is active
-        # (For this demo, we assume a fluctuating base load around 1000kW)
-        base_load = 1000.0
-        # Simple random fluctuation
-        current_load = base_load + self._rng.uniform(-20, 20)
+        current_load = self._tick_load_kw(self._rng)
 
         demo_effects = self._demo_effects()
         if demo_effects:
             current_load += float(demo_effects.get("load_delta_kw", 0.0))
         
         # 2. Evolve Thermal State
-        cfg = self.therm_cfg
-        if demo_effects:
-            try:
-                cfg = self.therm_cfg.model_copy(deep=True)
-            except Exception:
-                try:
-                    cfg = ThermalTwinConfig(**self.therm_cfg.model_dump())
-                except Exception:
-                    cfg = ThermalTwinConfig(**self.therm_cfg.dict())
-            cfg.T_ambient = float(cfg.T_ambient) + float(demo_effects.get("ambient_delta_c", 0.0))
-            cfg.Cooling_COP = float(cfg.Cooling_COP) * float(demo_effects.get("cooling_cop_scale", 1.0))
-        twin = ThermalTwin(cfg, self.therm_state)
+        cfg = demo_scenario_config(self.therm_cfg, demo_effects) if demo_effects else self.therm_cfg
+        twin = ThermalTwin(cfg, self.therm_state, integrator=self.thermal_integrator)
         # We step the twin forward by dt_s
-        pred = twin.step(P_it_kw=current_load, dt_s=dt_s)
+        with self._state_lock:
+            T_prev_c = self.therm_state.T_c
+            pred = twin.step(P_it_kw=current_load, dt_s=dt_s)
+        if self.calibrator is not None:
+            if demo_effects:
+                # Scenario ticks run on a scaled COP and ambient, not the plant's own physics.
+                self.calibrator.skipped += 1
+            else:
+                self.calibrator.update(
+                    current_load, self.therm_state.P_cool_kw, T_prev_c, self.therm_state.T_c, dt_s, cfg.T_ambient
+                )
+                self._maybe_apply_calibration()
         self._last_thermal_debug = {
             "q_passive_kw": float(pred.get("q_passive_kw", 0.0)),
             "q_active_kw": float(pred.get("q_active_kw", 0.0)),
@@ -752,6 +1269,7 @@ class DigitalTwinService:
             current_load,
             demo_effects=demo_effects,
         )
+        self.telemetry.append(self._latest)
         
         # self.therm_state is updated in-place by twin.step
         
@@ -760,6 +1278,131 @@ class DigitalTwinService:
         
         return self.therm_state
 
+    def _maybe_apply_calibration(self) -> None:
+        """
+        Every `calibration_apply_s` samples, swaps tightly fitted parameters into
+        `therm_cfg` (a new config hash: cached plans and the frontier go stale).
+        Not called while a demo scenario runs: its ticks are not fitted at all.
+        """
+        cal = self.calibrator
+        if not self.calibration_apply_s or cal.samples - self._calibration_applied_at < self.calibration_apply_s:
+            return
+        self._calibration_applied_at = cal.samples
+        # Fitted values are relative to the config the calibrator started from.
+        cfg = cal.result().apply(cal.cfg)
+        if cfg != self.therm_cfg:
+            self.therm_cfg = cfg
+
+    def get_calibration(self) -> Optional[CalibrationResult]:
+        """
+        Current fitted thermal parameters, or None when calibration is disabled.
+        """
+        return self.calibrator.result() if self.calibrator is not None else None
+
+    @staticmethod
+    def _tick_load_kw(rng: random.Random) -> float:
+        # For this demo, we assume a fluctuating base load around 1000kW
+        base_load = 1000.0
+        # Simple random fluctuation
+        return base_load + rng.uniform(-20, 20)
+
+    @staticmethod
+    def _grid_signal(rng: random.Random, demo_effects: Optional[Dict[str, float]]) -> Tuple[float, float, bool]:
+        """
+        (frequency Hz, stress score, dip) for one tick.
+        """
+        base_freq = 60.0
+        # Occasional random dip logic (1% chance per second)
+        dip = (rng.random() < 0.01)
+        freq = (base_freq - 0.15 + rng.uniform(-0.02, 0.02)) if dip else (base_freq + rng.uniform(-0.02, 0.02))
+        if demo_effects:
+            freq += float(demo_effects.get("freq_bias_hz", 0.0))
+        stress = 0.85 if dip else 0.10
+        return freq, stress, dip
+
+    def fast_forward(
+        self,
+        duration_s: float,
+        dt_s: float = 1.0,
+        sample_every_s: float = 60.0,
+        scenario_id: Optional[str] = None,
+        scenario_speed: float = 1.0,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        What-if run of the tick loop, as fast as the CPU allows.
+
+        Clones the thermal state, the tick RNG and the running demo scenario
+        (or, with `scenario_id`, starts that scenario at t=0 on the clone), then
+        runs `duration_s` simulated seconds of `tick` physics back to back.
+        Yields one point per `sample_every_s`: window means for load and
+        frequency, the window's peak rack temperature and the end state.
+        The live twin, RNG and scenario are never touched. With the same RNG
+        state, the points follow exactly what the live loop would do tick by tick.
+        """
+        if scenario_id is not None and scenario_id not in DEMO_SCENARIO_EVENTS:
+            raise ValueError("unknown scenario")
+        dt = float(dt_s)
+        n_ticks = max(1, int(round(float(duration_s) / dt)))
+        every = max(1, int(round(float(sample_every_s) / dt)))
+
+        with self._state_lock:
+            state = TwinState(self.therm_state.T_c, self.therm_state.P_cool_kw)
+            rng = random.Random()
+            rng.setstate(self._rng.getstate())
+        scenario = self._demo_scenario
+        if scenario_id is not None:
+            durations = {s["id"]: float(s["duration_s"]) for s in self.list_demo_scenarios()}
+            sid, t0, speed, duration = scenario_id, 0.0, max(0.1, min(20.0, float(scenario_speed))), durations[scenario_id]
+        elif scenario is not None:
+            t0 = (datetime.now() - scenario.start_ts).total_seconds() * scenario.speed
+            sid, speed, duration = scenario.scenario_id, scenario.speed, float(scenario.duration_s)
+        else:
+            sid, t0, speed, duration = None, 0.0, 1.0, 0.0
+
+        start = datetime.now()
+        nominal = ThermalTwin(self.therm_cfg, state, integrator=self.thermal_integrator)
+        pred = ThermalPrediction()
+        load_sum = cool_sum = freq_sum = 0.0
+        temp_peak = -math.inf
+        window = 0
+        for k in range(n_ticks):
+            t_sim = t0 + k * dt * speed
+            if sid is not None and t_sim >= duration:
+                sid = None
+            effects = demo_scenario_effects(sid, t_sim) if sid is not None else None
+
+            load = self._tick_load_kw(rng)
+            twin = nominal
+            if effects:
+                load += float(effects["load_delta_kw"])
+                twin = ThermalTwin(demo_scenario_config(self.therm_cfg, effects), state, integrator=self.thermal_integrator)
+            twin.step_into(load, dt, pred)
+            freq, _, _ = self._grid_signal(rng, effects)
+
+            window += 1
+            load_sum += load
+            cool_sum += state.P_cool_kw
+            freq_sum += freq
+            temp_peak = max(temp_peak, pred.rack_temp_c_peak if pred.rack_temp_c_peak is not None else state.T_c)
+            if window == every or k + 1 == n_ticks:
+                elapsed_s = (k + 1) * dt
+                yield {
+                    "ts": (start + timedelta(seconds=elapsed_s)).isoformat(),
+                    "t_sim_s": elapsed_s,
+                    "it_load_kw": load_sum / window,
+                    "total_load_kw": (load_sum + cool_sum) / window,
+                    "frequency_hz": freq_sum / window,
+                    "rack_temp_c": float(state.T_c),
+                    "rack_temp_c_max": float(temp_peak),
+                    "cooling_kw": float(state.P_cool_kw),
+                    "thermal_ok": bool(temp_peak < self.therm_cfg.T_max),
+                    "price_usd_per_mwh": 60.0 * float(effects["price_multiplier"]) if effects else 60.0,
+                    "scenario_id": sid,
+                }
+                load_sum = cool_sum = freq_sum = 0.0
+                temp_peak = -math.inf
+                window = 0
+
     async def _compute_latest_telemetry_point_async(
         self, current_load: float, demo_effects: Optional[Dict[str, float]] = None
     ) -> Dict[str, Any]:
@@ -770,13 +1413,7 @@ class DigitalTwinService:
         now = datetime.now()
         
         # 1. Frequency (Synthesize simple noise/dip based on random)
-        base_freq = 60.0
-        # Occasional random dip logic (1% chance per second)
-        dip = (self._rng.random() < 0.01)
-        freq = (base_freq - 0.15 + self._rng.uniform(-0.02, 0.02)) if dip else (base_freq + self._rng.uniform(-0.02, 0.02))
-        if demo_effects:
-            freq += float(demo_effects.get("freq_bias_hz", 0.0))
-        stress = 0.85 if dip else 0.10
+        freq, stress, dip = self._grid_signal(self._rng, demo_effects)
         rocof = 0.0 # simplified for single point
         
         # 2. Carbon
@@ -0,0 +1,160 @@
+"""
+ensemble.py
+
+Purpose:
+  Monte Carlo confidence for a ramp plan: replays the plan's deltaP profile
+  through N perturbed twins and reports how often the rack stays under T_max,
+  with percentile temperature bands over the horizon.
+
+Method:
+  - The members are one `ThermalTwinBatch` (one element per member), so the
+    whole ensemble advances with one array pass per step.
+  - Each member draws its own passive transfer coefficient K_transfer, cooling
+    COP (both multiplicative, truncated normal) and ambient temperature
+    (additive); every step adds independent multiplicative noise on the site
+    load. Everything else (controller, limits, coolant mass) is the nominal
+    configuration.
+  - The IT load follows `simulate_profile`: P_it = max(P_site - deltaP - P_cool, 0).
+
+Cost:
+  - Dominated by the per-step array pass, so long horizons cost more whatever
+    the member count. `max_member_steps` caps members x steps: past it the
+    ensemble shrinks (never below ENSEMBLE_MIN_MEMBERS), which keeps a 300 s
+    horizon in the same range as the planner search itself.
+
+Invariant:
+  - Read-only: the twin state is copied into the batch, never written back.
+  - A fixed seed gives the same result (deterministic demos).
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from app.models.domain import ThermalTwinConfig, ThermalTwinState
+from app.services.physics_engine import ThermalTwinBatch
+
+
+# Members per ensemble (small enough to run inline on every decision).
+ENSEMBLE_MEMBERS = 256
+# Work budget (members x steps): the full ensemble up to a 60-step horizon.
+ENSEMBLE_MAX_MEMBER_STEPS = ENSEMBLE_MEMBERS * 60
+# Floor of the budget cut, so the percentile bands stay meaningful.
+ENSEMBLE_MIN_MEMBERS = 32
+# Percentiles (%) of the temperature bands.
+ENSEMBLE_PERCENTILES: Tuple[float, ...] = (5.0, 50.0, 95.0)
+# The planner's thin-margin gate (C below T_max).
+ENSEMBLE_MARGIN_C = 0.5
+# Perturbation factors are truncated at this fraction of nominal so draws stay physical.
+ENSEMBLE_MIN_FACTOR = 0.2
+
+
+@dataclass
+class EnsembleSpread:
+    """
+    One-sigma perturbations: relative for K_transfer, COP and site load
+    (per step), absolute (C) for the ambient temperature.
+    """
+    K_transfer_rel: float = 0.10
+    cop_rel: float = 0.10
+    ambient_c: float = 1.0
+    load_rel: float = 0.02
+
+
+@dataclass
+class EnsembleResult:
+    """
+    `p_under_t_max`: fraction of members below T_max at every step.
+    `p_within_margin`: fraction also clearing the planner's thin-margin gate.
+    `temp_bands_c`: (len(percentiles), steps) temperature percentiles per step.
+    `peak_temp_c`: the same percentiles of each member's peak temperature.
+    """
+    members: int
+    p_under_t_max: float
+    p_within_margin: float
+    percentiles: Tuple[float, ...]
+    temp_bands_c: np.ndarray
+    peak_temp_c: np.ndarray
+
+    def as_dict(self) -> Dict[str, Any]:
+        bands = {f"p{p:g}": row.tolist() for p, row in zip(self.percentiles, self.temp_bands_c)}
+        peaks = {f"p{p:g}": float(v) for p, v in zip(self.percentiles, self.peak_temp_c)}
+        return {
+            "members": self.members,
+            "p_under_t_max": self.p_under_t_max,
+            "p_within_margin": self.p_within_margin,
+            "temp_bands_c": bands,
+            "peak_temp_c": peaks,
+        }
+
+
+def _factors(rng: np.random.Generator, sigma: float, size: Any) -> np.ndarray:
+    return np.maximum(ENSEMBLE_MIN_FACTOR, 1.0 + sigma * rng.standard_normal(size))
+
+
+def run_ensemble(
+    P_site_kw: float,
+    cfg: ThermalTwinConfig,
+    state: ThermalTwinState,
+    profile_kw: np.ndarray,
+    dt_s: float,
+    members: int = ENSEMBLE_MEMBERS,
+    spread: Optional[EnsembleSpread] = None,
+    seed: Optional[int] = None,
+    percentiles: Tuple[float, ...] = ENSEMBLE_PERCENTILES,
+    max_member_steps: Optional[int] = ENSEMBLE_MAX_MEMBER_STEPS,
+) -> EnsembleResult:
+    """
+    Replays one deltaP trajectory (shape (steps,)) through `members` perturbed
+    twins, fewer when members x steps exceeds `max_member_steps` (None: no cap).
+    See the module docstring.
+    """
+    spread = spread or EnsembleSpread()
+    profile = np.asarray(profile_kw, dtype=float).reshape(-1)
+    steps_n = profile.size
+    n = max(1, int(members))
+    if max_member_steps is not None and steps_n > 0 and n * steps_n > max_member_steps:
+        n = min(n, max(ENSEMBLE_MIN_MEMBERS, int(max_member_steps) // steps_n))
+    dt = float(dt_s)
+    rng = np.random.default_rng(seed)
+
+    batch = ThermalTwinBatch(
+        cfg,
+        np.full(n, float(state.T_c)),
+        float(state.P_cool_kw),
+        K_transfer=float(cfg.K_transfer) * _factors(rng, spread.K_transfer_rel, n),
+        Cooling_COP=float(cfg.Cooling_COP) * _factors(rng, spread.cop_rel, n),
+        T_ambient=float(cfg.T_ambient) + spread.ambient_c * rng.standard_normal(n),
+    )
+    site_kw = float(P_site_kw) * _factors(rng, spread.load_rel, (steps_n, n))
+
+    temps = np.empty((steps_n, n))
+    for i in range(steps_n):
+        P_it = np.maximum(site_kw[i] - profile[i] - batch.P_cool_kw, 0.0)
+        temps[i] = batch.step(P_it, dt)["rack_temp_c_next"]
+
+    if steps_n == 0:
+        peak = np.full(n, float(state.T_c))
+        bands = np.zeros((len(percentiles), 0))
+    else:
+        peak = temps.max(axis=0)
+        bands = np.percentile(temps, percentiles, axis=1)
+    T_max = float(cfg.T_max)
+    return EnsembleResult(
+        members=n,
+        p_under_t_max=float(np.mean(peak < T_max)),
+        p_within_margin=float(np.mean(peak < T_max - ENSEMBLE_MARGIN_C)),
+        percentiles=tuple(float(p) for p in percentiles),
+        temp_bands_c=bands,
+        peak_temp_c=np.percentile(peak, percentiles),
+    )
+
+
+def ramp_profile(deltaP_kw: float, steps_n: int, dt_s: float, ramp_rate_kw_per_s: float) -> np.ndarray:
+    """
+    Constant-rate ramp toward `deltaP_kw` (the planner's candidate shape).
+    """
+    reach = (np.arange(int(steps_n)) + 1.0) * float(ramp_rate_kw_per_s) * float(dt_s)
+    return np.copysign(np.minimum(reach, abs(float(deltaP_kw))), float(deltaP_kw))
@@ -0,0 +1,206 @@
+"""
+frontier.py
+
+Purpose:
+  Precomputes the feasibility frontier of the ramp planner: the largest safe
+  export and import magnitude for a grid of ramp rates and horizons, from one
+  thermal state and site load.
+
+Usage:
+  - The tick loop refreshes the frontier after each physics step.
+  - `/decision/latest` takes the frontier value as a hint (`verify_kw`) so the
+    planner runs one verification simulation instead of a bisection.
+  - `GET /decision/frontier` exposes it read-only, so UIs do not need to probe
+    with trial decisions.
+
+Method:
+  - Every candidate is simulated over the LONGEST horizon of the grid. A
+    candidate is feasible for horizon h iff its first failing step is at or
+    after h/dt, so one rollout answers every horizon at once.
+  - All signs and ramp rates go through a single `simulate_candidates` call per
+    pass: a coarse pass over [0, cap], then refinement passes inside each
+    cell's (feasible, infeasible) bracket.
+
+Invariant:
+  - Frontier values are hints. Decisions always re-simulate before approving.
+"""
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.models.domain import BatteryDegradationConfig, ThermalTwinConfig, ThermalTwinState
+from app.services.policy_engine import simulate_candidates
+
+
+FRONTIER_RAMP_RATES_KW_PER_S: Tuple[float, ...] = (25.0, 50.0, 100.0, 200.0)
+FRONTIER_HORIZONS_S: Tuple[int, ...] = (15, 30, 60, 120)
+FRONTIER_DT_S = 1
+
+# Coarse candidates per (sign, ramp rate) and refinement candidates per cell.
+# 32 x 9 x 9 narrows each bracket to ~4e-4 of the cap.
+FRONTIER_COARSE_CANDIDATES = 32
+FRONTIER_REFINE_CANDIDATES = 8
+FRONTIER_REFINE_PASSES = 2
+
+# A frontier is only used for requests made from (almost) the state it was computed from.
+FRONTIER_T_TOL_C = 0.01
+FRONTIER_P_COOL_TOL_KW = 1.0
+FRONTIER_P_SITE_TOL_KW = 1.0
+
+
+@dataclass
+class FeasibilityFrontier:
+    """
+    Largest feasible magnitudes (kW), shaped (ramp rate, horizon), per direction.
+    `*_bound_kw` is the smallest magnitude found infeasible (or the cap).
+    """
+    ts: str
+    T_c: float
+    P_cool_kw: float
+    P_site_kw: float
+    dt_s: int
+    cfg_hash: str
+    ramp_rates_kw_per_s: Tuple[float, ...]
+    horizons_s: Tuple[int, ...]
+    export_kw: np.ndarray
+    export_bound_kw: np.ndarray
+    import_kw: np.ndarray
+    import_bound_kw: np.ndarray
+    candidates: int
+    compute_ms: float
+
+    def matches(self, state: ThermalTwinState, P_site_kw: float, cfg_hash: str, dt_s: int) -> bool:
+        return (
+            self.cfg_hash == cfg_hash
+            and int(dt_s) == self.dt_s
+            and abs(float(state.T_c) - self.T_c) <= FRONTIER_T_TOL_C
+            and abs(float(state.P_cool_kw) - self.P_cool_kw) <= FRONTIER_P_COOL_TOL_KW
+            and abs(float(P_site_kw) - self.P_site_kw) <= FRONTIER_P_SITE_TOL_KW
+        )
+
+    def lookup(
+        self, deltaP_request_kw: float, ramp_rate_kw_per_s: float, horizon_s: int
+    ) -> Optional[Tuple[float, float]]:
+        """
+        Returns (feasible_kw, infeasible_kw) magnitudes, or None when off-grid.
+
+        Ramp rates must match a grid value. Off-grid horizons use the next
+        longer grid horizon: a plan safe for longer is safe for shorter.
+        """
+        try:
+            r = self.ramp_rates_kw_per_s.index(float(ramp_rate_kw_per_s))
+        except ValueError:
+            return None
+        longer = [h for h, hs in enumerate(self.horizons_s) if hs >= int(horizon_s)]
+        if not longer:
+            return None
+        h = longer[0]
+        if deltaP_request_kw >= 0.0:
+            return float(self.export_kw[r, h]), float(self.export_bound_kw[r, h])
+        return float(self.import_kw[r, h]), float(self.import_bound_kw[r, h])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "ts": self.ts,
+            "state": {"T_c": self.T_c, "P_cool_kw": self.P_cool_kw},
+            "P_site_kw": self.P_site_kw,
+            "dt_s": self.dt_s,
+            "ramp_rates_kw_per_s": list(self.ramp_rates_kw_per_s),
+            "horizons_s": list(self.horizons_s),
+            "max_export_kw": self.export_kw.tolist(),
+            "max_import_kw": self.import_kw.tolist(),
+            "candidates": self.candidates,
+            "compute_ms": self.compute_ms,
+        }
+
+
+def compute_frontier(
+    cfg: ThermalTwinConfig,
+    state: ThermalTwinState,
+    P_site_kw: float,
+    cfg_hash: str,
+    ramp_rates_kw_per_s: Sequence[float] = FRONTIER_RAMP_RATES_KW_PER_S,
+    horizons_s: Sequence[int] = FRONTIER_HORIZONS_S,
+    dt_s: int = FRONTIER_DT_S,
+    batt_cfg: Optional[BatteryDegradationConfig] = None,
+) -> FeasibilityFrontier:
+    t0 = time.perf_counter()
+    ramps = np.asarray(ramp_rates_kw_per_s, dtype=float)
+    horizon_steps = np.maximum(1, np.asarray(horizons_s, dtype=int) // int(dt_s))
+    steps_n = int(horizon_steps.max())
+    signs = np.array([1.0, -1.0])
+    caps = np.array([float(cfg.max_export_kw), float(cfg.max_import_kw)])
+    n_s, n_r, n_h = signs.size, ramps.size, horizon_steps.size
+
+    low = np.zeros((n_s, n_r, n_h))
+    high = np.broadcast_to(caps[:, None, None], (n_s, n_r, n_h)).copy()
+    candidates = 0
+
+    # Coarse pass: cap/n .. cap per (sign, ramp rate), shared by every horizon.
+    n = FRONTIER_COARSE_CANDIDATES
+    s_idx, r_idx, k_idx = np.meshgrid(np.arange(n_s), np.arange(n_r), np.arange(1, n + 1), indexing="ij")
+    s_idx, r_idx = s_idx.ravel(), r_idx.ravel()
+    mags = caps[s_idx] * k_idx.ravel() / n
+
+    for pass_i in range(FRONTIER_REFINE_PASSES + 1):
+        if mags.size == 0:
+            break
+        rollout = simulate_candidates(
+            P_site_kw=P_site_kw,
+            cfg=cfg,
+            state=state,
+            desired_kw=signs[s_idx] * mags,
+            steps_n=steps_n,
+            dt_s=float(dt_s),
+            ramp_rate_kw_per_s=ramps[r_idx],
+            batt_cfg=batt_cfg,
+        )
+        candidates += int(mags.size)
+        ok = rollout.fail_step[:, None] >= horizon_steps[None, :]
+
+        for s in range(n_s):
+            for r in range(n_r):
+                sel = (s_idx == s) & (r_idx == r)
+                m, ok_sr = mags[sel], ok[sel]
+                for h in range(n_h):
+                    feasible = m[ok_sr[:, h]]
+                    if feasible.size:
+                        low[s, r, h] = max(low[s, r, h], float(feasible.max()))
+                    above = m[~ok_sr[:, h] & (m > low[s, r, h])]
+                    if above.size:
+                        high[s, r, h] = min(high[s, r, h], float(above.min()))
+                    high[s, r, h] = max(high[s, r, h], low[s, r, h])
+
+        if pass_i == FRONTIER_REFINE_PASSES:
+            break
+        # Refinement: interior points of every cell whose bracket is still open.
+        n = FRONTIER_REFINE_CANDIDATES
+        open_cells = np.argwhere(high - low > 1e-9)
+        frac = np.arange(1, n + 1) / (n + 1)
+        s_idx = np.repeat(open_cells[:, 0], n)
+        r_idx = np.repeat(open_cells[:, 1], n)
+        lo_c = low[open_cells[:, 0], open_cells[:, 1], open_cells[:, 2]]
+        hi_c = high[open_cells[:, 0], open_cells[:, 1], open_cells[:, 2]]
+        mags = (lo_c[:, None] + (hi_c - lo_c)[:, None] * frac[None, :]).ravel()
+
+    return FeasibilityFrontier(
+        ts=datetime.now().isoformat(),
+        T_c=float(state.T_c),
+        P_cool_kw=float(state.P_cool_kw),
+        P_site_kw=float(P_site_kw),
+        dt_s=int(dt_s),
+        cfg_hash=cfg_hash,
+        ramp_rates_kw_per_s=tuple(float(r) for r in ramps),
+        horizons_s=tuple(int(h) for h in horizons_s),
+        export_kw=low[0],
+        export_bound_kw=high[0],
+        import_kw=low[1],
+        import_bound_kw=high[1],
+        candidates=candidates,
+        compute_ms=(time.perf_counter() - t0) * 1000.0,
+    )
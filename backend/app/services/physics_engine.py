@@ -23,10 +23,25 @@ Simplified vs. Realistic:
 Safety Thresholds:
   - `T_max`: Absolute maximum safe temperature (default 50°C).
   - `Cooling_Ramp_Max`: Mechanical constraint on chiller spool-up.
+
+Integrators:
+  - "euler" (default): one explicit step with the controller sampled once per
+    step. Accurate and stable only for dt of about a second.
+  - "exponential": exact piecewise solution of the continuous-time twin
+    (controller acting continuously), for coarse steps of 10-60 s.
+
+Sensitivities:
+  - `ThermalTwin.tangent_step` / `deltaP_sensitivity` carry forward-mode
+    derivatives dT/d(deltaP) through the Euler step, branch by branch.
 """
 from __future__ import annotations
 
-from typing import Dict, Tuple
+import math
+from functools import lru_cache
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
 
 from app.models.domain import ThermalTwinConfig, ThermalTwinState
 
@@ -57,96 +72,497 @@ def get_coolant_props(T_k: float, glycol_pct: float = 0.30) -> Tuple[float, floa
     return rho, cp
 
 
+def get_coolant_props_array(T_k: np.ndarray, glycol_pct: float = 0.30) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorized `get_coolant_props` (same trends and clamps, element-wise).
+    """
+    T_c = np.asarray(T_k, dtype=float) - 273.15
+    rho = np.clip(1050.0 - (0.50 * T_c), 900.0, 1100.0)
+    cp = np.clip(3800.0 + (1.50 * T_c), 2500.0, 4500.0)
+    return rho, cp
+
+
+# ============================================================
+# 1) COOLANT PROPERTY TABLES (shared per glycol mix)
+# ============================================================
+
+# Temperature grid (C) of the coolant tables: wide enough that rho and cp are
+# both clamped at its ends, so lookups beyond it are constant like the formulas.
+COOLANT_TABLE_RANGE_C: Tuple[float, float] = (-900.0, 500.0)
+COOLANT_TABLE_STEP_C = 0.05
+
+
+class CoolantTable:
+    """
+    rho(T)*cp(T) of one glycol mix (J/(m^3*K)) on a uniform grid, linearly
+    interpolated; the thermal mass is C(T) = rho*cp * V / 1000 (kJ/°C).
+    Volume only scales the product, so one table serves every twin (and every
+    rack of a batch) with that mix. Scalar and array lookups perform the same
+    operations and agree bit for bit.
+    """
+
+    __slots__ = ("glycol_pct", "_lo", "_inv_step", "_last", "_values", "_slopes", "_value_list", "_slope_list")
+
+    def __init__(self, glycol_pct: float):
+        lo, hi = COOLANT_TABLE_RANGE_C
+        n = int(round((hi - lo) / COOLANT_TABLE_STEP_C)) + 1
+        rho, cp = get_coolant_props_array(lo + COOLANT_TABLE_STEP_C * np.arange(n) + 273.15, glycol_pct=glycol_pct)
+        self.glycol_pct = float(glycol_pct)
+        self._lo = lo
+        self._inv_step = 1.0 / COOLANT_TABLE_STEP_C
+        self._last = float(n - 1)
+        self._values = rho * cp
+        self._slopes = np.append(np.diff(self._values), 0.0)  # per grid cell
+        # Python lists index faster than arrays in the scalar path.
+        self._value_list = self._values.tolist()
+        self._slope_list = self._slopes.tolist()
+
+    def rho_cp(self, T_c: float) -> float:
+        x = (T_c - self._lo) * self._inv_step
+        if not x > 0.0:
+            x = 0.0
+        if not x < self._last:
+            x = self._last
+        i = int(x)
+        return self._value_list[i] + self._slope_list[i] * (x - i)
+
+    def rho_cp_array(self, T_c: np.ndarray) -> np.ndarray:
+        # min/max rather than np.clip: same values, a fraction of the call overhead
+        x = np.minimum(np.maximum((np.asarray(T_c, dtype=float) - self._lo) * self._inv_step, 0.0), self._last)
+        i = x.astype(np.int64)
+        return self._values[i] + self._slopes[i] * (x - i)
+
+    def rho_cp_slope(self, T_c: float) -> float:
+        """
+        d(rho*cp)/dT of the interpolant at T_c (0 beyond the grid).
+        """
+        x = (T_c - self._lo) * self._inv_step
+        if not 0.0 < x < self._last:
+            return 0.0
+        return self._slope_list[int(x)] * self._inv_step
+
+    def heat_capacity_kj_per_c(self, T_c: float, volume_m3: float) -> float:
+        C = self.rho_cp(T_c) * volume_m3 / 1000.0
+        return C if C > 1e-3 else 1e-3
+
+    def heat_capacity_kj_per_c_array(self, T_c: np.ndarray, volume_m3) -> np.ndarray:
+        return np.maximum(1e-3, self.rho_cp_array(T_c) * volume_m3 / 1000.0)
+
+    def heat_capacity_bounds(self, T_lo: float, T_hi: float, volume_m3: float) -> Tuple[float, float]:
+        """
+        (min, max) of the interpolated C(T) over [T_lo, T_hi]: the extremes of a
+        piecewise-linear function sit at the interval ends or its grid points.
+        """
+        x_lo = min(max((T_lo - self._lo) * self._inv_step, 0.0), self._last)
+        x_hi = min(max((T_hi - self._lo) * self._inv_step, 0.0), self._last)
+        inner = self._values[int(x_lo) + 1 : int(np.ceil(x_hi))]
+        ends = (self.rho_cp(T_lo), self.rho_cp(T_hi))
+        lo = min(min(ends), float(inner.min())) if inner.size else min(ends)
+        hi = max(max(ends), float(inner.max())) if inner.size else max(ends)
+        return max(1e-3, lo * volume_m3 / 1000.0), max(1e-3, hi * volume_m3 / 1000.0)
+
+
+@lru_cache(maxsize=16)
+def coolant_table(glycol_pct: float = 0.30) -> CoolantTable:
+    """
+    The shared CoolantTable of a glycol mix (built on first use).
+    """
+    return CoolantTable(float(glycol_pct))
+
+
 # ============================================================
 # 2) THERMAL TWIN (Physics Engine)
 # ============================================================
 
+# Integrators accepted by ThermalTwin (see the module docstring).
+THERMAL_INTEGRATORS: Tuple[str, ...] = ("euler", "exponential")
+# Forward-mode tangent: a float (one direction) or an array (one entry per direction).
+Tangent = Union[float, np.ndarray]
+# Cap on pieces integrated within one exponential step; the state is held for
+# the rest of the step if it is ever reached.
+EXACT_MAX_PIECES = 5000
+# At a target jump both sides push T toward (the top of the deadband) the
+# cooling draw chatters around the value holding T still. Once that relay's
+# temperature excursion is below this bound (C) it is replaced by its sliding limit.
+EXACT_SLIDE_C = 0.01
+# Bisection iterations locating a ramp event on its closed form.
+EXACT_BISECT_ITERS = 60
+
+
+def _first_exit(fn: Callable[[float], float], h: float, t_ext: float) -> Optional[float]:
+    """
+    First tau in (0, h] with fn(tau) <= 0, or None. fn is positive just after
+    0 and monotone on each side of its single extremum t_ext.
+    """
+    a = 0.0
+    for b in ((t_ext, h) if 0.0 < t_ext < h else (h,)):
+        if fn(b) <= 0.0:
+            lo, hi = a, b
+            for _ in range(EXACT_BISECT_ITERS):
+                mid = 0.5 * (lo + hi)
+                if fn(mid) <= 0.0:
+                    hi = mid
+                else:
+                    lo = mid
+            return hi
+        a = b
+    return None
+
+
 class ThermalTwin:
-    def __init__(self, cfg: ThermalTwinConfig, state: ThermalTwinState):
+    __slots__ = ("cfg", "state", "integrator")
+
+    def __init__(
+        self,
+        cfg: ThermalTwinConfig,
+        state: Union[ThermalTwinState, "TwinState"],
+        integrator: str = "euler",
+    ):
+        if integrator not in THERMAL_INTEGRATORS:
+            raise ValueError(f"integrator must be one of {THERMAL_INTEGRATORS}")
         self.cfg = cfg
         self.state = state
+        self.integrator = integrator
 
-    def _dynamic_C_mass_kj_per_c(self) -> float:
+    def _dynamic_C_mass_kj_per_c(self, T_c: Optional[float] = None) -> float:
         """
-        Compute effective thermal mass C(T) = rho(T)*V*cp(T).
+        Compute effective thermal mass C(T) = rho(T)*V*cp(T) at T_c (default: state).
         Returns kJ/°C.
         """
         if not self.cfg.use_dynamic_coolant_mass:
             return float(self.cfg.C_mass)
 
-        T_k = self.state.T_c + 273.15
-        rho, cp = get_coolant_props(T_k, glycol_pct=self.cfg.glycol_pct)
-
-        # rho [kg/m3] * V [m3] -> kg
-        # cp [J/kgK] -> J/K
-        # Convert J/K to kJ/°C
-        C_kj_per_c = (rho * self.cfg.coolant_volume_m3 * cp) / 1000.0
-        return float(max(1e-3, C_kj_per_c))
+        # rho [kg/m3] * cp [J/kgK] * V [m3] -> J/K; /1000 -> kJ/°C (shared table per glycol mix)
+        table = coolant_table(self.cfg.glycol_pct)
+        return table.heat_capacity_kj_per_c(self.state.T_c if T_c is None else T_c, self.cfg.coolant_volume_m3)
 
     def predict(self, P_it_kw: float, dt_s: float) -> Dict[str, float]:
         """
-        Euler step of first-order thermal ODE:
+        Step of first-order thermal ODE:
 
           dT/dt = (P_in - P_out) / C(T)
 
         P_in  = IT load (kW)
         P_out = passive loss K*(T - Tamb) + active cooling (COP * P_cool)
 
-        Also includes cooling actuator lag (ramp rate limit).
+        Also includes cooling actuator lag (ramp rate limit). Euler by default;
+        the "exponential" integrator solves the step exactly (`_advance_exact`)
+        and also reports the peak temperature within the step.
+        Dict view of `predict_into`.
+        """
+        return self.predict_into(P_it_kw, dt_s, ThermalPrediction()).as_dict()
+
+    def predict_into(self, P_it_kw: float, dt_s: float, out: "ThermalPrediction") -> "ThermalPrediction":
+        """
+        `predict` without allocations: fills and returns the reusable `out`.
         """
+        cfg = self.cfg
+        T = self.state.T_c
+        P_cool = self.state.P_cool_kw
+        P_it = float(P_it_kw)
+        dt = float(dt_s)
+
         # 1) Passive heat rejection (kW)
-        q_passive = self.cfg.K_transfer * (self.state.T_c - self.cfg.T_ambient)
+        q_passive = cfg.K_transfer * (T - cfg.T_ambient)
 
         # 2) Base heat that still must be removed mechanically (kW)
-        heat_to_remove_kw = max(0.0, float(P_it_kw) - float(q_passive))
+        heat_to_remove_kw = P_it - q_passive
+        if not heat_to_remove_kw > 0.0:
+            heat_to_remove_kw = 0.0
 
         # 3) Temperature-aware target: only "pay" for cooling when you need it
-        temp_err = float(self.state.T_c) - float(self.cfg.T_setpoint)
-        if temp_err <= -float(self.cfg.T_deadband):
+        temp_err = T - cfg.T_setpoint
+        deadband = cfg.T_deadband
+        if temp_err <= -deadband:
             target_heat_removed_kw = heat_to_remove_kw * 0.10  # coast
-        elif abs(temp_err) <= float(self.cfg.T_deadband):
+        elif abs(temp_err) <= deadband:
             target_heat_removed_kw = heat_to_remove_kw * 0.30  # maintain
         else:
-            target_heat_removed_kw = heat_to_remove_kw + (float(self.cfg.Kp_temp_kw_per_c) * temp_err)
+            target_heat_removed_kw = heat_to_remove_kw + (cfg.Kp_temp_kw_per_c * temp_err)
 
         # 4) Convert heat removal target -> electrical cooling using COP
-        cop = max(1e-6, float(self.cfg.Cooling_COP))
+        cop = cfg.Cooling_COP
+        if not cop > 1e-6:
+            cop = 1e-6
         target_cooling_kw = target_heat_removed_kw / cop
 
         # 5) Clamp and ramp-limit the actuator
-        target_cooling_kw = max(float(self.cfg.Cooling_Min_KW), min(float(self.cfg.Cooling_Max_KW), target_cooling_kw))
-        delta_cool = target_cooling_kw - self.state.P_cool_kw
-
-        max_change = self.cfg.Cooling_Ramp_Max * float(dt_s)
-        delta_cool_clamped = max(-max_change, min(max_change, delta_cool))
-        next_cooling_kw = self.state.P_cool_kw + delta_cool_clamped
-        next_cooling_kw = max(float(self.cfg.Cooling_Min_KW), min(float(self.cfg.Cooling_Max_KW), next_cooling_kw))
-
-        # 6) Active heat removal (kW)
-        q_active = next_cooling_kw * cop
-
-        # 3) Net heat flow (kW = kJ/s)
-        net_heat_kw = float(P_it_kw) - (float(q_passive) + float(q_active))
-
-        # 4) Integrate temperature
-        C_mass = self._dynamic_C_mass_kj_per_c()  # kJ/°C
-        delta_T = (net_heat_kw * float(dt_s)) / C_mass
-        next_temp_c = self.state.T_c + float(delta_T)
-        # Floor only after integration (avoid pinning/teleporting each step).
-        next_temp_c = max(float(self.cfg.T_min), float(next_temp_c))
-
-        thermal_ok = next_temp_c < self.cfg.T_max
-
-        return {
-            "rack_temp_c_next": float(next_temp_c),
-            "cooling_kw_next": float(next_cooling_kw),
-            "thermal_ok_next": bool(thermal_ok),
-            "thermal_headroom_kw": float(self._calculate_headroom_kw(next_temp_c, next_cooling_kw)),
-            "q_passive_kw": float(q_passive),
-            "q_active_kw": float(q_active),
-            "cooling_target_kw": float(target_cooling_kw),
-            "cooling_cop": float(cop),
-        }
+        cool_min, cool_max = cfg.Cooling_Min_KW, cfg.Cooling_Max_KW
+        if not target_cooling_kw < cool_max:
+            target_cooling_kw = cool_max
+        if not target_cooling_kw > cool_min:
+            target_cooling_kw = cool_min
+        if self.integrator == "exponential":
+            next_temp_c, next_cooling_kw, peak_temp_c = self._advance_exact(P_it, dt)
+            q_active = next_cooling_kw * cop
+            thermal_ok = peak_temp_c < cfg.T_max
+        else:
+            max_change = cfg.Cooling_Ramp_Max * dt
+            delta_cool = target_cooling_kw - P_cool
+            if not delta_cool < max_change:
+                delta_cool = max_change
+            if not delta_cool > -max_change:
+                delta_cool = -max_change
+            next_cooling_kw = P_cool + delta_cool
+            if not next_cooling_kw < cool_max:
+                next_cooling_kw = cool_max
+            if not next_cooling_kw > cool_min:
+                next_cooling_kw = cool_min
+
+            # 6) Active heat removal (kW)
+            q_active = next_cooling_kw * cop
+
+            # 7) Net heat flow (kW = kJ/s)
+            net_heat_kw = P_it - (q_passive + q_active)
+
+            # 8) Integrate temperature
+            if cfg.use_dynamic_coolant_mass:
+                C_mass = coolant_table(cfg.glycol_pct).heat_capacity_kj_per_c(T, cfg.coolant_volume_m3)  # kJ/°C
+            else:
+                C_mass = float(cfg.C_mass)
+            next_temp_c = T + (net_heat_kw * dt) / C_mass
+            # Floor only after integration (avoid pinning/teleporting each step).
+            if not next_temp_c > cfg.T_min:
+                next_temp_c = float(cfg.T_min)
+            peak_temp_c = None
+            thermal_ok = next_temp_c < cfg.T_max
+
+        out.rack_temp_c_next = next_temp_c
+        out.cooling_kw_next = next_cooling_kw
+        out.thermal_ok_next = thermal_ok
+        out.thermal_headroom_kw = self._calculate_headroom_kw(next_temp_c, next_cooling_kw)
+        out.q_passive_kw = q_passive
+        out.q_active_kw = q_active
+        out.cooling_target_kw = target_cooling_kw
+        out.cooling_cop = cop
+        out.rack_temp_c_peak = peak_temp_c
+        return out
+
+    def _target_piece(self, P_it_kw: float, T_c: float) -> Tuple[float, float]:
+        """
+        (c0, c1) with the clamped cooling target g(T) = c0 + c1*T on the linear
+        piece of `predict`'s controller (steps 2-5) that contains T_c.
+        """
+        cfg = self.cfg
+        K = float(cfg.K_transfer)
+        if K * (T_c - float(cfg.T_ambient)) < P_it_kw:
+            h0, h1 = P_it_kw + K * float(cfg.T_ambient), -K  # heat_to_remove_kw = h0 + h1*T
+        else:
+            h0, h1 = 0.0, 0.0
+        temp_err = T_c - float(cfg.T_setpoint)
+        if temp_err <= -float(cfg.T_deadband):
+            a, b = h0 * 0.10, h1 * 0.10
+        elif abs(temp_err) <= float(cfg.T_deadband):
+            a, b = h0 * 0.30, h1 * 0.30
+        else:
+            Kp = float(cfg.Kp_temp_kw_per_c)
+            a, b = h0 - Kp * float(cfg.T_setpoint), h1 + Kp
+        cop = max(1e-6, float(cfg.Cooling_COP))
+        a, b = a / cop, b / cop
+        target = a + b * T_c
+        if target <= float(cfg.Cooling_Min_KW):
+            return float(cfg.Cooling_Min_KW), 0.0
+        if target >= float(cfg.Cooling_Max_KW):
+            return float(cfg.Cooling_Max_KW), 0.0
+        return a, b
+
+    def _target_breakpoints(self, P_it_kw: float) -> np.ndarray:
+        """
+        Temperatures where the controller target changes its linear piece
+        (deadband edges, zero heat to remove, clamps), plus the floor T_min.
+        """
+        cfg = self.cfg
+        K = float(cfg.K_transfer)
+        cop = max(1e-6, float(cfg.Cooling_COP))
+        setpoint, deadband = float(cfg.T_setpoint), float(cfg.T_deadband)
+        points: List[float] = [setpoint - deadband, setpoint + deadband, float(cfg.T_min)]
+        heat_lines = [(0.0, 0.0)]
+        if K > 0.0:
+            points.append(float(cfg.T_ambient) + P_it_kw / K)
+            heat_lines.append((P_it_kw + K * float(cfg.T_ambient), -K))
+        else:
+            heat_lines.append((max(0.0, P_it_kw), 0.0))
+        Kp = float(cfg.Kp_temp_kw_per_c)
+        for h0, h1 in heat_lines:
+            for a, b in ((h0 * 0.10, h1 * 0.10), (h0 * 0.30, h1 * 0.30), (h0 - Kp * setpoint, h1 + Kp)):
+                if b != 0.0:
+                    for bound in (float(cfg.Cooling_Min_KW), float(cfg.Cooling_Max_KW)):
+                        points.append((bound * cop - a) / b)
+        return np.unique(np.asarray(points, dtype=float))
+
+    def _advance_exact(self, P_it_kw: float, dt_s: float) -> Tuple[float, float, float]:
+        """
+        Exact solution of the continuous-time twin over dt_s at constant IT
+        load: returns (T, P_cool, peak T) at the end of the step.
+
+        The controller acts continuously: the cooling draw follows the target
+        g(T) of `predict` (steps 2-5) while the ramp limit allows it, and
+        otherwise ramps toward it at Cooling_Ramp_Max. g is piecewise linear in
+        T (`_target_breakpoints`), so between events the ODE
+
+          C dT/dt = P_it - K*(T - Tamb) - COP*P_cool
+
+        is linear with a closed-form solution:
+          tracking  P_cool = c0 + c1*T   -> T relaxes exponentially to its equilibrium
+          ramping   P_cool = P0 + s*t    -> exponential plus a linear-in-t particular part
+        A piece ends when T crosses a breakpoint (found in closed form while
+        tracking, by bisection while ramping) or the ramp catches the target.
+        At the floor T_min the temperature holds until the net flow turns
+        positive, and on the jump of the target at the top of the deadband it
+        slides (EXACT_SLIDE_C). C(T) is re-evaluated at every event and held in
+        between.
+        """
+        cfg = self.cfg
+        K = float(cfg.K_transfer)
+        T_amb = float(cfg.T_ambient)
+        T_min = float(cfg.T_min)
+        cop = max(1e-6, float(cfg.Cooling_COP))
+        cool_min, cool_max = float(cfg.Cooling_Min_KW), float(cfg.Cooling_Max_KW)
+        ramp = float(cfg.Cooling_Ramp_Max)
+        breakpoints = self._target_breakpoints(P_it_kw)
+
+        T = max(T_min, float(self.state.T_c))
+        P = max(cool_min, min(cool_max, float(self.state.P_cool_kw)))
+        peak = T
+        t = 0.0
+        leaving_floor = False
+        for _ in range(EXACT_MAX_PIECES):
+            h = float(dt_s) - t
+            if h <= 0.0:
+                break
+            C = self._dynamic_C_mass_kj_per_c(T)
+            flow = (P_it_kw - K * (T - T_amb) - cop * P) / C
+
+            j = int(np.searchsorted(breakpoints, T))
+            if j < breakpoints.size and breakpoints[j] == T and ramp > 0.0:
+                P_hold = (P_it_kw - K * (T - T_amb)) / cop
+                below, above = self._target_piece(P_it_kw, T - 1e-9), self._target_piece(P_it_kw, T + 1e-9)
+                excursion = cop * (P - P_hold) ** 2 / (2.0 * C * ramp)
+                if below[0] + below[1] * T < P_hold < above[0] + above[1] * T and excursion <= EXACT_SLIDE_C:
+                    # Sliding: T stays on the jump, the draw holds it there.
+                    P, t = P_hold, float(dt_s)
+                    break
+
+            # Direction of travel picks the linear piece of g at a breakpoint.
+            if leaving_floor:
+                direction, leaving_floor = 1.0, False
+            elif flow == 0.0:
+                c0, c1 = self._target_piece(P_it_kw, T + 1e-9)
+                direction = -1.0 if c0 + c1 * T > P else (1.0 if c0 + c1 * T < P else 0.0)
+            else:
+                direction = 1.0 if flow > 0.0 else -1.0
+            i = int(np.searchsorted(breakpoints, T, side="left" if direction < 0.0 else "right"))
+            lo = float(breakpoints[i - 1]) if i > 0 else -math.inf
+            hi = float(breakpoints[i]) if i < breakpoints.size else math.inf
+            if direction < 0.0 and T <= T_min:
+                # Floor: T holds while the cooling draw moves toward g(T_min).
+                c0, c1 = self._target_piece(P_it_kw, T_min + 1e-9)
+                goal = c0 + c1 * T_min
+                P_zero = (P_it_kw - K * (T_min - T_amb)) / cop  # draw at which the flow turns positive
+                leave = (P - P_zero) / ramp if goal < P_zero and ramp > 0.0 else math.inf
+                if leave >= h:
+                    P = goal if abs(goal - P) <= ramp * h else P + math.copysign(ramp * h, goal - P)
+                    T, t = T_min, float(dt_s)
+                    break
+                T, P, t = T_min, P_zero, t + leave
+                leaving_floor = True
+                continue
+
+            T_rep = T if lo == -math.inf and hi == math.inf else (
+                hi - 1.0 if lo == -math.inf else (lo + 1.0 if hi == math.inf else 0.5 * (lo + hi))
+            )
+            c0, c1 = self._target_piece(P_it_kw, T_rep)
+            target = c0 + c1 * T
+            bound = hi if direction > 0.0 else lo
+            on_target = abs(P - target) <= 1e-9 * max(1.0, abs(P))
+
+            if on_target and abs(c1 * flow) <= ramp:
+                # Tracking: C dT/dt = alpha - beta*T.
+                alpha = P_it_kw + K * T_amb - cop * c0
+                beta = K + cop * c1
+                tau = math.inf
+                if direction != 0.0 and abs(beta) > 1e-12:
+                    T_eq = alpha / beta
+                    ratio = (bound - T_eq) / (T - T_eq) if T != T_eq else 0.0
+                    if 0.0 < ratio < 1.0:
+                        tau = -math.log(ratio) * C / beta
+                elif direction != 0.0 and alpha != 0.0:
+                    tau = (bound - T) * C / alpha
+                if tau >= h:
+                    if abs(beta) > 1e-12:
+                        T_eq = alpha / beta
+                        T = T_eq + (T - T_eq) * math.exp(-beta * h / C)
+                    else:
+                        T = T + alpha * h / C
+                    P, t = c0 + c1 * T, float(dt_s)
+                else:
+                    T, t = bound, t + tau
+                    P = c0 + c1 * T
+                peak = max(peak, T)
+                continue
+
+            # Ramping (toward the target, or after it when it moves faster than the ramp):
+            # P(tau) = P + s*tau, C dT/dt = u0 + u1*tau - K*T.
+            s = math.copysign(ramp, c1 * flow if on_target else target - P)
+            u1 = -cop * s
+            # A flow against the chosen direction is rounding noise (leaving the floor, flow == 0).
+            T0, dT0 = T, (flow if flow * direction > 0.0 else 0.0)
+            u0 = C * dT0 + K * T
+            if K > 0.0:
+                lam = K / C
+                base = (u0 - C * u1 / K) / K
+
+                def temp_at(tau: float) -> float:
+                    return base + u1 * tau / K + (T0 - base) * math.exp(-lam * tau)
+
+                def slope_time(v: float) -> float:
+                    # tau at which dT/dt == v (dT/dt relaxes from dT0 to u1/K).
+                    w = u1 / K
+                    ratio = (v - w) / (dT0 - w) if dT0 != w else 0.0
+                    return -math.log(ratio) / lam if 0.0 < ratio < 1.0 else math.inf
+            else:
+                def temp_at(tau: float) -> float:
+                    return T0 + (u0 * tau + 0.5 * u1 * tau * tau) / C
+
+                def slope_time(v: float) -> float:
+                    tau = (v * C - u0) / u1 if u1 != 0.0 else math.inf
+                    return tau if tau > 0.0 else math.inf
+
+            P0 = P
+            t_turn = slope_time(0.0)  # extremum of T
+            events: List[Tuple[float, str]] = []
+            if bound != -math.inf and bound != math.inf:
+                tau = _first_exit(lambda x: direction * (bound - temp_at(x)), h, t_turn)
+                if tau is not None:
+                    events.append((tau, "bound"))
+            other = lo if direction > 0.0 else hi
+            if other != -math.inf and other != math.inf and t_turn < h:
+                # T turns around and may come back through the breakpoint behind it.
+                tau = _first_exit(lambda x: direction * (temp_at(x) - other), h, t_turn)
+                if tau is not None:
+                    events.append((tau, "other"))
+            if s != 0.0:
+                t_catch_ext = slope_time(s / c1) if c1 != 0.0 else math.inf
+                tau = _first_exit(lambda x: math.copysign(1.0, s) * (c0 + c1 * temp_at(x) - P0 - s * x), h, t_catch_ext)
+                if tau is not None:
+                    events.append((tau, "catch"))
+            if 0.0 < t_turn < min([h] + [e[0] for e in events]):
+                peak = max(peak, temp_at(t_turn))
+            if not events:
+                T, P, t = temp_at(h), P0 + s * h, float(dt_s)
+            else:
+                tau, kind = min(events)
+                T, P, t = temp_at(tau), P0 + s * tau, t + tau
+                if kind == "bound":
+                    T = bound
+                elif kind == "other":
+                    T = other
+                else:
+                    P = c0 + c1 * T
+            P = max(cool_min, min(cool_max, P))
+            peak = max(peak, T)
+
+        return max(T_min, T), P, peak
 
     def _calculate_headroom_kw(self, next_temp_c: float, next_cooling_kw: float) -> float:
         """
@@ -161,11 +577,401 @@ class ThermalTwin:
         # Convert buffer to "extra heat removable" ≈ K*buffer + COP*cooling_margin.
         # Here we assume cooling can keep up by ~COP*cooling_kw (bounded).
         headroom = (self.cfg.K_transfer * buffer_c) + (next_cooling_kw * self.cfg.Cooling_COP * 0.1)
-        return float(max(0.0, headroom))
+        return headroom if headroom > 0.0 else 0.0
 
     def step(self, P_it_kw: float, dt_s: float) -> Dict[str, float]:
+        return self.step_into(P_it_kw, dt_s, ThermalPrediction()).as_dict()
+
+    def step_into(self, P_it_kw: float, dt_s: float, out: "ThermalPrediction") -> "ThermalPrediction":
+        self.predict_into(P_it_kw, dt_s, out)
+        # Commit state update
+        self.state.T_c = out.rack_temp_c_next
+        self.state.P_cool_kw = out.cooling_kw_next
+        return out
+
+    def tangent_step(
+        self,
+        P_it_kw: float,
+        dt_s: float,
+        dT: Tangent,
+        dP_cool: Tangent,
+        dP_it: Tangent,
+        out: "ThermalPrediction",
+    ) -> Tuple[Tangent, Tangent]:
+        """
+        Forward-mode derivative of one Euler step. Fills `out` like
+        `predict_into` (state unchanged) and maps the tangents of the state
+        (dT, dP_cool) and of the IT load (dP_it) to those of
+        (T_next, P_cool_next). Tangents are floats (one direction) or arrays
+        of one shape (many); derivatives follow the step's active branch:
+        heat floor, deadband band, target clamp, actuator ramp limit, output
+        clamp and the T_min floor.
+        """
+        if self.integrator != "euler":
+            raise ValueError("tangents follow the Euler step only")
+        self.predict_into(P_it_kw, dt_s, out)
+        cfg = self.cfg
+        T = self.state.T_c
+        dt = float(dt_s)
+        K = cfg.K_transfer
+        zero = 0.0 * dT
+
+        d_heat = dP_it - K * dT if float(P_it_kw) - out.q_passive_kw > 0.0 else zero
+        temp_err = T - cfg.T_setpoint
+        if temp_err <= -cfg.T_deadband:
+            d_target = d_heat * 0.10
+        elif abs(temp_err) <= cfg.T_deadband:
+            d_target = d_heat * 0.30
+        else:
+            d_target = d_heat + cfg.Kp_temp_kw_per_c * dT
+
+        cop = out.cooling_cop
+        cool_min, cool_max = cfg.Cooling_Min_KW, cfg.Cooling_Max_KW
+        d_cool = d_target / cop if cool_min < out.cooling_target_kw < cool_max else zero
+        if not abs(out.cooling_target_kw - self.state.P_cool_kw) < cfg.Cooling_Ramp_Max * dt:
+            d_cool = dP_cool  # ramp-limited: moves with the previous output
+        d_next_cool = d_cool if cool_min < out.cooling_kw_next < cool_max else zero
+
+        net = float(P_it_kw) - (out.q_passive_kw + out.q_active_kw)
+        d_net = dP_it - K * dT - cop * d_next_cool
+        if cfg.use_dynamic_coolant_mass:
+            table = coolant_table(cfg.glycol_pct)
+            C = table.heat_capacity_kj_per_c(T, cfg.coolant_volume_m3)
+            dC = cfg.coolant_volume_m3 * table.rho_cp_slope(T) / 1000.0 if C > 1e-3 else 0.0
+        else:
+            C, dC = float(cfg.C_mass), 0.0
+        d_next_T = dT + dt * (d_net / C - net * dC * dT / (C * C))
+        if not out.rack_temp_c_next > cfg.T_min:
+            d_next_T = zero
+        return d_next_T, d_next_cool
+
+    def deltaP_sensitivity(
+        self,
+        P_site_kw: float,
+        profile_kw: np.ndarray,
+        dt_s: float,
+        direction: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Rolls a deltaP trajectory out from the twin's state (left untouched),
+        with the planners' site->IT conversion P_it = max(P_site - deltaP - P_cool, 0),
+        carrying forward-mode tangents (`tangent_step`).
+
+        Returns (T, S) with T[k] the temperature after step k. Without
+        `direction`: S[k, j] = dT_k / d deltaP_j (lower triangular, one tangent
+        per step). With `direction` v = d deltaP / d theta (one entry per
+        step): S[k] = dT_k / d theta, for the cost of a single float tangent.
+        """
+        profile = np.asarray(profile_kw, dtype=float).reshape(-1)
+        n = profile.size
+        full = direction is None
+        seeds = np.eye(n) if full else np.asarray(direction, dtype=float).reshape(-1).tolist()
+        if not full and len(seeds) != n:
+            raise ValueError("direction must have one entry per profile step")
+
+        twin = ThermalTwin(self.cfg, TwinState(self.state.T_c, self.state.P_cool_kw), integrator=self.integrator)
+        state = twin.state
+        pred = ThermalPrediction()
+        dt = float(dt_s)
+        dT = np.zeros(n) if full else 0.0
+        dP = np.zeros(n) if full else 0.0
+        temps = np.empty(n)
+        S = np.empty((n, n)) if full else np.empty(n)
+        for i in range(n):
+            P_it = float(P_site_kw) - profile[i] - state.P_cool_kw
+            d_it = -dP - seeds[i]
+            if P_it <= 0.0:
+                P_it, d_it = 0.0, 0.0 * dP
+            dT, dP = twin.tangent_step(P_it, dt, dT, dP, d_it, pred)
+            state.T_c = pred.rack_temp_c_next
+            state.P_cool_kw = pred.cooling_kw_next
+            temps[i] = state.T_c
+            S[i] = dT
+        return temps, S
+
+
+class ThermalPrediction:
+    """
+    Reusable result record of `ThermalTwin.predict_into`. Fields are the keys
+    of the `predict` dict; `rack_temp_c_peak` is None for the Euler integrator.
+    """
+
+    __slots__ = (
+        "rack_temp_c_next",
+        "cooling_kw_next",
+        "thermal_ok_next",
+        "thermal_headroom_kw",
+        "q_passive_kw",
+        "q_active_kw",
+        "cooling_target_kw",
+        "cooling_cop",
+        "rack_temp_c_peak",
+    )
+
+    def __init__(self) -> None:
+        self.rack_temp_c_next = 0.0
+        self.cooling_kw_next = 0.0
+        self.thermal_ok_next = False
+        self.thermal_headroom_kw = 0.0
+        self.q_passive_kw = 0.0
+        self.q_active_kw = 0.0
+        self.cooling_target_kw = 0.0
+        self.cooling_cop = 0.0
+        self.rack_temp_c_peak: Optional[float] = None
+
+    def as_dict(self) -> Dict[str, float]:
+        pred = {
+            "rack_temp_c_next": float(self.rack_temp_c_next),
+            "cooling_kw_next": float(self.cooling_kw_next),
+            "thermal_ok_next": bool(self.thermal_ok_next),
+            "thermal_headroom_kw": float(self.thermal_headroom_kw),
+            "q_passive_kw": float(self.q_passive_kw),
+            "q_active_kw": float(self.q_active_kw),
+            "cooling_target_kw": float(self.cooling_target_kw),
+            "cooling_cop": float(self.cooling_cop),
+        }
+        if self.rack_temp_c_peak is not None:
+            pred["rack_temp_c_peak"] = float(self.rack_temp_c_peak)
+        return pred
+
+
+class TwinState:
+    """
+    Slotted (T_c, P_cool_kw) for hot loops. ThermalTwin takes it in place of
+    a ThermalTwinState: state commits are plain attribute writes instead of
+    pydantic model assignments.
+    """
+
+    __slots__ = ("T_c", "P_cool_kw")
+
+    def __init__(self, T_c: float, P_cool_kw: float):
+        self.T_c = float(T_c)
+        self.P_cool_kw = float(P_cool_kw)
+
+    @classmethod
+    def from_model(cls, state: ThermalTwinState) -> "TwinState":
+        return cls(state.T_c, state.P_cool_kw)
+
+    def to_model(self) -> ThermalTwinState:
+        return ThermalTwinState(T_c=self.T_c, P_cool_kw=self.P_cool_kw)
+
+
+# ============================================================
+# 3) VECTORIZED PREDICT (many candidates, one config)
+# ============================================================
+
+def _predict_kernel(
+    p: Any,
+    T_c: np.ndarray,
+    P_cool_kw: np.ndarray,
+    P_it_kw: np.ndarray,
+    dt_s: float,
+    C_mass: Union[float, np.ndarray],
+) -> Dict[str, np.ndarray]:
+    """
+    One Euler step of `ThermalTwin.predict`, element-wise over arrays: the
+    deadband branches, COP conversion, clamps, ramp limit and headroom rule
+    shared by `predict_arrays` and `ThermalTwinBatch.predict`.
+
+    `p` exposes the BATCH_CONFIG_FIELDS as attributes, each a scalar (shared
+    by every element) or an (N,) array; `C_mass` is the heat capacity at T_c,
+    resolved by the caller (constant or dynamic coolant mass).
+    """
+    dt = float(dt_s)
+
+    q_passive = p.K_transfer * (T_c - p.T_ambient)
+    heat_to_remove_kw = np.maximum(0.0, P_it_kw - q_passive)
+
+    temp_err = T_c - p.T_setpoint
+    deadband = p.T_deadband
+    target_heat_removed_kw = np.where(
+        temp_err <= -deadband,
+        heat_to_remove_kw * 0.10,
+        np.where(
+            np.abs(temp_err) <= deadband,
+            heat_to_remove_kw * 0.30,
+            heat_to_remove_kw + (p.Kp_temp_kw_per_c * temp_err),
+        ),
+    )
+
+    # min/max rather than np.clip: same values, a fraction of the call overhead
+    cop = np.maximum(1e-6, p.Cooling_COP)
+    cool_min = p.Cooling_Min_KW
+    cool_max = p.Cooling_Max_KW
+    target_cooling_kw = np.maximum(cool_min, np.minimum(cool_max, target_heat_removed_kw / cop))
+
+    max_change = p.Cooling_Ramp_Max * dt
+    delta_cool_clamped = np.maximum(-max_change, np.minimum(max_change, target_cooling_kw - P_cool_kw))
+    next_cooling_kw = np.maximum(cool_min, np.minimum(cool_max, P_cool_kw + delta_cool_clamped))
+
+    q_active = next_cooling_kw * cop
+    net_heat_kw = P_it_kw - (q_passive + q_active)
+
+    next_temp_c = np.maximum(p.T_min, T_c + (net_heat_kw * dt) / C_mass)
+
+    buffer_c = p.T_max - next_temp_c
+    headroom = np.where(
+        buffer_c <= 0,
+        0.0,
+        np.maximum(0.0, (p.K_transfer * buffer_c) + (next_cooling_kw * p.Cooling_COP * 0.1)),
+    )
+
+    return {
+        "rack_temp_c_next": next_temp_c,
+        "cooling_kw_next": next_cooling_kw,
+        "thermal_ok_next": next_temp_c < p.T_max,
+        "thermal_headroom_kw": headroom,
+        "q_passive_kw": q_passive,
+        "q_active_kw": q_active,
+        "cooling_target_kw": target_cooling_kw,
+        "cooling_cop": cop,
+    }
+
+
+def predict_arrays(
+    cfg: ThermalTwinConfig,
+    T_c: np.ndarray,
+    P_cool_kw: np.ndarray,
+    P_it_kw: np.ndarray,
+    dt_s: float,
+) -> Dict[str, np.ndarray]:
+    """
+    Element-wise equivalent of `ThermalTwin.predict` for arrays of states.
+
+    Every element is an independent twin sharing `cfg`; the deadband branches,
+    COP conversion, clamps, ramp limit and dynamic coolant mass are identical
+    to the scalar path so planners can swap one for the other.
+    """
+    T_c = np.asarray(T_c, dtype=float)
+    if cfg.use_dynamic_coolant_mass:
+        C_mass = coolant_table(cfg.glycol_pct).heat_capacity_kj_per_c_array(T_c, cfg.coolant_volume_m3)
+    else:
+        C_mass = float(cfg.C_mass)
+    return _predict_kernel(
+        cfg,
+        T_c,
+        np.asarray(P_cool_kw, dtype=float),
+        np.asarray(P_it_kw, dtype=float),
+        dt_s,
+        C_mass,
+    )
+
+
+# ============================================================
+# 4) BATCHED TWIN (many racks, per-rack config)
+# ============================================================
+
+# ThermalTwinConfig fields the batch holds per rack (the others are planner limits).
+BATCH_CONFIG_FIELDS: Tuple[str, ...] = (
+    "C_mass",
+    "K_transfer",
+    "T_max",
+    "T_ambient",
+    "T_min",
+    "Cooling_Ramp_Max",
+    "Cooling_COP",
+    "T_setpoint",
+    "T_deadband",
+    "Cooling_Min_KW",
+    "Cooling_Max_KW",
+    "Kp_temp_kw_per_c",
+    "coolant_volume_m3",
+    "glycol_pct",
+    "use_dynamic_coolant_mass",
+)
+
+
+class ThermalTwinBatch:
+    """
+    N independent lumped racks advanced together.
+
+    Temperatures and cooling powers live in (N,) arrays, and so does every
+    field of BATCH_CONFIG_FIELDS, so racks may differ in mass, COP, setpoint,
+    limits, etc. `predict`/`step` apply `ThermalTwin.predict` element-wise
+    (deadband branches, COP, clamps, ramp limit, dynamic coolant mass) and
+    return the same keys with (N,) arrays. `params` is fixed at construction
+    (the coolant tables per glycol mix are resolved once there).
+    """
+
+    __slots__ = ("T_c", "P_cool_kw", "params", "_p", "_coolant_groups")
+
+    def __init__(
+        self,
+        cfg: ThermalTwinConfig,
+        T_c: np.ndarray,
+        P_cool_kw: np.ndarray,
+        **overrides: np.ndarray,
+    ):
+        """
+        `cfg` gives the default for every rack; `overrides` replace single
+        fields of BATCH_CONFIG_FIELDS with per-rack values (scalar or (N,)).
+        """
+        self.T_c = np.array(T_c, dtype=float).reshape(-1)
+        n = self.T_c.size
+        self.P_cool_kw = np.broadcast_to(np.asarray(P_cool_kw, dtype=float), (n,)).copy()
+        unknown = set(overrides) - set(BATCH_CONFIG_FIELDS)
+        if unknown:
+            raise ValueError(f"unknown batch config fields: {sorted(unknown)}")
+        self.params: Dict[str, np.ndarray] = {}
+        for name in BATCH_CONFIG_FIELDS:
+            dtype = bool if name == "use_dynamic_coolant_mass" else float
+            value = overrides.get(name, getattr(cfg, name))
+            self.params[name] = np.broadcast_to(np.asarray(value, dtype=dtype), (n,)).copy()
+        # Attribute view of the same arrays, as `_predict_kernel` reads them.
+        self._p = SimpleNamespace(**self.params)
+        # (table, racks) per glycol mix among the dynamic-mass racks; racks is None
+        # when the mix covers the whole batch (the usual single-mix case).
+        dynamic = self.params["use_dynamic_coolant_mass"]
+        groups = []
+        for glycol_pct in np.unique(self.params["glycol_pct"][dynamic]):
+            mix = dynamic & (self.params["glycol_pct"] == glycol_pct)
+            groups.append((coolant_table(float(glycol_pct)), None if mix.all() else mix))
+        self._coolant_groups: Tuple[Tuple[CoolantTable, Optional[np.ndarray]], ...] = tuple(groups)
+
+    @classmethod
+    def from_twins(
+        cls,
+        cfgs: Sequence[ThermalTwinConfig],
+        states: Sequence[ThermalTwinState],
+    ) -> "ThermalTwinBatch":
+        """
+        Packs one (config, state) pair per rack.
+        """
+        if len(cfgs) != len(states):
+            raise ValueError("cfgs and states must have the same length")
+        if not cfgs:
+            raise ValueError("at least one rack is required")
+        columns = {
+            name: np.array([getattr(c, name) for c in cfgs], dtype=bool if name == "use_dynamic_coolant_mass" else float)
+            for name in BATCH_CONFIG_FIELDS
+        }
+        return cls(
+            cfgs[0],
+            np.array([s.T_c for s in states], dtype=float),
+            np.array([s.P_cool_kw for s in states], dtype=float),
+            **columns,
+        )
+
+    def __len__(self) -> int:
+        return int(self.T_c.size)
+
+    def state(self, i: int) -> ThermalTwinState:
+        return ThermalTwinState(T_c=float(self.T_c[i]), P_cool_kw=float(self.P_cool_kw[i]))
+
+    def predict(self, P_it_kw: np.ndarray, dt_s: float) -> Dict[str, np.ndarray]:
+        """
+        One Euler step for every rack (P_it_kw scalar or (N,)); state is unchanged.
+        """
+        T_c = self.T_c
+        C_mass = self.params["C_mass"]
+        for table, mix in self._coolant_groups:
+            C_dyn = table.heat_capacity_kj_per_c_array(T_c, self.params["coolant_volume_m3"])
+            C_mass = C_dyn if mix is None else np.where(mix, C_dyn, C_mass)
+        return _predict_kernel(self._p, T_c, self.P_cool_kw, np.asarray(P_it_kw, dtype=float), dt_s, C_mass)
+
+    def step(self, P_it_kw: np.ndarray, dt_s: float) -> Dict[str, np.ndarray]:
         pred = self.predict(P_it_kw, dt_s)
         # Commit state update
-        self.state.T_c = pred["rack_temp_c_next"]
-        self.state.P_cool_kw = pred["cooling_kw_next"]
+        self.T_c = pred["rack_temp_c_next"]
+        self.P_cool_kw = pred["cooling_kw_next"]
         return pred
@@ -0,0 +1,164 @@
+"""
+plan_bounds.py
+
+Purpose:
+  Cheap pre-screening of ramp-plan requests. Before the planner searches, one
+  interval pass over the twin equations may prove that every magnitude in
+  (0, cap] fails (the request is blocked) or that every one passes (the
+  clamped request itself is safe).
+
+Method:
+  - The constant-rate ramps toward all magnitudes m in [0, cap] are bounded
+    together: at step k deltaP lies in sign * [0, min(cap, (k+1) * ramp * dt)]
+    and the twin state in a box [T_lo, T_hi] x [P_cool_lo, P_cool_hi].
+  - Every term of `ThermalTwin.predict` is monotone in its inputs: IT load
+    in site load and cooling draw, heat to remove in IT load and T, the
+    controller target in heat (taking the extreme over every deadband branch
+    the T interval reaches), the actuator in target and previous cooling, and
+    the Euler update in T while K * dt <= C(T). Evaluating at the box corners
+    therefore bounds every candidate trajectory.
+  - Blocked: T_lo crosses the 0.5 C thin-margin gate at some step, so every
+    candidate fails by then (only the first SCREEN_BLOCKED_MAX_STEPS steps are
+    tried once the safe proof is lost).
+  - Safe: T_hi stays below the gate over the whole horizon and the Arrhenius
+    wear of the worst corner (hottest T, largest deltaP, full actuator move
+    every step) stays within the decision budget.
+
+Invariant:
+  - Verdicts are proofs, not hints: None means "search as usual". The planner
+    still simulates the cap candidate once, to build the approved plan or to
+    explain the block with its usual reason code.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.models.domain import BatteryDegradationConfig, ThermalTwinConfig, ThermalTwinState
+from app.services.physics_engine import coolant_table
+from app.services.policy_engine import arrhenius_aging
+
+
+# Verdicts of `screen_request` (None = undecided).
+SCREEN_VERDICTS: Tuple[str, ...] = ("blocked", "safe")
+# Slack (C) kept from the gate so floating-point rounding cannot flip a proof.
+SCREEN_EPS_C = 1e-9
+# The box only widens, so blocked proofs come from the first few steps: once the
+# safe proof is lost the pass stops after this many steps.
+SCREEN_BLOCKED_MAX_STEPS = 8
+
+
+@dataclass
+class ScreenResult:
+    """
+    Verdict plus its evidence: `step` is the first step whose lower bound
+    crossed the gate (blocked) or the horizon length; `temp_bound_c` is that
+    lower bound (blocked) or the highest upper bound reached.
+    """
+    verdict: Optional[str]
+    step: int
+    temp_bound_c: float
+    wear_bound: float
+
+
+def _capacity_bounds(cfg: ThermalTwinConfig, T_lo: float, T_hi: float) -> Tuple[float, float]:
+    """
+    (min, max) of the coolant thermal mass C(T) (kJ/C) over [T_lo, T_hi], on
+    the same interpolated table the twin steps with.
+    """
+    if not cfg.use_dynamic_coolant_mass:
+        return float(cfg.C_mass), float(cfg.C_mass)
+    return coolant_table(cfg.glycol_pct).heat_capacity_bounds(T_lo, T_hi, float(cfg.coolant_volume_m3))
+
+
+def screen_request(
+    P_site_kw: float,
+    cfg: ThermalTwinConfig,
+    state: ThermalTwinState,
+    deltaP_cap_kw: float,
+    steps_n: int,
+    dt_s: float,
+    ramp_rate_kw_per_s: float,
+    batt_cfg: Optional[BatteryDegradationConfig] = None,
+) -> ScreenResult:
+    """
+    Bounds every constant-rate ramp toward a magnitude in (0, |deltaP_cap_kw|]
+    (signed like deltaP_cap_kw) over `steps_n` steps. See the module docstring.
+    """
+    batt_cfg = batt_cfg or BatteryDegradationConfig()
+    dt = float(dt_s)
+    K = float(cfg.K_transfer)
+    T_amb = float(cfg.T_ambient)
+    cop = max(1e-6, float(cfg.Cooling_COP))
+    cool_min, cool_max = float(cfg.Cooling_Min_KW), float(cfg.Cooling_Max_KW)
+    max_change = float(cfg.Cooling_Ramp_Max) * dt
+    setpoint, deadband = float(cfg.T_setpoint), float(cfg.T_deadband)
+    Kp = float(cfg.Kp_temp_kw_per_c)
+    gate = float(cfg.T_max) - 0.5
+    cap_mag = abs(float(deltaP_cap_kw))
+    sign = 1.0 if deltaP_cap_kw >= 0.0 else -1.0
+
+    def actuator(target_kw: float, prev_kw: float) -> float:
+        # Non-decreasing in both arguments (predict's ramp limit and clamps).
+        move = max(-max_change, min(max_change, target_kw - prev_kw))
+        return max(cool_min, min(cool_max, prev_kw + move))
+
+    T_lo = T_hi = float(state.T_c)
+    P_lo = P_hi = float(state.P_cool_kw)
+    T_peak = T_hi
+    safe = True
+    wear_T: List[float] = []
+    wear_kw: List[float] = []
+    for k in range(int(steps_n)):
+        d_mag = min(cap_mag, (k + 1) * float(ramp_rate_kw_per_s) * dt)
+        d_lo, d_hi = (0.0, d_mag) if sign > 0.0 else (-d_mag, 0.0)
+
+        P_it_hi = max(float(P_site_kw) - d_lo - P_lo, 0.0)
+        P_it_lo = max(float(P_site_kw) - d_hi - P_hi, 0.0)
+        heat_hi = max(0.0, P_it_hi - K * (T_lo - T_amb))
+        heat_lo = max(0.0, P_it_lo - K * (T_hi - T_amb))
+
+        # Controller target over every deadband branch the T interval reaches.
+        err_lo, err_hi = T_lo - setpoint, T_hi - setpoint
+        targets: List[Tuple[float, float]] = []
+        if err_lo <= -deadband:
+            targets.append((heat_lo * 0.10, heat_hi * 0.10))
+        if err_hi >= -deadband and err_lo <= deadband:
+            targets.append((heat_lo * 0.30, heat_hi * 0.30))
+        if err_hi > deadband:
+            targets.append((heat_lo + Kp * max(err_lo, deadband), heat_hi + Kp * err_hi))
+        target_lo = max(cool_min, min(cool_max, min(t[0] for t in targets) / cop))
+        target_hi = max(cool_min, min(cool_max, max(t[1] for t in targets) / cop))
+        next_P_lo = actuator(target_lo, P_lo)
+        next_P_hi = actuator(target_hi, P_hi)
+
+        C_lo, C_hi = _capacity_bounds(cfg, T_lo, T_hi)
+        if K * dt > C_lo:
+            # The Euler update is no longer monotone in T: no proof either way.
+            return ScreenResult(None, k, T_hi, float("inf"))
+        net_hi = P_it_hi - K * (T_hi - T_amb) - cop * next_P_lo
+        net_lo = P_it_lo - K * (T_lo - T_amb) - cop * next_P_hi
+        T_hi = max(float(cfg.T_min), T_hi + net_hi * dt / (C_lo if net_hi > 0.0 else C_hi))
+        T_lo = max(float(cfg.T_min), T_lo + net_lo * dt / (C_hi if net_lo > 0.0 else C_lo))
+        # Wear throughput: |deltaP| + |cooling move| at the worst corner.
+        wear_T.append(T_hi)
+        wear_kw.append(d_mag + max(next_P_hi - P_lo, P_hi - next_P_lo))
+        P_lo, P_hi = next_P_lo, next_P_hi
+
+        if T_lo > gate + SCREEN_EPS_C:
+            return ScreenResult("blocked", k, T_lo, 0.0)
+        T_peak = max(T_peak, T_hi)
+        if T_hi >= gate - SCREEN_EPS_C:
+            safe = False
+        if not safe and k + 1 >= SCREEN_BLOCKED_MAX_STEPS:
+            break
+
+    if not safe or not wear_T:
+        return ScreenResult(None, int(steps_n), T_peak, float("inf"))
+    _, cum = arrhenius_aging(batt_cfg, np.asarray(wear_T), np.asarray(wear_kw), dt)
+    wear = float(cum[-1])
+    if wear > float(batt_cfg.max_cap_loss_frac_per_decision) * (1.0 - 1e-9):
+        return ScreenResult(None, int(steps_n), T_peak, wear)
+    return ScreenResult("safe", int(steps_n), T_peak, wear)
@@ -0,0 +1,168 @@
+"""
+plan_cache.py
+
+Purpose:
+  Memoizes ramp-plan results so near-identical `/decision/latest` requests
+  (dashboards, controllers polling every second) skip the planner search.
+
+Keying:
+  - Twin state (`T_c`, `P_cool_kw`), site load, effective headroom and request are
+    quantized so requests that differ only by sensor noise share an entry.
+  - Horizon, dt, ramp rate and trace level are part of the key as-is.
+  - Entries carry the decision's ensemble and confidence too, so a hit skips the
+    Monte Carlo replay as well as the search.
+  - A hash of `ThermalTwinConfig` is part of the key; a config change also clears
+    the cache (no stale plans from an older physics model).
+
+Eviction:
+  - LRU bounded by `maxsize`, plus a TTL so entries never outlive the state they
+    were computed from for long.
+
+Invariant:
+  - Cached values are treated as immutable; callers copy before mutating.
+"""
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.models.domain import RampPlan, ThermalTwinConfig, ThermalTwinState
+from app.services.ensemble import EnsembleResult
+
+
+# Quantization steps for the cache key (units match the twin/planner inputs).
+QUANT_T_C = 0.01          # °C
+QUANT_P_COOL_KW = 1.0     # kW
+QUANT_P_SITE_KW = 1.0     # kW
+QUANT_HEADROOM_KW = 1.0   # kW
+QUANT_REQUEST_KW = 0.1    # kW
+
+
+def _q(value: float, step: float) -> int:
+    return int(round(float(value) / step))
+
+
+def config_hash(cfg: ThermalTwinConfig) -> str:
+    """
+    Stable digest of every physics constant in the config.
+    """
+    return hashlib.sha1(cfg.model_dump_json().encode("utf-8")).hexdigest()
+
+
+def plan_cache_key(
+    state: ThermalTwinState,
+    P_site_kw: float,
+    effective_headroom_kw: float,
+    deltaP_request_kw: float,
+    horizon_s: int,
+    dt_s: int,
+    ramp_rate_kw_per_s: float,
+    cfg_hash: str,
+    trace_level: str,
+) -> Tuple[Any, ...]:
+    return (
+        _q(state.T_c, QUANT_T_C),
+        _q(state.P_cool_kw, QUANT_P_COOL_KW),
+        _q(P_site_kw, QUANT_P_SITE_KW),
+        _q(effective_headroom_kw, QUANT_HEADROOM_KW),
+        _q(deltaP_request_kw, QUANT_REQUEST_KW),
+        int(horizon_s),
+        int(dt_s),
+        float(ramp_rate_kw_per_s),
+        cfg_hash,
+        str(trace_level),
+    )
+
+
+@dataclass
+class PlanCacheEntry:
+    approved_kw: float
+    plan: RampPlan
+    plan_dump: Dict[str, Any]
+    trace: List[Dict[str, Any]]
+    prediction_debug: Optional[Dict[str, float]]
+    # Monte Carlo result and the confidence derived from it (None: heuristic), so a
+    # hit reports the same confidence as the decision that filled the entry.
+    ensemble: Optional[EnsembleResult] = None
+    confidence: Optional[float] = None
+
+
+class PlanCache:
+    """
+    Thread-safe LRU + TTL cache of planner results with hit/miss counters.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 256,
+        ttl_s: float = 2.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.maxsize = max(1, int(maxsize))
+        self.ttl_s = float(ttl_s)
+        self._clock = clock
+        self._entries: "OrderedDict[Tuple[Any, ...], Tuple[float, PlanCacheEntry]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._config_hash: Optional[str] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def ensure_config(self, cfg_hash: str) -> None:
+        """
+        Drops every entry when the twin config differs from the one cached plans used.
+        """
+        with self._lock:
+            if self._config_hash is not None and self._config_hash != cfg_hash:
+                self._entries.clear()
+                self.invalidations += 1
+            self._config_hash = cfg_hash
+
+    def get(self, key: Tuple[Any, ...]) -> Optional[PlanCacheEntry]:
+        now = self._clock()
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            stored_at, entry = item
+            if now - stored_at > self.ttl_s:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Tuple[Any, ...], entry: PlanCacheEntry) -> None:
+        with self._lock:
+            self._entries[key] = (self._clock(), entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": float(len(self._entries)),
+                "maxsize": float(self.maxsize),
+                "ttl_s": float(self.ttl_s),
+                "hits": float(self.hits),
+                "misses": float(self.misses),
+                "hit_rate": float(self.hits / lookups) if lookups else 0.0,
+                "evictions": float(self.evictions),
+                "invalidations": float(self.invalidations),
+            }
@@ -0,0 +1,296 @@
+"""
+surrogate.py
+
+Purpose:
+  Optional learned shortcut for the ramp planner at high request rates: a
+  polynomial that predicts the largest feasible deltaP magnitude from
+  (T_c, P_cool, P_site, direction, ramp rate, horizon), so a decision can be
+  answered by verifying one candidate instead of searching.
+
+Method:
+  - Training labels are planner outputs generated in bulk: one
+    `compute_frontier` call per random state answers every (direction,
+    ramp rate, horizon) cell with one batched search.
+  - Only cells where a limit binds below the ramp's reach are fitted. When the
+    whole reach is feasible the planner's own cap probe approves the request,
+    so those cells would only drag the fit upward.
+  - Features are standardized (ramp rate and horizon as logs); least squares
+    over every monomial up to SURROGATE_DEGREE.
+
+Usage:
+  - Offline: `python -m app.services.surrogate --states 2000` writes
+    SURROGATE_PATH.
+  - Runtime (PLANNER_SURROGATE=1): decisions without a frontier hint pass the
+    shaved prediction as `verify_kw`. The planner simulates the clamped request
+    and the hint and approves the first feasible one (a hit); otherwise the full
+    search runs below the hint (a fallback).
+
+Invariant:
+  - Predictions are hints: every approved plan comes from an exact rollout.
+  - A verified hint is up to SURROGATE_SHAVE below the search's maximum; the
+    shave trades approved power for fewer fallbacks.
+  - No hint outside the training box, for another dt or another config hash.
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import os
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.models.domain import ThermalTwinConfig, ThermalTwinState
+from app.services.frontier import FRONTIER_DT_S, compute_frontier
+from app.services.plan_cache import config_hash
+
+
+# Default model file (trained offline, loaded when PLANNER_SURROGATE=1).
+SURROGATE_PATH = os.path.normpath(os.path.join(os.path.dirname(__file__), "..", "models", "planner_surrogate.npz"))
+# Polynomial degree: 84 terms over the 6 features (higher degrees overfit the labels).
+SURROGATE_DEGREE = 3
+# Fraction taken off a prediction before it is verified.
+SURROGATE_SHAVE = 0.2
+# Training distribution: site load (kW), ramp rates (kW/s, log-uniform) and horizons (s).
+SURROGATE_SITE_KW: Tuple[float, float] = (200.0, 5000.0)
+SURROGATE_RAMP_KW_PER_S: Tuple[float, float] = (10.0, 500.0)
+SURROGATE_HORIZONS_S: Tuple[int, ...] = (10, 15, 20, 30, 45, 60, 90, 120)
+# Ramp rates drawn per training state.
+SURROGATE_RAMPS_PER_STATE = 6
+
+
+def surrogate_features(
+    T_c: np.ndarray,
+    P_cool_kw: np.ndarray,
+    P_site_kw: np.ndarray,
+    sign: np.ndarray,
+    ramp_rate_kw_per_s: np.ndarray,
+    horizon_s: np.ndarray,
+) -> np.ndarray:
+    """
+    Raw feature rows, shaped (n, 6).
+    """
+    return np.stack(
+        np.broadcast_arrays(
+            np.asarray(T_c, dtype=float),
+            np.asarray(P_cool_kw, dtype=float),
+            np.asarray(P_site_kw, dtype=float),
+            np.asarray(sign, dtype=float),
+            np.log(np.asarray(ramp_rate_kw_per_s, dtype=float)),
+            np.log(np.asarray(horizon_s, dtype=float)),
+        ),
+        axis=-1,
+    ).reshape(-1, 6)
+
+
+@lru_cache(maxsize=None)
+def _exponents(n_features: int, degree: int) -> np.ndarray:
+    rows = [np.zeros(n_features, dtype=int)]
+    for k in range(1, degree + 1):
+        for combo in itertools.combinations_with_replacement(range(n_features), k):
+            rows.append(np.bincount(combo, minlength=n_features))
+    return np.array(rows)
+
+
+def _monomials(Z: np.ndarray, exponents: np.ndarray) -> np.ndarray:
+    return np.prod(Z[:, None, :] ** exponents[None, :, :], axis=2)
+
+
+@dataclass
+class PlannerSurrogate:
+    """
+    Fitted polynomial plus the box it was trained on. `lower`/`upper` bound the
+    raw features; the sign column is always in the box (both directions train).
+    `rmse_kw` is the in-sample residual over the fitted cells.
+    """
+    coef: np.ndarray
+    mean: np.ndarray
+    scale: np.ndarray
+    lower: np.ndarray
+    upper: np.ndarray
+    degree: int
+    dt_s: int
+    cfg_hash: str
+    rmse_kw: float
+    samples: int
+
+    def predict_kw(self, features: np.ndarray) -> np.ndarray:
+        """
+        Predicted feasible magnitudes (kW, >= 0) for raw feature rows; NaN
+        outside the training box.
+        """
+        X = np.atleast_2d(np.asarray(features, dtype=float))
+        Z = (X - self.mean) / self.scale
+        pred = np.maximum(_monomials(Z, _exponents(X.shape[1], self.degree)) @ self.coef, 0.0)
+        inside = np.all((X >= self.lower) & (X <= self.upper), axis=1)
+        return np.where(inside, pred, np.nan)
+
+    def hint_kw(
+        self,
+        state: ThermalTwinState,
+        P_site_kw: float,
+        deltaP_request_kw: float,
+        ramp_rate_kw_per_s: float,
+        horizon_s: int,
+        dt_s: int,
+        cfg_hash: str,
+    ) -> Optional[float]:
+        """
+        Signed `verify_kw` hint (shaved prediction), or None when the model does not apply.
+        """
+        if cfg_hash != self.cfg_hash or int(dt_s) != self.dt_s:
+            return None
+        sign = 1.0 if deltaP_request_kw >= 0.0 else -1.0
+        row = surrogate_features(
+            state.T_c, state.P_cool_kw, P_site_kw, sign, ramp_rate_kw_per_s, horizon_s
+        )
+        pred = float(self.predict_kw(row)[0])
+        if not pred > 0.0:
+            return None
+        return sign * pred * (1.0 - SURROGATE_SHAVE)
+
+    def save(self, path: str) -> None:
+        np.savez(
+            path,
+            coef=self.coef,
+            mean=self.mean,
+            scale=self.scale,
+            lower=self.lower,
+            upper=self.upper,
+            degree=self.degree,
+            dt_s=self.dt_s,
+            cfg_hash=np.array(self.cfg_hash),
+            rmse_kw=self.rmse_kw,
+            samples=self.samples,
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "PlannerSurrogate":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                coef=data["coef"],
+                mean=data["mean"],
+                scale=data["scale"],
+                lower=data["lower"],
+                upper=data["upper"],
+                degree=int(data["degree"]),
+                dt_s=int(data["dt_s"]),
+                cfg_hash=str(data["cfg_hash"]),
+                rmse_kw=float(data["rmse_kw"]),
+                samples=int(data["samples"]),
+            )
+
+
+def load_surrogate(path: str = SURROGATE_PATH) -> Optional[PlannerSurrogate]:
+    """
+    Loads a trained surrogate; None (with a warning) when missing or unreadable.
+    """
+    if not os.path.exists(path):
+        print(f"[WARN] Planner surrogate not found at {path}; planning without it.")
+        return None
+    try:
+        return PlannerSurrogate.load(path)
+    except Exception as e:
+        print(f"[WARN] Failed to load planner surrogate: {e}")
+        return None
+
+
+def generate_training_set(
+    cfg: ThermalTwinConfig,
+    states: int,
+    seed: Optional[int] = None,
+    site_kw: Tuple[float, float] = SURROGATE_SITE_KW,
+    ramp_kw_per_s: Tuple[float, float] = SURROGATE_RAMP_KW_PER_S,
+    horizons_s: Sequence[int] = SURROGATE_HORIZONS_S,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Returns (features, largest feasible magnitude kW, ramp reach kW) per
+    (state, direction, ramp rate, horizon) cell, states drawn uniformly over
+    the twin's temperature and cooling ranges.
+    """
+    rng = np.random.default_rng(seed)
+    horizons = np.asarray(horizons_s, dtype=int)
+    limits = np.array([float(cfg.max_export_kw), float(cfg.max_import_kw)])
+    signs = np.array([1.0, -1.0])
+    log_ramp = np.log(np.asarray(ramp_kw_per_s, dtype=float))
+    cfg_h = config_hash(cfg)
+
+    features, labels, reaches = [], [], []
+    for _ in range(int(states)):
+        state = ThermalTwinState(
+            T_c=float(rng.uniform(cfg.T_min, cfg.T_max)),
+            P_cool_kw=float(rng.uniform(cfg.Cooling_Min_KW, cfg.Cooling_Max_KW)),
+        )
+        P_site_kw = float(rng.uniform(*site_kw))
+        ramps = np.exp(rng.uniform(log_ramp[0], log_ramp[1], SURROGATE_RAMPS_PER_STATE))
+        frontier = compute_frontier(
+            cfg, state, P_site_kw, cfg_h, ramp_rates_kw_per_s=ramps, horizons_s=horizons
+        )
+        best = np.stack([frontier.export_kw, frontier.import_kw])  # (sign, ramp, horizon)
+        S, R, H = np.meshgrid(signs, ramps, horizons, indexing="ij")
+        reach = np.minimum(limits[:, None, None], R * H)
+        features.append(surrogate_features(state.T_c, state.P_cool_kw, P_site_kw, S, R, H))
+        labels.append(np.minimum(best, reach).ravel())
+        reaches.append(reach.ravel())
+    return np.concatenate(features), np.concatenate(labels), np.concatenate(reaches)
+
+
+def fit_surrogate(
+    features: np.ndarray,
+    best_kw: np.ndarray,
+    reach_kw: np.ndarray,
+    cfg_hash: str,
+    degree: int = SURROGATE_DEGREE,
+    dt_s: int = FRONTIER_DT_S,
+) -> PlannerSurrogate:
+    """
+    Least-squares fit over the cells where a limit binds below the reach.
+    """
+    X = np.asarray(features, dtype=float)
+    y = np.asarray(best_kw, dtype=float)
+    bound = y < np.asarray(reach_kw, dtype=float) * (1.0 - 1e-6)
+    if not bound.any():
+        raise ValueError("no training cell is limited below its ramp reach")
+    X, y = X[bound], y[bound]
+
+    mean = X.mean(axis=0)
+    scale = np.where(X.std(axis=0) > 0.0, X.std(axis=0), 1.0)
+    A = _monomials((X - mean) / scale, _exponents(X.shape[1], degree))
+    coef, *_ = np.linalg.lstsq(A, y, rcond=None)
+    residual = A @ coef - y
+    return PlannerSurrogate(
+        coef=coef,
+        mean=mean,
+        scale=scale,
+        lower=np.asarray(features, dtype=float).min(axis=0),
+        upper=np.asarray(features, dtype=float).max(axis=0),
+        degree=int(degree),
+        dt_s=int(dt_s),
+        cfg_hash=str(cfg_hash),
+        rmse_kw=float(np.sqrt(np.mean(residual ** 2))),
+        samples=int(y.size),
+    )
+
+
+def train_surrogate(cfg: ThermalTwinConfig, states: int, seed: Optional[int] = None) -> PlannerSurrogate:
+    X, y, reach = generate_training_set(cfg, states, seed=seed)
+    return fit_surrogate(X, y, reach, config_hash(cfg))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the planner surrogate offline.")
+    parser.add_argument("--states", type=int, default=2000, help="random twin states (96 cells each)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=SURROGATE_PATH)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    model = train_surrogate(ThermalTwinConfig(), args.states, seed=args.seed)
+    model.save(args.out)
+    print(
+        f"Trained on {model.samples} bound cells in {time.perf_counter() - t0:.1f} s, "
+        f"rmse {model.rmse_kw:.1f} kW -> {args.out}"
+    )
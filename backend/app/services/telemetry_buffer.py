@@ -0,0 +1,274 @@
+"""
+telemetry_buffer.py
+
+Purpose:
+  Recorded telemetry history: every tick's point goes into a preallocated NumPy
+  ring buffer (24 h at 1 Hz by default), and `/telemetry/timeseries` serves
+  slices of it instead of re-simulating a synthetic window.
+
+Method:
+  - One float64 column per numeric field, an int64 timestamp column
+    (microseconds since a naive epoch, so `ts` strings round-trip exactly) and
+    an int16 code per scenario id.
+  - Rows are written in place at `head`. Timestamps only grow, so the buffer
+    holds at most two sorted runs and a window query is a `searchsorted` per run.
+  - Downsampling strides the selected rows before they become dicts and always
+    keeps the newest one.
+  - Rollup tiers (ROLLUP_TIERS: 1 s, 10 s, 1 min, 15 min) keep min, max, sum,
+    count and last per field for each time bucket. Every append folds the point
+    into the open bucket of each tier in place. `rollup` serves a window from
+    the coarsest tier that still yields the requested point count, then merges
+    adjacent buckets (`reduceat`) down to that count. A 24 h query reads at most
+    1,440 one-minute buckets.
+
+Invariant:
+  - A point read back equals the point appended (None round-trips through NaN).
+  - Appending is O(1) and allocation-free apart from the scenario id table.
+  - A rollup point's `ts` is its newest sample's; its statistic covers every
+    sample of its buckets (min/max skip missing values, mean does not).
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# Default capacity: 24 h at one point per second.
+TELEMETRY_HISTORY_ROWS = 86_400
+# Numeric fields of a telemetry point (see TelemetryTimeseriesPoint).
+TELEMETRY_FIELDS: Tuple[str, ...] = (
+    "frequency_hz",
+    "rocof_hz_s",
+    "stress_score",
+    "it_load_kw",
+    "total_load_kw",
+    "safe_shift_kw",
+    "carbon_g_per_kwh",
+    "rack_temp_c",
+    "cooling_kw",
+    "q_passive_kw",
+    "q_active_kw",
+    "cooling_target_kw",
+    "cooling_cop",
+    "price_usd_per_mwh",
+    "t_sim_s",
+)
+
+# Rollup tiers: (bucket width s, buckets kept). The 1 s tier keeps 4 h, enough
+# for any window the 10 s tier is too coarse for (window < 10 * ROLLUP_MAX_POINTS).
+ROLLUP_TIERS: Tuple[Tuple[int, int], ...] = ((1, 14_400), (10, 8_640), (60, 1_440), (900, 96))
+# Largest point count a rollup query may ask for.
+ROLLUP_MAX_POINTS = 1000
+# Statistics a rollup query can return per field.
+ROLLUP_STATS: Tuple[str, ...] = ("mean", "min", "max", "last")
+
+_EPOCH = datetime(1970, 1, 1)
+_US = timedelta(microseconds=1)
+
+
+def ts_to_us(ts: datetime) -> int:
+    if ts.tzinfo is not None:
+        ts = ts.astimezone().replace(tzinfo=None)  # ticks are stamped in naive local time
+    return (ts - _EPOCH) // _US
+
+
+def us_to_ts(us: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=int(us))
+
+
+class _Ring:
+    """
+    Index bookkeeping shared by the raw ring and the rollup tiers: `head` is
+    the next row to write, `_ts` the row timestamps (only growing).
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, int(capacity))
+        self.head = 0
+        self.size = 0
+        self._ts = np.empty(self.capacity, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _advance(self) -> None:
+        self.head = self.head + 1 if self.head + 1 < self.capacity else 0
+        if self.size < self.capacity:
+            self.size += 1
+
+    def _runs(self) -> List[Tuple[int, int]]:
+        """
+        Physical (start, stop) slices holding the rows, oldest first.
+        """
+        if self.size < self.capacity:
+            return [(0, self.size)]
+        return [(self.head, self.capacity), (0, self.head)]
+
+    def _select_us(self, lo: int, hi: int) -> np.ndarray:
+        parts = []
+        for a, b in self._runs():
+            run = self._ts[a:b]
+            i, j = np.searchsorted(run, lo, side="right"), np.searchsorted(run, hi, side="right")
+            if j > i:
+                parts.append(np.arange(a + i, a + j))
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.intp)
+
+
+class _RollupTier(_Ring):
+    """
+    Fixed-width time buckets; the newest row is the open bucket.
+    """
+
+    def __init__(self, width_s: int, capacity: int):
+        super().__init__(capacity)
+        self.width_s = int(width_s)
+        self._width_us = self.width_s * 1_000_000
+        self._bucket = -1  # id of the open bucket
+        n = len(TELEMETRY_FIELDS)
+        self._count = np.empty(self.capacity, dtype=np.int64)
+        self._min = np.empty((self.capacity, n), dtype=float)
+        self._max = np.empty((self.capacity, n), dtype=float)
+        self._sum = np.empty((self.capacity, n), dtype=float)
+        self._last = np.empty((self.capacity, n), dtype=float)
+        self._scenario = np.empty(self.capacity, dtype=np.int16)
+
+    def add(self, ts_us: int, row: np.ndarray, code: int) -> None:
+        bucket = ts_us // self._width_us
+        if bucket == self._bucket:
+            i = self.head - 1
+            np.fmin(self._min[i], row, out=self._min[i])
+            np.fmax(self._max[i], row, out=self._max[i])
+            self._sum[i] += row
+            self._count[i] += 1
+        else:
+            i = self.head
+            self._advance()
+            self._bucket = bucket
+            self._min[i] = row
+            self._max[i] = row
+            self._sum[i] = row
+            self._count[i] = 1
+        self._ts[i] = ts_us
+        self._last[i] = row
+        self._scenario[i] = code
+
+    def merged(self, rows: np.ndarray, k: int, stat: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (newest ts, statistic, last scenario code) over groups of `k` buckets,
+        aligned so the newest group is whole.
+        """
+        n = rows.size
+        starts = np.maximum(n - k * np.arange(-(-n // k), 0, -1), 0)
+        ends = np.append(starts[1:], n) - 1
+        if stat == "mean":
+            values = np.add.reduceat(self._sum[rows], starts, axis=0) / np.add.reduceat(
+                self._count[rows], starts
+            )[:, None]
+        elif stat == "min":
+            values = np.fmin.reduceat(self._min[rows], starts, axis=0)
+        elif stat == "max":
+            values = np.fmax.reduceat(self._max[rows], starts, axis=0)
+        else:
+            values = self._last[rows[ends]]
+        return self._ts[rows[ends]], values, self._scenario[rows[ends]]
+
+
+class TelemetryRing(_Ring):
+    """
+    Fixed-capacity ring of telemetry points, oldest overwritten first, with
+    multi-resolution rollups of the same stream.
+    """
+
+    def __init__(
+        self,
+        capacity: int = TELEMETRY_HISTORY_ROWS,
+        tiers: Sequence[Tuple[int, int]] = ROLLUP_TIERS,
+    ):
+        super().__init__(capacity)
+        self._values = np.empty((self.capacity, len(TELEMETRY_FIELDS)), dtype=float)
+        self._scenario = np.empty(self.capacity, dtype=np.int16)
+        self._scenario_ids: List[Optional[str]] = [None]
+        self._scenario_codes: Dict[Optional[str], int] = {None: 0}
+        self.tiers = [_RollupTier(width_s, rows) for width_s, rows in sorted(tiers)]
+
+    def append(self, point: Dict[str, Any]) -> None:
+        i = self.head
+        ts_us = ts_to_us(datetime.fromisoformat(point["ts"]))
+        row = self._values[i]
+        row[:] = [point.get(name) for name in TELEMETRY_FIELDS]  # None -> NaN
+        sid = point.get("scenario_id")
+        code = self._scenario_codes.get(sid)
+        if code is None:
+            code = self._scenario_codes[sid] = len(self._scenario_ids)
+            self._scenario_ids.append(sid)
+        self._ts[i] = ts_us
+        self._scenario[i] = code
+        self._advance()
+        for tier in self.tiers:
+            tier.add(ts_us, row, code)
+
+    def select(self, start: datetime, end: datetime) -> np.ndarray:
+        """
+        Physical row indices with start < ts <= end, oldest first.
+        """
+        return self._select_us(ts_to_us(start), ts_to_us(end))
+
+    def points(self, rows: np.ndarray, max_points: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Telemetry dicts for physical `rows`, strided down to at most `max_points`
+        (the newest row always kept).
+        """
+        rows = np.asarray(rows)
+        if max_points is not None and rows.size > max_points > 0:
+            stride = -(-rows.size // int(max_points))
+            rows = rows[::-1][::stride][::-1]
+        return self._dicts(self._ts[rows], self._values[rows], self._scenario[rows])
+
+    def _dicts(
+        self, ts_us: np.ndarray, values: np.ndarray, codes: np.ndarray, bucket_s: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        out = []
+        for t, row, code in zip(ts_us.tolist(), values.tolist(), codes.tolist()):
+            point: Dict[str, Any] = {"ts": us_to_ts(t).isoformat()}
+            for name, v in zip(TELEMETRY_FIELDS, row):
+                point[name] = None if v != v else v
+            point["scenario_id"] = self._scenario_ids[code]
+            if bucket_s is not None:
+                point["bucket_s"] = bucket_s
+            out.append(point)
+        return out
+
+    def window(self, start: datetime, end: datetime, max_points: Optional[int] = None) -> List[Dict[str, Any]]:
+        return self.points(self.select(start, end), max_points=max_points)
+
+    def tier_for(self, window_s: float, points: int) -> "_RollupTier":
+        """
+        The coarsest tier with at least `points` buckets in `window_s` (else the finest).
+        """
+        for tier in reversed(self.tiers):
+            if window_s / tier.width_s >= points:
+                return tier
+        return self.tiers[0]
+
+    def rollup(self, start: datetime, end: datetime, points: int, stat: str = "mean") -> List[Dict[str, Any]]:
+        """
+        At most `points` aggregated points over (start, end]; each carries
+        `bucket_s`, the seconds it aggregates.
+        """
+        if stat not in ROLLUP_STATS:
+            raise ValueError(f"unknown rollup statistic {stat!r}")
+        points = max(1, int(points))
+        tier = self.tier_for((end - start).total_seconds(), points)
+        rows = tier._select_us(ts_to_us(start), ts_to_us(end))
+        if not rows.size:
+            return []
+        k = -(-rows.size // points)
+        ts_us, values, codes = tier.merged(rows, k, stat)
+        return self._dicts(ts_us, values, codes, bucket_s=float(tier.width_s * k))
+
+    def last_ts(self) -> Optional[datetime]:
+        if not self.size:
+            return None
+        return us_to_ts(self._ts[self.head - 1])
@@ -0,0 +1,209 @@
+"""
+thermal_network.py
+
+Purpose:
+  Multi-zone thermal model of a site: racks, aisles and CRAC units, each a
+  lumped zone, coupled by conductances.
+
+Model:
+  - Every zone is one element of a `ThermalTwinBatch` (own mass, cooling
+    controller, passive loss to ambient, limits). Aisles are passive air
+    volumes (no active cooling); CRAC zones carry the large cooling plant.
+  - Coupling: q_exchange = L @ T with L the sparse graph Laplacian of the
+    symmetric conductance matrix G (kW/C): L_ij = G_ij, L_ii = -sum_j G_ij.
+    The exchanged heat is added to each zone's load for the twin step, so
+    the controllers see conducted heat like IT heat.
+  - Explicit Euler: stable while dt * (K_i + sum_j G_ij) <= C_i for every
+    zone (`max_stable_dt_s`).
+
+Queries:
+  - `hottest_zone()` and `margin_over_horizon()` answer "how close is the
+    hottest zone to its T_max" with whole-network array passes, never one
+    zone at a time.
+
+Optional dependency:
+  - scipy.sparse (CSR products). Without it the product runs on the COO edge
+    list with `np.bincount`.
+"""
+from __future__ import annotations
+
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.models.domain import ThermalTwinConfig
+from app.services.physics_engine import ThermalTwinBatch
+
+# Optional dependency
+try:
+    from scipy.sparse import csr_matrix
+except Exception:  # pragma: no cover - exercised only without scipy
+    csr_matrix = None  # type: ignore
+
+
+ZONE_KINDS: Tuple[str, ...] = ("rack", "aisle", "crac")
+
+
+class ThermalNetwork:
+    """
+    Zones of a `ThermalTwinBatch` coupled by a sparse conductance matrix.
+    """
+
+    __slots__ = ("batch", "kinds", "_rows", "_cols", "_vals", "_laplacian", "_stable_dt_s")
+
+    def __init__(
+        self,
+        batch: ThermalTwinBatch,
+        kinds: Sequence[str],
+        edges_i: Sequence[int],
+        edges_j: Sequence[int],
+        conductance_kw_per_c: Sequence[float],
+    ):
+        """
+        Each edge (i, j, g) couples zones i and j both ways with conductance g.
+        """
+        n = len(batch)
+        self.batch = batch
+        self.kinds = np.asarray(kinds)
+        if self.kinds.shape != (n,) or not np.isin(self.kinds, ZONE_KINDS).all():
+            raise ValueError(f"kinds must be one of {ZONE_KINDS} per zone")
+        i = np.asarray(edges_i, dtype=np.int64)
+        j = np.asarray(edges_j, dtype=np.int64)
+        g = np.asarray(conductance_kw_per_c, dtype=float)
+        if not (i.shape == j.shape == g.shape):
+            raise ValueError("edge arrays must have the same length")
+        if i.size and (min(i.min(), j.min()) < 0 or max(i.max(), j.max()) >= n or (i == j).any()):
+            raise ValueError("edges must join two distinct zones of the batch")
+        if (g < 0.0).any():
+            raise ValueError("conductances must be non-negative")
+
+        degree = np.bincount(i, weights=g, minlength=n) + np.bincount(j, weights=g, minlength=n)
+        # Laplacian in COO form: off-diagonal pairs both ways, then the diagonal.
+        self._rows = np.concatenate((i, j, np.arange(n)))
+        self._cols = np.concatenate((j, i, np.arange(n)))
+        self._vals = np.concatenate((g, g, -degree))
+        self._laplacian = (
+            csr_matrix((self._vals, (self._rows, self._cols)), shape=(n, n)) if csr_matrix is not None else None
+        )
+
+        p = batch.params
+        # Smallest mass each zone can have (the dynamic coolant mass is clamped from below).
+        C = np.where(p["use_dynamic_coolant_mass"], 900.0 * p["coolant_volume_m3"] * 2500.0 / 1000.0, p["C_mass"])
+        rate = p["K_transfer"] + degree
+        with np.errstate(divide="ignore"):
+            self._stable_dt_s = float(np.min(np.where(rate > 0.0, np.maximum(1e-3, C) / rate, np.inf)))
+
+    def __len__(self) -> int:
+        return len(self.batch)
+
+    @property
+    def T_c(self) -> np.ndarray:
+        return self.batch.T_c
+
+    def exchange_kw(self, T_c: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Heat conducted into each zone (kW) at temperatures T_c (default: current).
+        """
+        T = self.batch.T_c if T_c is None else np.asarray(T_c, dtype=float)
+        if self._laplacian is not None:
+            return self._laplacian @ T
+        return np.bincount(self._rows, weights=self._vals * T[self._cols], minlength=T.size)
+
+    def max_stable_dt_s(self) -> float:
+        return self._stable_dt_s
+
+    def predict(self, P_it_kw: np.ndarray, dt_s: float) -> Dict[str, np.ndarray]:
+        """
+        One network tick: every zone's twin step with its IT load plus the
+        heat conducted in from its neighbours. State is unchanged.
+        """
+        if float(dt_s) > self._stable_dt_s:
+            raise ValueError(f"dt_s={dt_s} exceeds the explicit stability limit {self._stable_dt_s:.3g} s")
+        q_exchange = self.exchange_kw()
+        pred = self.batch.predict(np.asarray(P_it_kw, dtype=float) + q_exchange, dt_s)
+        pred["q_exchange_kw"] = q_exchange
+        return pred
+
+    def step(self, P_it_kw: np.ndarray, dt_s: float) -> Dict[str, np.ndarray]:
+        pred = self.predict(P_it_kw, dt_s)
+        # Commit state update
+        self.batch.T_c = pred["rack_temp_c_next"]
+        self.batch.P_cool_kw = pred["cooling_kw_next"]
+        return pred
+
+    def hottest_zone(self) -> Tuple[int, float]:
+        """
+        (zone index, T_max - T) of the zone with the least thermal margin.
+        """
+        margin = self.batch.params["T_max"] - self.batch.T_c
+        idx = int(np.argmin(margin))
+        return idx, float(margin[idx])
+
+    def margin_over_horizon(self, P_it_kw: np.ndarray, dt_s: float, steps_n: int) -> Tuple[int, int, float]:
+        """
+        Rolls a copy of the network forward under constant IT load and returns
+        (zone index, step, margin) of the smallest T_max - T over the horizon.
+        """
+        saved_T, saved_P = self.batch.T_c, self.batch.P_cool_kw
+        worst = (0, -1, np.inf)
+        try:
+            for k in range(int(steps_n)):
+                pred = self.step(P_it_kw, dt_s)
+                margin = self.batch.params["T_max"] - pred["rack_temp_c_next"]
+                idx = int(np.argmin(margin))
+                if margin[idx] < worst[2]:
+                    worst = (idx, k, float(margin[idx]))
+        finally:
+            self.batch.T_c, self.batch.P_cool_kw = saved_T, saved_P
+        return worst
+
+
+def build_row_network(
+    cfg: ThermalTwinConfig,
+    rows: int,
+    racks_per_row: int,
+    racks_per_crac: int = 10,
+    rack_neighbor_kw_per_c: float = 0.5,
+    rack_aisle_kw_per_c: float = 2.0,
+    aisle_crac_kw_per_c: float = 20.0,
+    aisle_C_kj_per_c_per_rack: float = 10.0,
+    T_c: float = 27.0,
+) -> ThermalNetwork:
+    """
+    Hot-aisle layout: each row is a line of racks (coupled to their
+    neighbours) sharing one aisle zone; every `racks_per_crac` racks of a row
+    add one CRAC zone on that aisle. Racks and aisles are passive (no active
+    cooling; an aisle's air mass grows with its row length); CRAC units carry
+    `cfg`'s cooling plant and no IT load.
+    Zone order: racks (row-major), then aisles, then CRACs.
+    """
+    n_racks = rows * racks_per_row
+    cracs_per_row = max(1, -(-racks_per_row // max(1, racks_per_crac)))
+    n_aisles, n_cracs = rows, rows * cracs_per_row
+    n = n_racks + n_aisles + n_cracs
+    kinds = np.array(["rack"] * n_racks + ["aisle"] * n_aisles + ["crac"] * n_cracs)
+
+    rack = np.arange(n_racks).reshape(rows, racks_per_row)
+    aisle = n_racks + np.arange(rows)
+    crac = (n_racks + n_aisles + np.arange(n_cracs)).reshape(rows, cracs_per_row)
+    edges = [
+        (rack[:, :-1].ravel(), rack[:, 1:].ravel(), rack_neighbor_kw_per_c),
+        (rack.ravel(), np.repeat(aisle, racks_per_row), rack_aisle_kw_per_c),
+        (crac.ravel(), np.repeat(aisle, cracs_per_row), aisle_crac_kw_per_c),
+    ]
+    i = np.concatenate([e[0] for e in edges])
+    j = np.concatenate([e[1] for e in edges])
+    g = np.concatenate([np.full(e[0].size, e[2]) for e in edges])
+
+    is_aisle = kinds == "aisle"
+    is_crac = kinds == "crac"
+    batch = ThermalTwinBatch(
+        cfg,
+        np.full(n, T_c),
+        np.where(is_crac, float(cfg.Cooling_Min_KW), 0.0),
+        C_mass=np.where(is_aisle, aisle_C_kj_per_c_per_rack * racks_per_row, float(cfg.C_mass)),
+        use_dynamic_coolant_mass=np.where(is_aisle, False, bool(cfg.use_dynamic_coolant_mass)),
+        Cooling_Min_KW=np.where(is_crac, float(cfg.Cooling_Min_KW), 0.0),
+        Cooling_Max_KW=np.where(is_crac, float(cfg.Cooling_Max_KW), 0.0),
+    )
+    return ThermalNetwork(batch, kinds, i, j, g)
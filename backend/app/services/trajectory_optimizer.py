@@ -0,0 +1,187 @@
+"""
+trajectory_optimizer.py
+
+Purpose:
+  Plans the whole deltaP trajectory over the horizon with one linear program,
+  instead of bisecting over constant-rate ramps toward a single target.
+
+Model:
+  - Linearization: `thermal_sensitivity` rolls a reference profile out with
+    `ThermalTwin.predict` semantics and carries dT/d(deltaP) forward through
+    the cooling controller on each step's active branch (deadband, clamps,
+    actuator ramp). The first reference is the zero shift, later ones the
+    previous solution (sequential linear programming).
+  - LP over magnitudes u (deltaP = sign * u), maximizing delivered energy:
+        0 <= u_i <= cap
+        |u_i - u_{i-1}| <= ramp * dt                          (u_{-1} = 0)
+        T_ref + G (sign * u - ref) <= T_max - 0.5 - margin
+        sum(u) <= wear budget / wear per kW-step              (aging factor at
+                  its clamp, cooling moving at its ramp limit every step)
+
+Verification:
+  - Every LP profile is re-simulated exactly (`simulate_profile`, same gates
+    as the constant-ramp planner); the best verified profile wins. The loop
+    stops when a solve repeats the previous one or after OPTIMIZER_MAX_SOLVES.
+  - If no solve verifies, scaled copies of the last profile are checked in one
+    batched rollout. Returns None when nothing verifies; the planner then
+    falls back to the constant-ramp search.
+
+Optional dependency:
+  - scipy (HiGHS via `scipy.optimize.linprog`). Without it `optimize_ramp_profile`
+    returns None.
+"""
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+
+from app.models.domain import BatteryDegradationConfig, ThermalTwinConfig, ThermalTwinState
+from app.services.physics_engine import ThermalTwin, TwinState
+from app.services.policy_engine import CandidateRollout, simulate_profile
+
+# Optional dependency
+try:
+    from scipy.optimize import linprog
+except Exception:  # pragma: no cover - exercised only without scipy
+    linprog = None  # type: ignore
+
+
+# LP solves per decision (each re-linearized around the previous solution).
+OPTIMIZER_MAX_SOLVES = 3
+# Extra margin below the 0.5 C thin-margin gate, absorbing linearization error.
+OPTIMIZER_T_MARGIN_C = 0.05
+# Scale factors tried (one batched rollout) when no LP profile verifies.
+OPTIMIZER_FALLBACK_SCALES = np.linspace(1.0, 0.05, 20)
+
+
+@dataclass
+class TrajectoryResult:
+    """
+    Best verified profile (`rollout` row `idx`) and the work spent finding it.
+    """
+    rollout: CandidateRollout
+    idx: int
+    energy_kwh: float
+    solves: int
+    simulations: int
+    sim_steps: int
+    partial: bool = False
+
+
+def optimizer_available() -> bool:
+    return linprog is not None
+
+
+def thermal_sensitivity(
+    P_site_kw: float,
+    cfg: ThermalTwinConfig,
+    state: ThermalTwinState,
+    profile_kw: np.ndarray,
+    dt_s: float,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Rolls `profile_kw` out with `ThermalTwin.predict` semantics and returns
+    (T, G) where T[i] is the temperature after step i and
+    G[i, j] = dT_i / d deltaP_j along that trajectory
+    (`ThermalTwin.deltaP_sensitivity`; lower triangular).
+    """
+    twin = ThermalTwin(cfg, TwinState(float(state.T_c), float(state.P_cool_kw)))
+    return twin.deltaP_sensitivity(P_site_kw, profile_kw, dt_s)
+
+
+def _solve_lp(
+    G_signed: np.ndarray,
+    t_room: np.ndarray,
+    cap_mag: float,
+    max_step: float,
+    wear_sum: float,
+) -> Optional[np.ndarray]:
+    n = t_room.size
+    diff = np.eye(n) - np.eye(n, k=-1)
+    A_ub = np.vstack((G_signed, diff, -diff, np.ones((1, n))))
+    b_ub = np.concatenate((t_room, np.full(n, max_step), np.full(n, max_step), [wear_sum]))
+    res = linprog(-np.ones(n), A_ub=A_ub, b_ub=b_ub, bounds=(0.0, cap_mag), method="highs")
+    if res.status != 0:
+        return None
+    # Clip solver round-off so the profile respects its bounds exactly.
+    return np.clip(res.x, 0.0, cap_mag)
+
+
+def optimize_ramp_profile(
+    P_site_kw: float,
+    cfg: ThermalTwinConfig,
+    state: ThermalTwinState,
+    deltaP_cap_kw: float,
+    steps_n: int,
+    dt_s: float,
+    ramp_rate_kw_per_s: float,
+    batt_cfg: Optional[BatteryDegradationConfig] = None,
+    deadline: Optional[float] = None,
+) -> Optional[TrajectoryResult]:
+    """
+    Largest-energy verified deltaP profile toward `deltaP_cap_kw` (signed), or None.
+    Past `deadline` (a `time.perf_counter()` instant) no further solve starts.
+    """
+    if linprog is None or deltaP_cap_kw == 0.0:
+        return None
+    batt_cfg = batt_cfg or BatteryDegradationConfig()
+    sign = 1.0 if deltaP_cap_kw > 0.0 else -1.0
+    cap_mag = abs(float(deltaP_cap_kw))
+    dt = float(dt_s)
+    max_step = float(ramp_rate_kw_per_s) * dt
+
+    limit = float(cfg.T_max) - 0.5 - OPTIMIZER_T_MARGIN_C
+
+    # Conservative linear wear: aging factor at its clamp, cooling moving at its ramp limit every step.
+    T_age_k = min(float(cfg.T_max), float(batt_cfg.max_temp_for_aging_c)) + 273.15
+    wear_rate = float(batt_cfg.k_aging) * float(np.exp(-batt_cfg.Ea / (batt_cfg.R_gas * T_age_k))) * dt
+    cool_wear = steps_n * float(cfg.Cooling_Ramp_Max) * dt
+    wear_sum = float(batt_cfg.max_cap_loss_frac_per_decision) / wear_rate - cool_wear if wear_rate > 0.0 else np.inf
+    if wear_sum <= 0.0:
+        return None
+    wear_sum = min(wear_sum, cap_mag * steps_n)
+
+    best: Optional[TrajectoryResult] = None
+    ref = np.zeros(steps_n)  # signed reference profile of the linearization
+    last_u: Optional[np.ndarray] = None
+    solves = simulations = sim_steps = 0
+    partial = False
+    for _ in range(OPTIMIZER_MAX_SOLVES):
+        if solves > 0 and deadline is not None and time.perf_counter() >= deadline:
+            partial = True
+            break
+        T_ref, G = thermal_sensitivity(P_site_kw, cfg, state, ref, dt)
+        # T(u) ~= T_ref + G (sign * u - ref) <= limit
+        u = _solve_lp(sign * G, limit - T_ref + G @ ref, cap_mag, max_step, wear_sum)
+        solves += 1
+        if u is None:
+            break
+        rollout = simulate_profile(P_site_kw, cfg, state, sign * u, dt, ramp_rate_kw_per_s, batt_cfg)
+        simulations += 1
+        sim_steps += rollout.steps_integrated
+        energy = float(u.sum()) * dt / 3600.0
+        if bool(rollout.feasible[0]) and (best is None or energy > best.energy_kwh):
+            best = TrajectoryResult(rollout, 0, energy, solves, simulations, sim_steps)
+        if last_u is not None and np.allclose(u, last_u, atol=1e-3 * max(1.0, cap_mag)):
+            break
+        last_u = u
+        ref = sign * u
+
+    if best is None and last_u is not None and not partial:
+        profiles = sign * OPTIMIZER_FALLBACK_SCALES[:, None] * last_u[None, :]
+        rollout = simulate_profile(P_site_kw, cfg, state, profiles, dt, ramp_rate_kw_per_s, batt_cfg)
+        simulations += profiles.shape[0]
+        sim_steps += rollout.steps_integrated
+        ok = np.flatnonzero(rollout.feasible)
+        if ok.size:
+            idx = int(ok[0])  # scales are descending
+            energy = float(np.abs(profiles[idx]).sum()) * dt / 3600.0
+            best = TrajectoryResult(rollout, idx, energy, solves, simulations, sim_steps)
+
+    if best is not None:
+        best.solves, best.simulations, best.sim_steps = solves, simulations, sim_steps
+        best.partial = partial
+    return best
@@ -23,6 +23,7 @@ from app.api import (
     routes_grid,
     routes_ws,
     routes_explain,
+    routes_sim,
 )
 
 
@@ -102,24 +103,52 @@ Routes:
   - `/grid`: Topology and ML inference.
   - `/telemetry`: Live streaming (SSE).
   - `/health`: Liveness probes.
+  - `/sim`: Offline what-if runs (fast-forward).
 
 Environment:
   - `PORT`: Server port (default 8000).
   - `DEBUG`: Enable verbose logging.
 """
 from contextlib import asynccontextmanager
+from typing import Optional
+
+TICK_PERIOD_S = 1.0
+
+
+async def refresh_frontier_task(svc) -> None:
+    try:
+        await svc.refresh_frontier()
+    except Exception as e:
+        print(f"[FRONTIER REFRESH ERROR] {e}")
+
 
 async def simulation_tick_loop():
     """
-    Background task that advances the digital twin physics every second.
+    Background task that advances the digital twin physics every second,
+    then precomputes the feasibility frontier for the new state.
+
+    Ticks follow a fixed schedule (sleep until the next tick time, not a fixed
+    delay), so the twin clock stays at 1 Hz. The frontier refresh runs as its
+    own task, at most one at a time, and never delays the next tick.
     """
     svc = get_twin_service()
+    loop = asyncio.get_running_loop()
+    next_tick = loop.time()
+    refresh: Optional[asyncio.Task] = None
     while True:
         try:
-            await svc.tick(dt_s=1.0)
+            await svc.tick(dt_s=TICK_PERIOD_S)
+            if refresh is None or refresh.done():
+                refresh = asyncio.create_task(refresh_frontier_task(svc))
         except Exception as e:
             print(f"[SIM LOOP ERROR] {e}")
-        await asyncio.sleep(1.0)
+        next_tick += TICK_PERIOD_S
+        delay = next_tick - loop.time()
+        if delay < 0.0:
+            # Overran a whole period: resync instead of bursting to catch up.
+            next_tick = loop.time()
+            delay = 0.0
+        await asyncio.sleep(delay)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -165,6 +194,7 @@ app.include_router(routes_grid.router, prefix="/grid", tags=["Grid"])
 app.include_router(routes_ws.router, tags=["WebSocket"])
 app.include_router(routes_explain.router, prefix="/explain", tags=["Explain"])
 app.include_router(routes_demo.router, prefix="/demo", tags=["Demo"])
+app.include_router(routes_sim.router, prefix="/sim", tags=["Simulation"])
 
 
 # ============================================================
@@ -31,7 +31,8 @@ def test_telemetry_timeseries(client: TestClient):
     data = response.json()
     
     assert isinstance(data, list)
-    assert len(data) == 60 # requested 60 points logic usually returns fixed or steps
+    # Recorded ticks (1 Hz), or the 60-point synthetic window before the first tick
+    assert 1 <= len(data) <= 60
     
     # check structure of first point
     p0 = data[0]
@@ -39,6 +40,12 @@ def test_telemetry_timeseries(client: TestClient):
     assert "total_load_kw" in p0
     assert "safe_shift_kw" in p0
 
+def test_telemetry_timeseries_rollups(client: TestClient):
+    response = client.get("/telemetry/timeseries", params={"window_s": 86400, "points": 100, "stat": "max"})
+    assert response.status_code == 200
+    assert 1 <= len(response.json()) <= 100
+    assert client.get("/telemetry/timeseries", params={"stat": "median"}).status_code == 422
+
 def test_kpi_summary(client: TestClient):
     response = client.get("/kpi/summary?window_s=900")
     assert response.status_code == 200
@@ -47,3 +54,33 @@ def test_kpi_summary(client: TestClient):
     assert "unsafe_actions_prevented_total" in data
     assert "blocked_rate_pct" in data
     assert "top_blocked_rules" in data
+
+def test_decision_frontier(client: TestClient):
+    """Frontier is read-only; 503 until the tick loop has computed the first one."""
+    response = client.get("/decision/frontier")
+    assert response.status_code in (200, 503)
+    if response.status_code == 200:
+        data = response.json()
+        n_r, n_h = len(data["ramp_rates_kw_per_s"]), len(data["horizons_s"])
+        assert len(data["max_export_kw"]) == n_r and len(data["max_export_kw"][0]) == n_h
+        assert len(data["max_import_kw"]) == n_r
+        assert set(data["state"]) == {"T_c", "P_cool_kw"}
+
+def test_decision_latest_with_deadline(client: TestClient):
+    params = {"deltaP_request_kw": -2000.0, "grid_headroom_kw": 5000.0, "P_site_kw": 1950.0, "deadline_ms": 1}
+    response = client.get("/decision/latest", params=params)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["prediction_debug"]["planner_partial"] in (0.0, 1.0)
+    assert data["prediction_debug"]["search_bracket_kw"] >= 0.0
+    assert -2000.0 <= data["approved_deltaP_kw"] <= 0.0
+
+    assert client.get("/decision/latest", params={**params, "deadline_ms": 0}).status_code == 422
+    assert "deadline_partial" in client.get("/decision/metrics").json()
+
+def test_telemetry_calibration(client: TestClient):
+    response = client.get("/telemetry/calibration")
+    assert response.status_code == 200
+    data = response.json()
+    assert {"K_transfer", "K_transfer_std", "Cooling_COP", "C_mass", "samples"} <= set(data["fitted"])
+    assert data["configured"]["Cooling_COP"] == 4.0
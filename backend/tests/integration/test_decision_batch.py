@@ -0,0 +1,64 @@
+"""
+test_decision_batch.py
+
+Integration tests for POST /decision/batch.
+"""
+from fastapi.testclient import TestClient
+
+from app.models.domain import ThermalTwinState
+from app.services.digital_twin import DigitalTwinService
+
+
+def test_batch_preserves_order(client: TestClient):
+    items = [
+        {"deltaP_request_kw": 50.0, "P_site_kw": 1000.0, "grid_headroom_kw": 500.0},
+        {"deltaP_request_kw": 400.0, "P_site_kw": 1000.0, "grid_headroom_kw": 500.0},
+        {"deltaP_request_kw": -300.0, "P_site_kw": 1000.0, "grid_headroom_kw": 500.0},
+        {"deltaP_request_kw": 50.0, "P_site_kw": 1000.0, "grid_headroom_kw": 500.0},
+        {"deltaP_request_kw": 900.0, "P_site_kw": 1000.0, "grid_headroom_kw": 0.0},
+    ]
+    response = client.post("/decision/batch", json={"items": items, "trace_level": "final"})
+    assert response.status_code == 200
+    data = response.json()
+
+    assert [d["requested_deltaP_kw"] for d in data["items"]] == [i["deltaP_request_kw"] for i in items]
+    assert len({d["decision_id"] for d in data["items"]}) == len(items)
+    assert data["items"][4]["blocked"] is True
+    assert data["items"][0]["approved_deltaP_kw"] == data["items"][3]["approved_deltaP_kw"]
+    for d in data["items"]:
+        assert abs(d["approved_deltaP_kw"]) <= abs(d["requested_deltaP_kw"]) + 1e-6
+        assert any(e["rule_id"] == "HEADROOM_SOURCE" for e in d["trace"])
+        assert not any(e["phase"] == "candidate" for e in d["trace"])
+
+    assert set(data["snapshot"]) == {"T_c", "P_cool_kw"}
+
+    recent = client.get("/decision/recent?limit=200&coalesce=false").json()["items"]
+    persisted = {r["decision_id"] for r in recent}
+    assert {d["decision_id"] for d in data["items"]} <= persisted
+
+
+def test_batch_uses_one_snapshot_without_committing():
+    svc = DigitalTwinService()
+    svc.therm_state = ThermalTwinState(T_c=40.0, P_cool_kw=250.0)
+    requests = [
+        {"deltaP_request_kw": kw, "P_site_kw": 1000.0, "grid_headroom_kw": 2000.0}
+        for kw in (100.0, 200.0, -150.0, 100.0)
+    ]
+
+    result = svc.decide_batch(requests, trace_level="final")
+
+    # Batch evaluation never commits the twin state.
+    assert (svc.therm_state.T_c, svc.therm_state.P_cool_kw) == (40.0, 250.0)
+    assert result["snapshot"] == {"T_c": 40.0, "P_cool_kw": 250.0}
+    # Each answer equals a standalone decision from the same snapshot.
+    for req, out in zip(requests, result["items"]):
+        single = DigitalTwinService()
+        single.therm_state = ThermalTwinState(T_c=40.0, P_cool_kw=250.0)
+        expected = single.decide(trace_level="final", **req)
+        assert abs(out["approved_deltaP_kw"] - expected["approved_deltaP_kw"]) < 1e-3
+
+
+def test_batch_rejects_empty_and_out_of_range(client: TestClient):
+    assert client.post("/decision/batch", json={"items": []}).status_code == 422
+    bad = {"items": [{"deltaP_request_kw": 99999.0, "P_site_kw": 1000.0}]}
+    assert client.post("/decision/batch", json=bad).status_code == 422
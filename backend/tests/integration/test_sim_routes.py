@@ -0,0 +1,103 @@
+"""
+test_sim_routes.py
+
+Integration tests for POST /sim/fastforward and DigitalTwinService.fast_forward.
+"""
+import asyncio
+import json
+import threading
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.models.domain import ThermalTwinState
+from app.services.digital_twin import DigitalTwinService
+
+
+def _service() -> DigitalTwinService:
+    svc = DigitalTwinService()
+    svc.set_demo_mode(False, deterministic=True, seed=11)
+    svc.therm_state = ThermalTwinState(T_c=29.0, P_cool_kw=240.0)
+    return svc
+
+
+def test_fast_forward_matches_live_ticks_without_touching_the_twin():
+    svc = _service()
+    rng_state = svc._rng.getstate()
+    points = list(svc.fast_forward(120.0, sample_every_s=1.0))
+    assert len(points) == 120
+    assert svc.therm_state == ThermalTwinState(T_c=29.0, P_cool_kw=240.0)
+    assert svc._rng.getstate() == rng_state
+
+    for p in points:
+        asyncio.run(svc.tick(dt_s=1.0))
+        latest = svc.get_latest_telemetry()
+        assert p["rack_temp_c"] == latest["rack_temp_c"]
+        assert p["cooling_kw"] == latest["cooling_kw"]
+        assert p["it_load_kw"] == latest["it_load_kw"]
+        assert p["frequency_hz"] == latest["frequency_hz"]
+
+
+def test_fast_forward_heat_wave_what_if():
+    svc = _service()
+    calm = list(svc.fast_forward(900.0, sample_every_s=60.0))
+    hot = list(svc.fast_forward(900.0, sample_every_s=60.0, scenario_id="heat_wave"))
+    assert len(calm) == len(hot) == 15
+    # The controller holds the rack near setpoint; the heat wave shows up as cooling draw.
+    assert sum(p["cooling_kw"] for p in hot[:10]) > 1.5 * sum(p["cooling_kw"] for p in calm[:10])
+    assert all(p["thermal_ok"] for p in hot)
+    assert hot[0]["scenario_id"] == "heat_wave" and hot[-1]["scenario_id"] is None  # ends after 600 s
+    assert svc.get_demo_status()["active"] is False
+
+
+def test_fast_forward_treats_t_max_as_a_strict_limit():
+    svc = _service()
+    peak = next(svc.fast_forward(60.0, sample_every_s=60.0))["rack_temp_c_max"]
+    # Same strict `< T_max` as ThermalTwin: a peak sitting exactly on the limit is not ok.
+    svc.therm_cfg = svc.therm_cfg.model_copy(update={"T_max": peak})
+    point = next(svc.fast_forward(60.0, sample_every_s=60.0))
+    assert point["rack_temp_c_max"] == peak
+    assert point["thermal_ok"] is False
+
+
+def test_fastforward_streams_ndjson(client: TestClient):
+    response = client.post("/sim/fastforward", json={"duration_s": 7200, "sample_every_s": 300})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [p["t_sim_s"] for p in lines] == [300.0 * (i + 1) for i in range(24)]
+    assert all({"rack_temp_c", "rack_temp_c_max", "it_load_kw", "thermal_ok"} <= set(p) for p in lines)
+
+    assert client.post("/sim/fastforward", json={"scenario_id": "meteor"}).status_code == 400
+    assert client.post("/sim/fastforward", json={"duration_s": 604800, "sample_every_s": 1}).status_code == 422
+    # Few points but ~6M ticks: capped on ticks run, not just points sent.
+    big = {"duration_s": 604800, "dt_s": 0.1, "sample_every_s": 86400}
+    assert client.post("/sim/fastforward", json=big).status_code == 422
+
+
+def test_fastforward_limits_concurrent_runs(client: TestClient):
+    slots = threading.BoundedSemaphore(1)
+    body = {"duration_s": 600, "sample_every_s": 60}
+    with patch("app.api.routes_sim.get_sim_run_slots", return_value=slots):
+        # A finished stream frees its slot, so runs back to back all get one.
+        for _ in range(3):
+            assert client.post("/sim/fastforward", json=body).status_code == 200
+
+        slots.acquire()  # another run in progress
+        response = client.post("/sim/fastforward", json=body)
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "5"
+        slots.release()
+        assert client.post("/sim/fastforward", json=body).status_code == 200
+
+
+def test_fastforward_slot_freed_when_stream_is_dropped_unread():
+    from app.api.routes_sim import sim_fastforward
+    from app.models.domain import FastForwardRequest
+
+    slots = threading.BoundedSemaphore(1)
+    with patch("app.api.routes_sim.get_sim_run_slots", return_value=slots):
+        response = asyncio.run(sim_fastforward(FastForwardRequest(duration_s=600)))
+        assert not slots.acquire(blocking=False)
+        del response  # client gone before the first chunk
+        assert slots.acquire(blocking=False)
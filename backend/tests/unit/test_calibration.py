@@ -0,0 +1,123 @@
+import asyncio
+import random
+
+import numpy as np
+import pytest
+
+from app.models.domain import ThermalTwinConfig, ThermalTwinState
+from app.services.calibration import ThermalCalibrator, fit_window
+from app.services.digital_twin import DigitalTwinService, demo_scenario_effects
+from app.services.physics_engine import ThermalTwin
+
+# The "plant": the twin with parameters off the configured ones.
+TRUTH = ThermalTwinConfig(K_transfer=3.0, Cooling_COP=3.4, coolant_volume_m3=0.075, C_mass=180.0)
+
+
+def _record(cfg: ThermalTwinConfig, n: int, seed: int = 0):
+    """
+    (it_load, cooling, rack_temp) rows: cooling and temperature at the start of
+    each 1 s step, the load held during it.
+    """
+    rng = random.Random(seed)
+    state = ThermalTwinState(T_c=27.0, P_cool_kw=250.0)
+    rows = []
+    for _ in range(n):
+        load = 1000.0 + rng.uniform(-20.0, 20.0)
+        rows.append((load, state.P_cool_kw, state.T_c))
+        ThermalTwin(cfg, state).step(P_it_kw=load, dt_s=1.0)
+    return np.array(rows)
+
+
+@pytest.mark.parametrize("dynamic", [True, False])
+def test_window_fit_recovers_plant_parameters(dynamic):
+    truth = TRUTH.model_copy(update={"use_dynamic_coolant_mass": dynamic})
+    configured = ThermalTwinConfig(use_dynamic_coolant_mass=dynamic)
+    rows = _record(truth, 600)
+    fit = fit_window(configured, rows[:, 0], rows[:, 1], rows[:, 2], 1.0)
+
+    assert fit.samples == 599
+    assert fit.K_transfer == pytest.approx(3.0, rel=1e-6)
+    assert fit.Cooling_COP == pytest.approx(3.4, rel=1e-6)
+    assert fit.mass_scale == pytest.approx(1.25 if dynamic else 1.2, rel=1e-6)
+    assert fit.residual_kw < 1e-6
+
+    fitted = fit.apply(configured)
+    assert fitted.K_transfer == pytest.approx(3.0) and fitted.Cooling_COP == pytest.approx(3.4)
+    if dynamic:
+        assert fitted.coolant_volume_m3 == pytest.approx(0.075)
+    else:
+        assert fitted.C_mass == pytest.approx(180.0)
+
+    # Steps that end on the T_min floor are not physical samples.
+    floored = np.full(5, configured.T_min)
+    assert fit_window(configured, np.zeros(5), np.zeros(5), floored, 1.0) is None
+
+
+def test_recursive_fit_converges_with_shrinking_uncertainty():
+    cfg = ThermalTwinConfig()
+    rows = _record(TRUTH, 3001, seed=1)
+    cal = ThermalCalibrator(cfg)
+    prior = cal.result()
+    assert (prior.K_transfer, prior.Cooling_COP, prior.mass_scale) == (2.5, 4.0, 1.0)
+
+    for k in range(3000):
+        assert cal.update(rows[k, 0], rows[k + 1, 1], rows[k, 2], rows[k + 1, 2], 1.0)
+    fit = cal.result()
+    assert fit.samples == 3000
+    for name, true in (("K_transfer", 3.0), ("Cooling_COP", 3.4), ("mass_scale", 1.25)):
+        value, std = getattr(fit, name), getattr(fit, f"{name}_std")
+        assert std < getattr(prior, f"{name}_std")
+        assert abs(value - true) < max(3.0 * std, 1e-3 * true)
+    assert cal.estimate() == pytest.approx((fit.K_transfer, fit.Cooling_COP, fit.mass_scale))
+
+    # The weakly excited K_transfer is not tight enough to replace the configured value.
+    applied = fit.apply(cfg)
+    assert applied.Cooling_COP == pytest.approx(fit.Cooling_COP)
+    assert applied.K_transfer == (fit.K_transfer if fit.K_transfer_std <= 0.02 * fit.K_transfer else 2.5)
+
+    assert not cal.update(1000.0, 250.0, 20.0, cfg.T_min, 1.0)
+    assert not cal.update(1000.0, 250.0, 30.0, 30.0, 0.0)
+    assert (cal.samples, cal.skipped) == (3000, 2)
+
+
+def test_tick_loop_calibrates_and_applies_on_cadence():
+    svc = DigitalTwinService()
+    svc.set_demo_mode(False, deterministic=True, seed=3)
+    svc.calibration_apply_s = 0
+    svc.calibrator.reset(ThermalTwinConfig(Cooling_COP=3.0))  # a stale COP belief
+    for _ in range(300):
+        asyncio.run(svc.tick(dt_s=1.0))
+    fit = svc.get_calibration()
+    assert fit.samples == 300
+    assert fit.Cooling_COP == pytest.approx(svc.therm_cfg.Cooling_COP, rel=1e-3)
+
+    svc.calibration_apply_s = 100
+    before = svc.therm_cfg
+    asyncio.run(svc.tick(dt_s=1.0))
+    assert svc._calibration_applied_at == 301
+    assert svc.therm_cfg is not before
+    assert svc.therm_cfg.Cooling_COP == pytest.approx(4.0, rel=1e-3)
+
+    svc.calibrator = None
+    assert svc.get_calibration() is None
+
+
+def test_demo_scenario_ticks_are_not_fitted():
+    svc = DigitalTwinService()
+    svc.set_demo_mode(False, deterministic=True, seed=3)
+    svc.calibration_apply_s = 1
+    for _ in range(5):
+        asyncio.run(svc.tick(dt_s=1.0))
+    before = svc.get_calibration()
+    skipped = svc.calibrator.skipped
+    cfg = svc.therm_cfg
+
+    svc.start_demo_scenario("heat_wave")
+    svc._demo_effects = lambda: demo_scenario_effects("heat_wave", 200.0)  # peak: COP x 0.7, +10 C
+    for _ in range(50):
+        asyncio.run(svc.tick(dt_s=1.0))
+    fit = svc.get_calibration()
+    assert fit.samples == before.samples
+    assert svc.calibrator.skipped == skipped + 50
+    assert fit.Cooling_COP == before.Cooling_COP
+    assert svc.therm_cfg is cfg
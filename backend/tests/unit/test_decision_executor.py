@@ -0,0 +1,116 @@
+import asyncio
+import threading
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services.decision_executor import DecisionExecutor, DecisionQueueFull
+
+
+def test_admission_control_and_metrics():
+    executor = DecisionExecutor(workers=1, queue_depth=1)
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(executor.submit(release.wait, 5.0))
+        queued = asyncio.ensure_future(executor.submit(lambda: "queued"))
+        await asyncio.sleep(0.05)
+        with pytest.raises(DecisionQueueFull) as exc:
+            await executor.submit(lambda: "rejected")
+        assert exc.value.retry_after_s >= 1
+        release.set()
+        return await running, await queued
+
+    assert asyncio.run(scenario()) == (True, "queued")
+
+    stats = executor.stats()
+    assert stats["completed"] == 2
+    assert stats["rejected"] == 1
+    assert stats["outstanding"] == 0
+    assert stats["queue_wait_ms"]["max"] > stats["queue_wait_ms"]["p50"] >= 0.0
+    assert stats["exec_ms"]["max"] >= 40.0
+
+
+def test_failures_are_counted_and_raised():
+    executor = DecisionExecutor(workers=1, queue_depth=0)
+
+    def boom():
+        raise ValueError("bad plan")
+
+    with pytest.raises(ValueError):
+        asyncio.run(executor.submit(boom))
+    assert executor.stats()["failed"] == 1
+    assert executor.stats()["outstanding"] == 0
+
+
+def test_cancelled_requests_keep_their_slot_until_the_job_is_done():
+    executor = DecisionExecutor(workers=1, queue_depth=1)
+    release = threading.Event()
+    ran = []
+
+    async def scenario():
+        running = asyncio.ensure_future(executor.submit(release.wait, 5.0))
+        await asyncio.sleep(0.05)
+        running.cancel()  # client disconnect: the job itself keeps running
+        await asyncio.sleep(0.01)
+        assert executor.stats()["outstanding"] == 1
+
+        queued = asyncio.ensure_future(executor.submit(ran.append, "queued"))
+        await asyncio.sleep(0.01)
+        with pytest.raises(DecisionQueueFull):
+            await executor.submit(ran.append, "rejected")
+        queued.cancel()  # not started yet: dropped from the pool and its slot freed
+        await asyncio.sleep(0.01)
+        assert executor.stats()["outstanding"] == 1
+
+        release.set()
+        await asyncio.sleep(0.05)
+        assert await executor.submit(ran.append, "after") is None
+
+    asyncio.run(scenario())
+    assert ran == ["after"]
+    stats = executor.stats()
+    assert stats["outstanding"] == 0
+    assert stats["completed"] == 2 and stats["rejected"] == 1
+
+
+def test_latest_returns_503_when_queue_full(client: TestClient):
+    class Saturated:
+        async def submit(self, fn, *args, **kwargs):
+            raise DecisionQueueFull(3)
+
+    with patch("app.api.routes_decision.get_decision_executor", return_value=Saturated()):
+        response = client.get("/decision/latest?deltaP_request_kw=100&P_site_kw=1000&grid_headroom_kw=500")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "3"
+
+    metrics = client.get("/decision/metrics").json()
+    assert set(metrics["executor"]) >= {"workers", "queue_depth", "queue_wait_ms", "exec_ms", "rejected"}
+
+
+def test_decide_skips_commit_when_a_tick_lands_mid_search():
+    from app.services.digital_twin import DigitalTwinService
+
+    svc = DigitalTwinService()
+    svc._persist_decisions = lambda rows: None
+    evaluate = svc._evaluate_decision
+    ticked = []
+
+    def evaluate_then_tick(**kwargs):
+        result = evaluate(**kwargs)
+        asyncio.run(svc.tick())  # the tick loop advances the twin while this worker plans
+        ticked.append(svc.snapshot_thermal_state())
+        return result
+
+    with patch.object(svc, "_evaluate_decision", side_effect=evaluate_then_tick):
+        out = svc.decide(deltaP_request_kw=100.0, P_site_kw=1000.0, grid_headroom_kw=5000.0)
+    assert not out["blocked"]
+    assert svc.snapshot_thermal_state() == ticked[0]
+    assert ticked[0].T_c != out["plan"]["columns"]["rack_temp_c"][0]
+    assert svc.get_planner_metrics()["stale_commits"] == 1.0
+
+    # Without an intervening tick the plan's first step is committed.
+    out = svc.decide(deltaP_request_kw=100.0, P_site_kw=1000.0, grid_headroom_kw=5000.0)
+    assert svc.therm_state.T_c == out["plan"]["columns"]["rack_temp_c"][0]
+    assert svc.get_planner_metrics()["stale_commits"] == 1.0
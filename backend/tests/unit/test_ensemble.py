@@ -0,0 +1,111 @@
+import time
+
+import numpy as np
+import pytest
+
+from app.models.domain import ThermalTwinConfig, ThermalTwinState
+from app.services.digital_twin import DigitalTwinService
+from app.services.ensemble import ENSEMBLE_MAX_MEMBER_STEPS, EnsembleSpread, ramp_profile, run_ensemble
+from app.services.policy_engine import simulate_profile
+
+NO_SPREAD = EnsembleSpread(K_transfer_rel=0.0, cop_rel=0.0, ambient_c=0.0, load_rel=0.0)
+
+
+@pytest.fixture
+def hot_state():
+    return ThermalTwinState(T_c=45.0, P_cool_kw=250.0)
+
+
+def test_unperturbed_members_follow_the_planner(hot_state):
+    cfg = ThermalTwinConfig()
+    profile = ramp_profile(300.0, 30, 1.0, 50.0)
+    res = run_ensemble(2800.0, cfg, hot_state, profile, 1.0, members=8, spread=NO_SPREAD)
+    nominal = simulate_profile(2800.0, cfg, hot_state, profile, 1.0, 50.0).rack_temp_c[0]
+    for band in res.temp_bands_c:
+        np.testing.assert_allclose(band, nominal, rtol=1e-12)
+    assert res.p_under_t_max == float(nominal.max() < cfg.T_max)
+
+
+def test_spread_lowers_probability_and_seed_repeats(hot_state):
+    cfg = ThermalTwinConfig()
+    profile = ramp_profile(-30.0, 30, 1.0, 50.0)
+    narrow = run_ensemble(2800.0, cfg, hot_state, profile, 1.0, spread=EnsembleSpread(0.02, 0.02, 0.2, 0.005), seed=3)
+    wide = run_ensemble(2800.0, cfg, hot_state, profile, 1.0, spread=EnsembleSpread(0.2, 0.2, 2.0, 0.05), seed=3)
+    assert 0.0 < wide.p_under_t_max < narrow.p_under_t_max <= 1.0
+    assert wide.p_within_margin <= wide.p_under_t_max
+    # Bands are ordered percentiles.
+    assert np.all(np.diff(wide.temp_bands_c, axis=0) >= 0.0)
+    again = run_ensemble(2800.0, cfg, hot_state, profile, 1.0, spread=EnsembleSpread(0.2, 0.2, 2.0, 0.05), seed=3)
+    np.testing.assert_array_equal(again.temp_bands_c, wide.temp_bands_c)
+
+
+def test_ensemble_runs_inline():
+    """Benchmark: 256 members over a 30 s horizon stay in the millisecond range."""
+    cfg = ThermalTwinConfig()
+    state = ThermalTwinState(T_c=27.0, P_cool_kw=250.0)
+    profile = ramp_profile(-500.0, 30, 1.0, 50.0)
+    run_ensemble(1500.0, cfg, state, profile, 1.0, seed=0)
+
+    runs = 10
+    start = time.perf_counter()
+    for _ in range(runs):
+        run_ensemble(1500.0, cfg, state, profile, 1.0, seed=0)
+    per_run_ms = (time.perf_counter() - start) / runs * 1000.0
+    assert per_run_ms < 50.0
+
+
+def test_ensemble_budget_bounds_longest_horizon():
+    """Benchmark: a 300 s horizon (the API maximum) runs a budget-cut ensemble."""
+    cfg = ThermalTwinConfig()
+    state = ThermalTwinState(T_c=27.0, P_cool_kw=250.0)
+    profile = ramp_profile(-500.0, 300, 1.0, 50.0)
+    res = run_ensemble(1500.0, cfg, state, profile, 1.0, seed=0)
+    assert res.members == ENSEMBLE_MAX_MEMBER_STEPS // 300
+    assert run_ensemble(1500.0, cfg, state, profile, 1.0, members=256, max_member_steps=None, seed=0).members == 256
+
+    runs = 5
+    start = time.perf_counter()
+    for _ in range(runs):
+        run_ensemble(1500.0, cfg, state, profile, 1.0, seed=0)
+    per_run_ms = (time.perf_counter() - start) / runs * 1000.0
+    assert per_run_ms < 50.0
+
+
+def test_plan_cache_hit_reuses_ensemble(hot_state):
+    svc = DigitalTwinService()
+    svc._persist_decisions = lambda rows: None
+    assert not svc.deterministic
+    svc.therm_state = hot_state.model_copy()
+    first = svc.decide(deltaP_request_kw=300.0, P_site_kw=2800.0, grid_headroom_kw=5000.0)
+    svc.therm_state = hot_state.model_copy()
+    hit = svc.decide(deltaP_request_kw=300.0, P_site_kw=2800.0, grid_headroom_kw=5000.0)
+    assert hit["prediction_debug"]["plan_cache_hit"] == 1.0
+    assert hit["confidence"] == first["confidence"]
+    assert hit["ensemble"] == first["ensemble"]
+
+
+def test_decide_reports_ensemble_confidence(monkeypatch, hot_state):
+    svc = DigitalTwinService()
+    svc._persist_decisions = lambda rows: None
+    svc.therm_state = hot_state
+    out = svc.decide(deltaP_request_kw=300.0, P_site_kw=2800.0, grid_headroom_kw=5000.0)
+    assert not out["blocked"]
+    ens = out["ensemble"]
+    assert ens["members"] == svc.ensemble_members == 256
+    assert out["confidence"] == ens["p_under_t_max"]
+    assert len(ens["temp_bands_c"]["p95"]) == len(out["plan"]["columns"]["rack_temp_c"])
+
+    # Thermal block: confidence that the ramp to the cap fails as well.
+    svc.therm_state = ThermalTwinState(T_c=49.6, P_cool_kw=100.0)
+    out = svc.decide(deltaP_request_kw=-500.0, P_site_kw=1500.0, grid_headroom_kw=5000.0)
+    assert out["reason"] == "THERMAL_BLOCKED"
+    assert out["confidence"] == 1.0 - out["ensemble"]["p_within_margin"]
+
+    # Grid block and ENSEMBLE_SIZE=0 keep the heuristic.
+    out = svc.decide(deltaP_request_kw=500.0, P_site_kw=1000.0, grid_headroom_kw=0.0)
+    assert out["ensemble"] is None and out["confidence"] == 0.4
+    monkeypatch.setenv("ENSEMBLE_SIZE", "0")
+    svc = DigitalTwinService()
+    svc._persist_decisions = lambda rows: None
+    out = svc.decide(deltaP_request_kw=10.0, P_site_kw=1000.0, grid_headroom_kw=5000.0)
+    assert out["ensemble"] is None and out["confidence"] == 0.85
@@ -0,0 +1,148 @@
+import asyncio
+import time
+
+import pytest
+
+from app.models.domain import ThermalTwinConfig, ThermalTwinState
+from app.services.digital_twin import DigitalTwinService
+from app.services.frontier import compute_frontier
+from app.services.plan_cache import config_hash
+from app.services.policy_engine import build_ramp_plan
+
+# Hot, heavily loaded site: imports are thermally bound well below the cap.
+SITE_KW = 2800.0
+
+
+@pytest.fixture
+def cfg():
+    return ThermalTwinConfig()
+
+
+@pytest.fixture
+def state():
+    return ThermalTwinState(T_c=45.0, P_cool_kw=250.0)
+
+
+def test_frontier_brackets_full_search(cfg, state):
+    """Every frontier cell brackets the planner's own search result."""
+    fr = compute_frontier(cfg, state, SITE_KW, config_hash(cfg))
+    assert (fr.import_kw < cfg.max_import_kw).any()
+
+    for sign, feasible, bound in ((1.0, fr.export_kw, fr.export_bound_kw), (-1.0, fr.import_kw, fr.import_bound_kw)):
+        for r, ramp in enumerate(fr.ramp_rates_kw_per_s):
+            for h, horizon in enumerate(fr.horizons_s):
+                approved, _, _ = build_ramp_plan(
+                    P_site_kw=SITE_KW,
+                    grid_headroom_kw=1e9,
+                    cfg=cfg,
+                    state=state,
+                    deltaP_request_kw=sign * 1e5,
+                    horizon_s=horizon,
+                    ramp_rate_kw_per_s=ramp,
+                )
+                assert feasible[r, h] - 1e-6 <= abs(approved) <= bound[r, h] + 1e-6
+
+
+def test_frontier_lookup(cfg, state):
+    fr = compute_frontier(cfg, state, SITE_KW, config_hash(cfg))
+    # Off-grid horizon -> next longer grid horizon (conservative).
+    assert fr.lookup(-100.0, 50.0, 20) == fr.lookup(-100.0, 50.0, 30)
+    assert fr.lookup(-100.0, 50.0, 300) is None
+    assert fr.lookup(-100.0, 33.0, 30) is None
+    assert fr.matches(state, SITE_KW, config_hash(cfg), 1)
+    assert not fr.matches(state, SITE_KW + 50.0, config_hash(cfg), 1)
+    assert not fr.matches(ThermalTwinState(T_c=46.0, P_cool_kw=250.0), SITE_KW, config_hash(cfg), 1)
+
+
+@pytest.mark.parametrize("engine", ["scalar", "vector"])
+def test_verify_kw_skips_search(engine, cfg, state):
+    """A frontier hint is verified with at most two simulations; a wrong hint falls back to the search."""
+    kwargs = dict(
+        P_site_kw=SITE_KW,
+        grid_headroom_kw=5000.0,
+        cfg=cfg,
+        state=state,
+        deltaP_request_kw=-2000.0,
+        horizon_s=30,
+        engine=engine,
+    )
+    full_kw, _, full = build_ramp_plan(**kwargs)
+    fr = compute_frontier(cfg, state, SITE_KW, config_hash(cfg))
+    hint_kw = fr.lookup(-2000.0, 50.0, 30)[0]
+
+    kw, plan, dbg = build_ramp_plan(**kwargs, verify_kw=-hint_kw)
+    assert dbg["planner_frontier"] == 1.0
+    assert dbg["planner_candidates"] == 2.0
+    assert kw == pytest.approx(-hint_kw)
+    assert abs(kw) <= abs(full_kw) + 1e-6
+    assert plan.steps and all(s.thermal_ok for s in plan.steps)
+
+    bad_kw, _, bad = build_ramp_plan(**kwargs, verify_kw=-(abs(full_kw) + 500.0))
+    assert bad["planner_frontier"] == 0.0
+    assert bad_kw == pytest.approx(full_kw, rel=1e-4)
+
+
+def test_decide_uses_fresh_frontier(cfg, state):
+    svc = DigitalTwinService()
+    svc.plan_cache = None
+    svc.therm_state = ThermalTwinState(T_c=state.T_c, P_cool_kw=state.P_cool_kw)
+    svc._frontier = compute_frontier(svc.therm_cfg, state, SITE_KW, config_hash(svc.therm_cfg))
+
+    out = svc.decide(deltaP_request_kw=-2000.0, P_site_kw=SITE_KW, grid_headroom_kw=5000.0)
+    assert out["prediction_debug"]["planner_frontier"] == 1.0
+    assert svc.get_planner_metrics()["frontier"]["hits"] == 1.0
+
+    # The decision moved the state, so the same frontier no longer applies.
+    out = svc.decide(deltaP_request_kw=-2000.0, P_site_kw=SITE_KW, grid_headroom_kw=5000.0)
+    assert out["prediction_debug"]["planner_frontier"] == 0.0
+    assert svc.get_planner_metrics()["frontier"]["misses"] == 1.0
+
+
+def test_refresh_skips_unchanged_or_unused(monkeypatch):
+    svc = DigitalTwinService()
+    svc._persist_decisions = lambda rows: None
+    asyncio.run(svc.tick())
+
+    # No decision (or frontier read) yet: nothing to precompute for.
+    assert asyncio.run(svc.refresh_frontier()) is None
+    svc.decide(deltaP_request_kw=10.0, P_site_kw=1000.0, grid_headroom_kw=5000.0)
+    first = asyncio.run(svc.refresh_frontier())
+    assert first is not None
+    # Same state, site load and config: the existing frontier is kept.
+    assert asyncio.run(svc.refresh_frontier()) is first
+    asyncio.run(svc.tick())
+    assert asyncio.run(svc.refresh_frontier()) is not first
+    stats = svc.get_planner_metrics()["frontier"]
+    assert stats["refreshes"] == 2.0 and stats["refresh_skipped"] == 2.0
+
+    # Idle past PLANNER_FRONTIER_IDLE_S: the tick loop stops rebuilding it.
+    svc._frontier_demand_at = time.monotonic() - svc.frontier_idle_s - 1.0
+    asyncio.run(svc.tick())
+    assert asyncio.run(svc.refresh_frontier()) is svc._frontier
+    assert svc.get_planner_metrics()["frontier"]["refreshes"] == 2.0
+
+
+def test_tick_loop_keeps_fixed_rate_with_slow_refresh(monkeypatch):
+    import main
+
+    ticks = []
+
+    class SlowFrontierTwin:
+        async def tick(self, dt_s):
+            ticks.append(asyncio.get_running_loop().time())
+
+        async def refresh_frontier(self):
+            await asyncio.sleep(0.07)  # longer than a tick period
+
+    monkeypatch.setattr(main, "TICK_PERIOD_S", 0.05)
+    monkeypatch.setattr(main, "get_twin_service", lambda: SlowFrontierTwin())
+
+    async def run():
+        task = asyncio.create_task(main.simulation_tick_loop())
+        await asyncio.sleep(0.52)
+        task.cancel()
+
+    asyncio.run(run())
+    # Sequential refreshes would stretch each period to ~0.12 s (about 5 ticks).
+    assert len(ticks) >= 10
+    assert ticks[-1] - ticks[0] == pytest.approx(0.05 * (len(ticks) - 1), abs=0.03)
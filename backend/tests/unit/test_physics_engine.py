@@ -1,5 +1,15 @@
+import time
+
+import numpy as np
 import pytest
-from app.services.physics_engine import ThermalTwin
+from app.services.physics_engine import (
+    ThermalPrediction,
+    ThermalTwin,
+    ThermalTwinBatch,
+    TwinState,
+    coolant_table,
+    get_coolant_props_array,
+)
 from app.models.domain import ThermalTwinConfig, ThermalTwinState
 
 # ============================================================
@@ -85,3 +95,245 @@ def test_thermal_runaway():
     
     assert pred["rack_temp_c_next"] > 50.0
     assert pred["thermal_ok_next"] is False
+
+
+def _random_racks(n, seed):
+    rng = np.random.default_rng(seed)
+    cfgs = [
+        ThermalTwinConfig(
+            C_mass=float(rng.uniform(80.0, 300.0)),
+            K_transfer=float(rng.uniform(1.0, 4.0)),
+            Cooling_COP=float(rng.uniform(2.0, 5.0)),
+            Cooling_Ramp_Max=float(rng.uniform(5.0, 200.0)),
+            T_setpoint=float(rng.uniform(25.0, 35.0)),
+            T_deadband=float(rng.uniform(0.1, 1.0)),
+            Kp_temp_kw_per_c=float(rng.uniform(0.0, 120.0)),
+            use_dynamic_coolant_mass=bool(rng.integers(2)),
+        )
+        for _ in range(n)
+    ]
+    states = [
+        ThermalTwinState(T_c=float(rng.uniform(20.0, 55.0)), P_cool_kw=float(rng.uniform(0.0, 600.0)))
+        for _ in range(n)
+    ]
+    loads = rng.uniform(0.0, 2500.0, size=(40, n))
+    return cfgs, states, loads
+
+
+def test_batch_matches_scalar_twins():
+    """Every rack of the batch follows its own scalar ThermalTwin bit for bit."""
+    cfgs, states, loads = _random_racks(64, seed=3)
+    batch = ThermalTwinBatch.from_twins(cfgs, states)
+    twins = [ThermalTwin(c, s.model_copy()) for c, s in zip(cfgs, states)]
+
+    for P_it in loads:
+        pred = batch.step(P_it, dt_s=1.0)
+        for i, twin in enumerate(twins):
+            expected = twin.step(float(P_it[i]), 1.0)
+            for key, value in expected.items():
+                assert pred[key][i] == value, (key, i)
+    for i, twin in enumerate(twins):
+        assert batch.state(i) == twin.state
+
+
+def test_batch_overrides_and_validation():
+    cfg = ThermalTwinConfig()
+    batch = ThermalTwinBatch(cfg, [30.0, 30.0], 100.0, Cooling_COP=[2.0, 4.0])
+    assert len(batch) == 2
+    pred = batch.predict(500.0, 1.0)
+    assert pred["cooling_cop"].tolist() == [2.0, 4.0]
+    with pytest.raises(ValueError):
+        ThermalTwinBatch(cfg, [30.0], 100.0, max_export_kw=1.0)
+
+
+def test_batch_step_10k_racks():
+    """Benchmark: one tick for 10k racks stays a few vectorized passes (well under the 1 s tick)."""
+    n = 10_000
+    rng = np.random.default_rng(0)
+    batch = ThermalTwinBatch(
+        ThermalTwinConfig(),
+        rng.uniform(25.0, 45.0, n),
+        rng.uniform(50.0, 500.0, n),
+        C_mass=rng.uniform(80.0, 300.0, n),
+        use_dynamic_coolant_mass=rng.integers(2, size=n).astype(bool),
+    )
+    loads = rng.uniform(200.0, 1500.0, n)
+    batch.step(loads, 1.0)
+
+    ticks = 20
+    start = time.perf_counter()
+    for _ in range(ticks):
+        batch.step(loads, 1.0)
+    per_tick_ms = (time.perf_counter() - start) / ticks * 1000.0
+    assert np.isfinite(batch.T_c).all()
+    assert per_tick_ms < 50.0
+
+
+def test_predict_into_matches_dict_api():
+    """The slotted fast path and the dict API agree bit for bit, for both integrators."""
+    cfgs, states, loads = _random_racks(16, seed=5)
+    out = ThermalPrediction()
+    for integrator, dt_s in (("euler", 1.0), ("exponential", 30.0)):
+        for cfg, state, load in zip(cfgs, states, loads[0]):
+            ref = ThermalTwin(cfg, state.model_copy(), integrator=integrator)
+            fast = ThermalTwin(cfg, TwinState.from_model(state), integrator=integrator)
+            for _ in range(5):
+                expected = ref.step(float(load), dt_s)
+                fast.step_into(float(load), dt_s, out)
+                assert out.as_dict() == expected
+            assert fast.state.to_model() == ref.state
+
+
+def test_predict_into_calls_per_second():
+    """Microbenchmark: predict_into + TwinState vs the dict/pydantic API (calls/s)."""
+    cfg = ThermalTwinConfig()
+
+    def rate(fn):
+        best = 0.0
+        for _ in range(3):
+            n = 20_000
+            start = time.perf_counter()
+            for _ in range(n):
+                fn(900.0, 1.0)
+            best = max(best, n / (time.perf_counter() - start))
+        return best
+
+    dict_rate = rate(ThermalTwin(cfg, ThermalTwinState(T_c=30.0, P_cool_kw=200.0)).step)
+    out = ThermalPrediction()
+    fast = ThermalTwin(cfg, TwinState(30.0, 200.0))
+    fast_rate = rate(lambda P_it_kw, dt_s: fast.step_into(P_it_kw, dt_s, out))
+    print(f"step: {dict_rate:,.0f}/s  step_into: {fast_rate:,.0f}/s")
+    assert fast_rate > 1.2 * dict_rate
+
+
+# (T_c, P_cool_kw, IT load before / after t = 120 s)
+COARSE_SCENARIOS = [
+    (45.0, 100.0, 1000.0, 1000.0),  # cool-down from a hot rack
+    (27.0, 250.0, 1000.0, 1000.0),  # heat-up into the deadband
+    (33.0, 600.0, 1500.0, 600.0),   # load drop
+]
+
+
+@pytest.fixture(scope="module")
+def fine_euler_reference():
+    """10 ms Euler runs of COARSE_SCENARIOS: temperatures every 10 s and the peak."""
+    T0, P0, before, after = (np.array(col) for col in zip(*COARSE_SCENARIOS))
+    ref = ThermalTwinBatch(ThermalTwinConfig(), T0, P0)
+    samples, peak = [], T0.copy()
+    for k in range(24):
+        load = before if k * 10.0 < 120.0 else after
+        for _ in range(1000):
+            peak = np.maximum(peak, ref.step(load, 0.01)["rack_temp_c_next"])
+        samples.append(ref.T_c.copy())
+    return np.array(samples), peak
+
+
+@pytest.mark.parametrize("dt_s", [10.0, 30.0, 60.0])
+def test_exponential_integrator_tracks_fine_euler(dt_s, fine_euler_reference):
+    """
+    Coarse exponential steps against a 10 ms Euler reference over 4 minutes.
+    Measured max |error| is ~0.006 C at every dt (peak included); Euler at the
+    same dt is off by 45-315 C because its controller acts once per step.
+    """
+    cfg = ThermalTwinConfig()
+    samples, ref_peak = fine_euler_reference
+    stride = int(dt_s // 10.0)
+    exp_err = euler_err = 0.0
+    for i, (T0, P0, before, after) in enumerate(COARSE_SCENARIOS):
+        exact = ThermalTwin(cfg, ThermalTwinState(T_c=T0, P_cool_kw=P0), integrator="exponential")
+        coarse = ThermalTwin(cfg, ThermalTwinState(T_c=T0, P_cool_kw=P0))
+        peak = T0
+        for k in range(int(240.0 / dt_s)):
+            load = before if k * dt_s < 120.0 else after
+            ref_T = samples[(k + 1) * stride - 1, i]
+            pred = exact.step(load, dt_s)
+            peak = max(peak, pred["rack_temp_c_peak"])
+            exp_err = max(exp_err, abs(pred["rack_temp_c_next"] - ref_T))
+            euler_err = max(euler_err, abs(coarse.step(load, dt_s)["rack_temp_c_next"] - ref_T))
+        assert peak == pytest.approx(ref_peak[i], abs=0.05)
+
+    assert exp_err < 0.05
+    assert euler_err > 1.0
+
+
+def test_exponential_integrator_edges():
+    cfg = ThermalTwinConfig()
+    # No load under minimum cooling: settles on the T_min floor.
+    twin = ThermalTwin(cfg, ThermalTwinState(T_c=19.0, P_cool_kw=600.0), integrator="exponential")
+    pred = twin.step(0.0, 60.0)
+    assert pred["rack_temp_c_next"] == cfg.T_min
+    assert pred["cooling_kw_next"] == cfg.Cooling_Min_KW
+
+    # The deadband overshoot peaks mid-step: thermal_ok follows the peak, not the end state.
+    hot = cfg.model_copy(update={"T_max": 31.5})
+    pred = ThermalTwin(hot, ThermalTwinState(T_c=27.0, P_cool_kw=250.0), integrator="exponential").predict(1000.0, 60.0)
+    assert pred["rack_temp_c_next"] < hot.T_max < pred["rack_temp_c_peak"]
+    assert pred["thermal_ok_next"] is False
+
+    with pytest.raises(ValueError):
+        ThermalTwin(cfg, ThermalTwinState(T_c=30.0, P_cool_kw=100.0), integrator="rk4")
+
+
+def test_coolant_table_matches_property_formulas():
+    table = coolant_table(0.30)
+    assert coolant_table(0.30) is table  # one table per mix, shared by every twin
+
+    T = np.linspace(0.0, 120.0, 20001)
+    rho, cp = get_coolant_props_array(T + 273.15)
+    np.testing.assert_allclose(table.rho_cp_array(T), rho * cp, rtol=1e-9)
+    # Outside the property clamps the table still follows the clamped formulas.
+    T_wide = np.linspace(-1000.0, 600.0, 4001)
+    rho, cp = get_coolant_props_array(T_wide + 273.15)
+    np.testing.assert_allclose(table.rho_cp_array(T_wide), rho * cp, rtol=1e-5)
+    # Scalar and array lookups agree bitwise (twin vs batch parity).
+    np.testing.assert_array_equal([table.rho_cp(t) for t in T_wide], table.rho_cp_array(T_wide))
+
+    lo, hi = table.heat_capacity_bounds(30.0, 45.0, 0.06)
+    C = table.heat_capacity_kj_per_c_array(np.linspace(30.0, 45.0, 1001), 0.06)
+    assert lo == C.min() and hi == C.max()
+
+    twin = ThermalTwin(ThermalTwinConfig(), ThermalTwinState(T_c=37.0, P_cool_kw=100.0))
+    assert twin._dynamic_C_mass_kj_per_c() == table.heat_capacity_kj_per_c(37.0, twin.cfg.coolant_volume_m3)
+
+
+@pytest.mark.parametrize("T_c, P_cool_kw, P_site_kw, target_kw", [
+    (27.0, 250.0, 1500.0, -500.0),  # deadband, cooling ramp-limited at first
+    (24.0, 150.0, 900.0, 300.0),  # below the deadband
+    (38.0, 400.0, 2500.0, -400.0),  # above it: proportional term active
+])
+def test_deltaP_sensitivity_matches_finite_differences(T_c, P_cool_kw, P_site_kw, target_kw):
+    twin = ThermalTwin(ThermalTwinConfig(), ThermalTwinState(T_c=T_c, P_cool_kw=P_cool_kw))
+    profile = np.copysign(np.minimum((np.arange(20) + 1.0) * 50.0, abs(target_kw)), target_kw)
+    temps, S = twin.deltaP_sensitivity(P_site_kw, profile, 1.0)
+    assert twin.state.T_c == T_c and twin.state.P_cool_kw == P_cool_kw
+
+    h = 1e-3
+    fd = np.empty_like(S)
+    for j in range(profile.size):
+        e = np.zeros(profile.size)
+        e[j] = h
+        up, _ = twin.deltaP_sensitivity(P_site_kw, profile + e, 1.0, direction=e)
+        down, _ = twin.deltaP_sensitivity(P_site_kw, profile - e, 1.0, direction=e)
+        fd[:, j] = (up - down) / (2.0 * h)
+    np.testing.assert_allclose(S, fd, atol=1e-6)
+    assert np.all(np.triu(S, 1) == 0.0)  # causal
+
+    # One float tangent along v gives S @ v.
+    v = np.linspace(-1.0, 1.0, profile.size)
+    temps_v, S_v = twin.deltaP_sensitivity(P_site_kw, profile, 1.0, direction=v)
+    np.testing.assert_array_equal(temps_v, temps)
+    np.testing.assert_allclose(S_v, S @ v, rtol=1e-12, atol=1e-15)
+
+
+def test_tangent_step_edges():
+    cfg = ThermalTwinConfig()
+    exact = ThermalTwin(cfg, ThermalTwinState(T_c=30.0, P_cool_kw=100.0), integrator="exponential")
+    with pytest.raises(ValueError):
+        exact.deltaP_sensitivity(1000.0, np.zeros(5), 1.0)
+    twin = ThermalTwin(cfg, ThermalTwinState(T_c=30.0, P_cool_kw=100.0))
+    with pytest.raises(ValueError):
+        twin.deltaP_sensitivity(1000.0, np.zeros(5), 1.0, direction=np.ones(4))
+
+    # With the IT load clamped to zero, deltaP has no effect.
+    _, S = twin.deltaP_sensitivity(50.0, np.full(5, 500.0), 1.0)
+    assert np.all(S == 0.0)
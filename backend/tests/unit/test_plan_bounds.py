@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from app.models.domain import ThermalTwinConfig, ThermalTwinState
+from app.services.plan_bounds import screen_request
+from app.services.policy_engine import build_ramp_plan, simulate_candidates
+
+
+def _scenarios(n, seed):
+    rng = np.random.default_rng(seed)
+    for _ in range(n):
+        yield dict(
+            P_site_kw=float(rng.uniform(200.0, 4000.0)),
+            state=ThermalTwinState(T_c=float(rng.uniform(25.0, 50.0)), P_cool_kw=float(rng.uniform(50.0, 800.0))),
+            deltaP_request_kw=float(rng.choice([-1.0, 1.0]) * rng.uniform(10.0, 3000.0)),
+            horizon_s=int(rng.choice([10, 30, 60])),
+            ramp_rate_kw_per_s=float(rng.choice([25.0, 50.0, 200.0])),
+        )
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_verdicts_hold_for_every_magnitude(seed):
+    """blocked => every candidate in (0, cap] fails; safe => every one passes."""
+    cfg = ThermalTwinConfig()
+    decided = 0
+    for sc in _scenarios(150, seed):
+        screen = screen_request(
+            sc["P_site_kw"], cfg, sc["state"], sc["deltaP_request_kw"], sc["horizon_s"], 1.0, sc["ramp_rate_kw_per_s"]
+        )
+        if screen.verdict is None:
+            continue
+        decided += 1
+        mags = np.abs(sc["deltaP_request_kw"]) * np.linspace(1e-3, 1.0, 64)
+        rollout = simulate_candidates(
+            sc["P_site_kw"], cfg, sc["state"], np.sign(sc["deltaP_request_kw"]) * mags, sc["horizon_s"], 1.0,
+            sc["ramp_rate_kw_per_s"], resolution="fine",
+        )
+        if screen.verdict == "blocked":
+            assert not rollout.feasible.any()
+            assert np.all(rollout.fail_step <= screen.step)
+        else:
+            assert rollout.feasible.all()
+            assert rollout.rack_temp_c.max() <= screen.temp_bound_c + 1e-9
+    assert decided > 0
+
+
+@pytest.mark.parametrize("engine", ["vector", "scalar", "trajectory"])
+def test_prescreen_matches_full_planner(engine):
+    cfg = ThermalTwinConfig()
+    screened = 0
+    for sc in _scenarios(60, 7):
+        kwargs = dict(grid_headroom_kw=1e9, cfg=cfg, engine=engine, **sc)
+        full_kw, full_plan, _ = build_ramp_plan(**kwargs)
+        kw, plan, dbg = build_ramp_plan(prescreen=True, **kwargs)
+        if not (dbg["planner_screen_blocked"] or dbg["planner_screen_safe"]):
+            assert kw == full_kw
+            continue
+        screened += 1
+        assert dbg["planner_candidates"] <= 1.0
+        assert plan.blocked == full_plan.blocked
+        assert plan.reason == full_plan.reason
+        assert plan.primary_constraint == full_plan.primary_constraint
+        if dbg["planner_screen_safe"] and engine == "trajectory":
+            # The full-rate ramp to the cap is the most energy any profile within the cap can deliver.
+            assert abs(kw) >= abs(full_kw)
+        else:
+            assert kw == pytest.approx(full_kw, abs=abs(sc["deltaP_request_kw"]) * 1e-5)
+        if dbg["planner_screen_safe"]:
+            assert kw == sc["deltaP_request_kw"]
+            assert np.all(plan.columns.rack_temp_c < cfg.T_max - 0.5)
+    assert screened > 0
+
+
+def test_hot_rack_import_is_blocked_without_search():
+    trace = []
+    kw, plan, dbg = build_ramp_plan(
+        P_site_kw=1500.0,
+        grid_headroom_kw=5000.0,
+        cfg=ThermalTwinConfig(),
+        state=ThermalTwinState(T_c=49.6, P_cool_kw=100.0),
+        deltaP_request_kw=-500.0,
+        trace_sink=trace,
+        prescreen=True,
+    )
+    assert dbg["planner_screen_blocked"] == 1.0
+    assert plan.blocked and plan.reason == "THERMAL_BLOCKED" and kw == 0.0
+    assert any(e["rule_id"] == "PRESCREEN_BOUND" for e in trace)
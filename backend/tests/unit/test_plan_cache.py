@@ -0,0 +1,75 @@
+from app.models.domain import ThermalTwinConfig, ThermalTwinState
+from app.services.digital_twin import DigitalTwinService
+from app.services.plan_cache import PlanCache, PlanCacheEntry, config_hash, plan_cache_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self) -> float:
+        return self.t
+
+
+def make_entry(kw: float) -> PlanCacheEntry:
+    return PlanCacheEntry(approved_kw=kw, plan=None, plan_dump={}, trace=[], prediction_debug=None)
+
+
+def test_lru_ttl_and_counters():
+    clock = FakeClock()
+    cache = PlanCache(maxsize=2, ttl_s=1.0, clock=clock)
+
+    cache.put("a", make_entry(1.0))
+    cache.put("b", make_entry(2.0))
+    assert cache.get("a").approved_kw == 1.0  # a is now most recent
+    cache.put("c", make_entry(3.0))           # evicts b
+    assert cache.get("b") is None
+
+    clock.t = 1.5
+    assert cache.get("a") is None             # expired
+
+    stats = cache.stats()
+    assert stats["hits"] == 1.0
+    assert stats["misses"] == 2.0
+    assert stats["evictions"] == 1.0
+
+
+def test_config_change_invalidates():
+    cache = PlanCache()
+    cfg = ThermalTwinConfig()
+    cache.ensure_config(config_hash(cfg))
+    cache.put("k", make_entry(1.0))
+
+    cfg.T_max = 45.0
+    cache.ensure_config(config_hash(cfg))
+    assert cache.get("k") is None
+    assert cache.stats()["invalidations"] == 1.0
+
+
+def test_key_quantizes_sensor_noise():
+    cfg_hash = config_hash(ThermalTwinConfig())
+    args = dict(P_site_kw=1000.0, effective_headroom_kw=500.0, deltaP_request_kw=100.0,
+                horizon_s=30, dt_s=1, ramp_rate_kw_per_s=50.0, cfg_hash=cfg_hash, trace_level="summary")
+    k1 = plan_cache_key(state=ThermalTwinState(T_c=40.0, P_cool_kw=250.0), **args)
+    k2 = plan_cache_key(state=ThermalTwinState(T_c=40.001, P_cool_kw=250.2), **args)
+    k3 = plan_cache_key(state=ThermalTwinState(T_c=40.1, P_cool_kw=250.0), **args)
+    assert k1 == k2
+    assert k1 != k3
+
+
+def test_decide_hit_only_renews_ids_and_timestamps():
+    svc = DigitalTwinService()
+    svc.therm_state = ThermalTwinState(T_c=40.0, P_cool_kw=250.0)
+    # A blocked request leaves the twin state untouched, so the second call must hit.
+    kwargs = dict(deltaP_request_kw=500.0, P_site_kw=1000.0, grid_headroom_kw=0.0)
+
+    first = svc.decide(**kwargs)
+    second = svc.decide(**kwargs)
+
+    assert first["prediction_debug"]["plan_cache_hit"] == 0.0
+    assert second["prediction_debug"]["plan_cache_hit"] == 1.0
+    assert second["decision_id"] != first["decision_id"]
+    assert second["plan"] == first["plan"]
+    assert [e["rule_id"] for e in second["trace"]] == [e["rule_id"] for e in first["trace"]]
+    assert all(e["decision_id"] == second["decision_id"] for e in second["trace"])
+    assert svc.get_planner_metrics()["plan_cache"]["hits"] == 1.0
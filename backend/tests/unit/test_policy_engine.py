@@ -1,6 +1,13 @@
 import pytest
-from app.services.policy_engine import build_ramp_plan
-from app.models.domain import ThermalTwinConfig, ThermalTwinState, RampPlan
+import numpy as np
+from app.services.policy_engine import (
+    arrhenius_aging,
+    arrhenius_aging_step,
+    build_ramp_plan,
+    simulate_candidates,
+    simulate_profile,
+)
+from app.models.domain import BatteryDegradationConfig, ThermalTwinConfig, ThermalTwinState, RampPlan, RampPlanColumns
 from app.models.domain import RuleStatus
 
 # ============================================================
@@ -108,3 +115,302 @@ def test_trace_generation(base_cfg, base_state):
     assert len(clamp_events) > 0
     assert clamp_events[0]["status"] == RuleStatus.INFO.value
     assert clamp_events[0]["decision_id"] == "test-id"
+
+@pytest.mark.parametrize("case", [
+    {"id": "export_clamped", "T": 40.0, "cool": 250.0, "site": 1000.0, "req": 500.0, "headroom": 100.0},
+    {"id": "import_near_limit", "T": 49.0, "cool": 100.0, "site": 1000.0, "req": -2000.0, "headroom": 5000.0},
+    {"id": "import_heavy_site", "T": 45.0, "cool": 800.0, "site": 20000.0, "req": -1500.0, "headroom": 5000.0},
+    {"id": "export_large", "T": 30.0, "cool": 250.0, "site": 5000.0, "req": 3000.0, "headroom": 5000.0},
+])
+def test_vector_engine_matches_scalar(case, base_cfg):
+    """Vector engine must agree with the scalar bisection (to search precision)."""
+    kwargs = dict(
+        P_site_kw=case["site"],
+        grid_headroom_kw=case["headroom"],
+        cfg=base_cfg,
+        state=ThermalTwinState(T_c=case["T"], P_cool_kw=case["cool"]),
+        deltaP_request_kw=case["req"],
+        horizon_s=30,
+        ramp_rate_kw_per_s=250.0,
+    )
+    approved_s, plan_s, _ = build_ramp_plan(engine="scalar", **kwargs)
+    approved_v, plan_v, _ = build_ramp_plan(engine="vector", **kwargs)
+
+    assert plan_v.blocked == plan_s.blocked
+    assert plan_v.reason == plan_s.reason
+    assert approved_v == pytest.approx(approved_s, abs=abs(case["req"]) * 1e-5 + 1e-6)
+    assert all(step.rack_temp_c < base_cfg.T_max - 0.5 for step in plan_v.steps)
+
+@pytest.mark.parametrize("T_c, P_cool_kw, site_kw, request_kw, ramp", [
+    (46.0, 250.0, 1950.0, -2000.0, 50.0),
+    (44.0, 150.0, 2600.0, -1200.0, 200.0),
+    (48.5, 300.0, 3000.0, -800.0, 25.0),
+    (49.6, 100.0, 1500.0, -500.0, 50.0),  # blocked outright
+])
+def test_newton_engine_matches_scalar_in_fewer_candidates(T_c, P_cool_kw, site_kw, request_kw, ramp, base_cfg):
+    """Thermally bound searches: Newton probes land on the scalar answer in a few candidates."""
+    kwargs = dict(
+        P_site_kw=site_kw,
+        grid_headroom_kw=5000.0,
+        cfg=base_cfg,
+        state=ThermalTwinState(T_c=T_c, P_cool_kw=P_cool_kw),
+        deltaP_request_kw=request_kw,
+        horizon_s=30,
+        ramp_rate_kw_per_s=ramp,
+    )
+    approved_s, plan_s, debug_s = build_ramp_plan(engine="scalar", **kwargs)
+    approved_n, plan_n, debug_n = build_ramp_plan(engine="newton", **kwargs)
+
+    assert plan_n.blocked == plan_s.blocked
+    assert plan_n.reason == plan_s.reason
+    assert approved_n == pytest.approx(approved_s, abs=abs(request_kw) * 2.0 ** -19)
+    assert abs(approved_n) < abs(request_kw)
+    assert debug_n["planner_candidates"] <= 6 < debug_s["planner_candidates"]
+    assert debug_n["planner_tangent_rollouts"] >= 1.0
+    assert np.all(plan_n.columns.rack_temp_c <= base_cfg.T_max - 0.5)
+
+
+def test_newton_tangent_passes_stop_at_the_candidate_peak(base_cfg):
+    """Long horizon: tangent passes end where each candidate peaks or fails, and are reported."""
+    kwargs = dict(P_site_kw=1500.0, grid_headroom_kw=5000.0, cfg=base_cfg, horizon_s=300, ramp_rate_kw_per_s=50.0)
+    hot = ThermalTwinState(T_c=49.6, P_cool_kw=100.0)
+    _, plan, debug = build_ramp_plan(engine="newton", state=hot, deltaP_request_kw=-500.0, **kwargs)
+    assert plan.blocked
+    assert 0.0 < debug["planner_tangent_rollouts"] <= debug["planner_tangent_steps"] < 300.0
+    assert debug["planner_tangent_steps"] <= debug["planner_sim_steps"]
+
+    _, _, scalar = build_ramp_plan(engine="scalar", state=hot, deltaP_request_kw=-500.0, **kwargs)
+    assert scalar["planner_tangent_rollouts"] == 0.0
+
+
+def test_peak_temp_sensitivity_reported(base_cfg):
+    kwargs = dict(
+        P_site_kw=1500.0,
+        grid_headroom_kw=5000.0,
+        cfg=base_cfg,
+        state=ThermalTwinState(T_c=40.0, P_cool_kw=250.0),
+        horizon_s=30,
+        ramp_rate_kw_per_s=50.0,
+    )
+    # Opt-in: the tangent pass is a per-step loop the default path skips.
+    assert "peak_temp_c_per_100kw" not in build_ramp_plan(deltaP_request_kw=-600.0, **kwargs)[2]
+    kwargs["sensitivity"] = True
+    _, _, heat = build_ramp_plan(deltaP_request_kw=-600.0, **kwargs)
+    _, _, cool = build_ramp_plan(deltaP_request_kw=600.0, **kwargs)
+    # Import adds IT load (hotter per extra kW), export sheds it.
+    assert heat["peak_temp_c_per_100kw"] > 0.0 > cool["peak_temp_c_per_100kw"]
+
+    # Matches a finite difference on the scaled plan.
+    approved, plan, debug = build_ramp_plan(deltaP_request_kw=-600.0, **kwargs)
+    profile = plan.columns.proposed_deltaP_kw
+    scaled = profile * (abs(approved) + 1.0) / abs(approved)
+    rollout = simulate_profile(1500.0, base_cfg, kwargs["state"], np.stack([profile, scaled]), 1.0, 50.0)
+    fd = 100.0 * (rollout.rack_temp_c[1].max() - rollout.rack_temp_c[0].max())
+    assert debug["peak_temp_c_per_100kw"] == pytest.approx(fd, rel=1e-3)
+
+    _, blocked, debug = build_ramp_plan(deltaP_request_kw=-500.0, **{**kwargs, "state": ThermalTwinState(T_c=49.6, P_cool_kw=100.0)})
+    assert blocked.blocked and debug["peak_temp_c_per_100kw"] == 0.0
+
+
+@pytest.mark.parametrize("engine", ["scalar", "vector"])
+def test_trace_levels(engine, base_cfg, base_state):
+    """final < summary < full, and every event keeps the DecisionTraceEvent shape."""
+    from app.models.domain import DecisionTraceEvent
+
+    counts = {}
+    for level in ("final", "summary", "full"):
+        trace = []
+        build_ramp_plan(
+            P_site_kw=1000.0,
+            grid_headroom_kw=5000.0,
+            cfg=base_cfg,
+            state=ThermalTwinState(T_c=49.0, P_cool_kw=100.0),
+            deltaP_request_kw=-2000.0,
+            horizon_s=10,
+            trace_sink=trace,
+            decision_id="lvl",
+            engine=engine,
+            trace_level=level,
+        )
+        for e in trace:
+            assert DecisionTraceEvent(**e).model_dump(mode="json") == e
+        candidates = [e for e in trace if e["phase"] == "candidate"]
+        counts[level] = len(candidates)
+        assert any(e["rule_id"] == "APPROVED_DELTA_SELECTED" for e in trace)
+
+    assert counts["final"] == 0
+    assert 0 < counts["summary"] < counts["full"]
+
+
+def test_unknown_trace_level_rejected(base_cfg, base_state):
+    with pytest.raises(ValueError):
+        build_ramp_plan(
+            P_site_kw=1000.0,
+            grid_headroom_kw=100.0,
+            cfg=base_cfg,
+            state=base_state,
+            deltaP_request_kw=50.0,
+            trace_level="verbose",
+        )
+
+@pytest.mark.parametrize("engine", ["scalar", "vector"])
+def test_warm_start_reuses_previous_bracket(engine, base_cfg):
+    """A good hint gives the same answer with fewer candidate simulations; a bad one still converges."""
+    kwargs = dict(
+        P_site_kw=1000.0,
+        grid_headroom_kw=5000.0,
+        cfg=base_cfg,
+        state=ThermalTwinState(T_c=49.0, P_cool_kw=100.0),
+        deltaP_request_kw=-2000.0,
+        horizon_s=30,
+        engine=engine,
+    )
+    cold_kw, cold_plan, cold = build_ramp_plan(**kwargs)
+    assert cold["planner_warm_start"] == 0.0
+    tol = 2000.0 * 1e-5
+
+    warm_kw, _, warm = build_ramp_plan(warm_start=(cold["search_low_kw"], cold["search_high_kw"]), **kwargs)
+    assert warm["planner_warm_start"] == 1.0
+    assert warm_kw == pytest.approx(cold_kw, abs=tol)
+    assert warm["planner_candidates"] < cold["planner_candidates"]
+
+    wrong_kw, wrong_plan, _ = build_ramp_plan(warm_start=(1900.0, 1950.0), **kwargs)
+    assert wrong_kw == pytest.approx(cold_kw, abs=tol)
+    assert wrong_plan.blocked == cold_plan.blocked
+
+
+@pytest.mark.parametrize("site_kw, request_kw", [(2600.0, -5000.0), (1000.0, -2000.0), (2800.0, -2000.0), (1500.0, 3000.0)])
+def test_adaptive_resolution_matches_fine(site_kw, request_kw):
+    """Fast-forwarding periodic tails and sharing the ramp prefix gives the same plan with fewer steps."""
+    kwargs = dict(
+        P_site_kw=site_kw,
+        grid_headroom_kw=1e9,
+        cfg=ThermalTwinConfig(),
+        state=ThermalTwinState(T_c=45.0, P_cool_kw=250.0),
+        deltaP_request_kw=request_kw,
+        horizon_s=300,
+    )
+    fine_kw, fine_plan, fine = build_ramp_plan(resolution="fine", **kwargs)
+    kw, plan, dbg = build_ramp_plan(resolution="adaptive", **kwargs)
+    assert kw == fine_kw
+    assert plan == fine_plan
+    assert dbg["planner_candidates"] == fine["planner_candidates"]
+    assert dbg["planner_sim_steps"] <= fine["planner_sim_steps"]
+
+
+def test_adaptive_rollout_is_bitwise_identical():
+    cfg, state = ThermalTwinConfig(), ThermalTwinState(T_c=45.0, P_cool_kw=250.0)
+    desired = -np.linspace(100.0, 5000.0, 24)
+    args = (2600.0, cfg, state, desired, 300, 1.0, 50.0)
+    fine = simulate_candidates(*args, resolution="fine")
+    fast = simulate_candidates(*args)
+    assert fast.steps_integrated < fine.steps_integrated == 300
+
+    # Trunk reuse: the deepest candidate's full-rate ramp is shared by the rest.
+    trunked = simulate_candidates(2600.0, cfg, state, desired[:-1], 300, 1.0, 50.0, trunk=(fast, desired.size - 1))
+    assert trunked.steps_integrated < simulate_candidates(2600.0, cfg, state, desired[:-1], 300, 1.0, 50.0).steps_integrated
+
+    for out, sel in ((fast, slice(None)), (trunked, slice(0, -1))):
+        np.testing.assert_array_equal(out.fail_step, fine.fail_step[sel])
+        np.testing.assert_array_equal(out.reason, fine.reason[sel])
+        np.testing.assert_array_equal(out.cap_loss, fine.cap_loss[sel])
+        ok = np.arange(300)[None, :] <= fine.fail_step[sel, None]
+        for name in ("delta_kw", "rack_temp_c", "cooling_kw", "thermal_headroom_kw", "dcap"):
+            np.testing.assert_array_equal(np.where(ok, getattr(out, name), 0.0), np.where(ok, getattr(fine, name)[sel], 0.0))
+
+
+def test_unknown_resolution_rejected(base_cfg, base_state):
+    with pytest.raises(ValueError):
+        build_ramp_plan(
+            P_site_kw=1000.0,
+            grid_headroom_kw=100.0,
+            cfg=base_cfg,
+            state=base_state,
+            deltaP_request_kw=50.0,
+            resolution="coarse",
+        )
+
+
+def test_arrhenius_trajectory_matches_steps():
+    """One trajectory call gives the same per-step wear and running total as step-by-step calls."""
+    cfg = BatteryDegradationConfig()
+    temps = np.array([[20.0, 40.0, 55.0, 70.0], [30.0, 30.0, 30.0, 30.0]])
+    throughput = np.array([[100.0, -5.0, 300.0, 300.0], [0.0, 10.0, 20.0, 30.0]])
+    dcap, cum = arrhenius_aging(cfg, temps, throughput, 1.0)
+
+    for r in range(temps.shape[0]):
+        total = 0.0
+        for c in range(temps.shape[1]):
+            step = arrhenius_aging_step(cfg, temps[r, c], throughput[r, c], 1.0)
+            total += step
+            assert dcap[r, c] == step
+            assert cum[r, c] == total
+    assert dcap[0, 1] == 0.0  # negative throughput does not heal
+    assert dcap[0, 2] == dcap[0, 3]  # clamped at max_temp_for_aging_c
+
+
+@pytest.mark.parametrize("engine", ["scalar", "vector"])
+def test_plan_columns_serialize_and_adapt(engine, base_cfg, base_state):
+    """Plans hold struct-of-arrays steps, dump to JSON columns and still expose `steps`."""
+    _, plan, _ = build_ramp_plan(
+        P_site_kw=1000.0,
+        grid_headroom_kw=5000.0,
+        cfg=base_cfg,
+        state=base_state,
+        deltaP_request_kw=500.0,
+        horizon_s=30,
+        engine=engine,
+    )
+    cols = plan.columns
+    assert len(cols) == 30
+    np.testing.assert_array_equal(cols.t_offset_s, np.arange(30))
+
+    dump = plan.model_dump()
+    assert "steps" not in dump
+    assert set(dump["columns"]) == {
+        "t_offset_s", "proposed_deltaP_kw", "rack_temp_c", "cooling_kw", "thermal_ok", "thermal_headroom_kw", "reason",
+    }
+    assert dump["columns"]["reason"] == ["OK"] * 30
+    assert RampPlan(**dump) == plan
+
+    steps = plan.steps
+    assert [s.rack_temp_c for s in steps] == dump["columns"]["rack_temp_c"]
+    legacy = {k: v for k, v in dump.items() if k != "columns"}
+    assert RampPlan(**legacy, steps=steps) == plan
+
+
+def test_plan_columns_failing_step():
+    cols = RampPlanColumns.from_rows([(0, -50.0, 45.0, 250.0, 10.0, 0), (1, -100.0, 49.6, 260.0, -5.0, 1)])
+    assert cols.thermal_ok.tolist() == [True, False]
+    steps = cols.to_steps()
+    assert steps[1].reason == "THERMAL_MARGIN_TOO_THIN" and not steps[1].thermal_ok
+    assert RampPlanColumns.from_steps(steps) == cols
+    assert len(RampPlanColumns.empty()) == 0
+
+
+@pytest.mark.parametrize("engine", ["scalar", "newton", "vector"])
+def test_expired_deadline_returns_proven_candidate(engine, base_cfg):
+    """Past the deadline the search stops early but never returns an unverified plan."""
+    import time
+
+    kwargs = dict(
+        P_site_kw=1950.0,
+        grid_headroom_kw=5000.0,
+        cfg=base_cfg,
+        state=ThermalTwinState(T_c=46.0, P_cool_kw=250.0),
+        deltaP_request_kw=-2000.0,
+        horizon_s=30,
+        engine=engine,
+    )
+    full_kw, _, full = build_ramp_plan(**kwargs)
+    assert full["planner_partial"] == 0.0
+
+    cut_kw, cut_plan, cut = build_ramp_plan(deadline=time.perf_counter(), **kwargs)
+    assert cut["planner_partial"] == 1.0
+    assert cut["planner_candidates"] < full["planner_candidates"]
+    assert cut["search_bracket_kw"] > full["search_bracket_kw"]
+    assert full_kw <= cut_kw <= 0.0
+    if cut_plan.blocked:
+        assert cut_plan.reason == "PLANNER_DEADLINE_EXCEEDED"
+    else:
+        assert np.all(cut_plan.columns.rack_temp_c < base_cfg.T_max - 0.5)
@@ -0,0 +1,118 @@
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from app.models.domain import ThermalTwinConfig, ThermalTwinState
+from app.services.digital_twin import DigitalTwinService
+from app.services.plan_cache import config_hash
+from app.services.policy_engine import build_ramp_plan
+from app.services.surrogate import (
+    SURROGATE_SHAVE,
+    PlannerSurrogate,
+    generate_training_set,
+    fit_surrogate,
+    surrogate_features,
+    train_surrogate,
+)
+
+# Hot, heavily loaded site: imports are thermally bound well below the cap.
+SITE_KW = 2800.0
+HOT = ThermalTwinState(T_c=45.0, P_cool_kw=250.0)
+
+
+@pytest.fixture(scope="module")
+def model():
+    return train_surrogate(ThermalTwinConfig(), states=24, seed=0)
+
+
+def _constant(model: PlannerSurrogate, kw: float) -> PlannerSurrogate:
+    coef = np.zeros_like(model.coef)
+    coef[0] = kw  # the intercept monomial
+    box = np.full_like(model.lower, np.inf)
+    return replace(model, coef=coef, lower=-box, upper=box)
+
+
+def test_fit_recovers_a_cubic_and_skips_unbound_cells():
+    rng = np.random.default_rng(0)
+    X = surrogate_features(
+        rng.uniform(18.0, 50.0, 400),
+        rng.uniform(50.0, 2000.0, 400),
+        rng.uniform(200.0, 5000.0, 400),
+        rng.choice([-1.0, 1.0], 400),
+        rng.uniform(10.0, 500.0, 400),
+        rng.choice([10, 30, 60, 120], 400),
+    )
+    best = 900.0 + 40.0 * X[:, 0] - 0.2 * X[:, 1] + 1e-4 * X[:, 2] * X[:, 0] + 30.0 * X[:, 3] * X[:, 4] ** 2
+    reach = np.where(np.arange(400) % 4 == 0, best, best + 1e4)  # every 4th cell: whole reach feasible
+    fit = fit_surrogate(X, best, reach, "h")
+    assert fit.samples == 300
+    assert fit.rmse_kw < 1e-6
+    np.testing.assert_allclose(fit.predict_kw(X), np.maximum(best, 0.0), atol=1e-6)
+
+    with pytest.raises(ValueError):
+        fit_surrogate(X, reach, reach, "h")
+
+
+def test_trained_surrogate_round_trips(model, tmp_path):
+    cfg = ThermalTwinConfig()
+    X, best, reach = generate_training_set(cfg, states=24, seed=0)
+    bound = best < reach * (1.0 - 1e-6)
+    assert model.samples == int(bound.sum())
+    assert model.rmse_kw < best[bound].std()
+
+    path = tmp_path / "surrogate.npz"
+    model.save(str(path))
+    again = PlannerSurrogate.load(str(path))
+    np.testing.assert_array_equal(again.predict_kw(X), model.predict_kw(X))
+    assert (again.cfg_hash, again.dt_s, again.samples) == (model.cfg_hash, model.dt_s, model.samples)
+
+    # Outside the training box, for another dt or another physics config: no hint.
+    assert np.isnan(model.predict_kw(surrogate_features(45.0, 250.0, SITE_KW, -1.0, 900.0, 30))[0])
+    h = config_hash(cfg)
+    assert model.hint_kw(HOT, SITE_KW, -2000.0, 900.0, 30, 1, h) is None
+    assert model.hint_kw(HOT, SITE_KW, -2000.0, 50.0, 30, 2, h) is None
+    assert model.hint_kw(HOT, SITE_KW, -2000.0, 50.0, 30, 1, "other") is None
+
+
+def test_decide_verifies_surrogate_hint_and_falls_back(model):
+    cfg = ThermalTwinConfig()
+    full_kw, _, _ = build_ramp_plan(
+        P_site_kw=SITE_KW, grid_headroom_kw=5000.0, cfg=cfg, state=HOT, deltaP_request_kw=-2000.0
+    )
+    assert -2000.0 < full_kw < 0.0
+
+    svc = DigitalTwinService()
+    svc._persist_decisions = lambda rows: None
+    svc.plan_cache = None
+
+    def decide(surrogate, ramp=50.0):
+        svc.surrogate = surrogate
+        svc.therm_state = HOT.model_copy()
+        return svc.decide(
+            deltaP_request_kw=-2000.0, P_site_kw=SITE_KW, grid_headroom_kw=5000.0, ramp_rate_kw_per_s=ramp
+        )
+
+    # Hit: the shaved prediction verifies with one batched rollout (hint + cap), no search.
+    hint_kw = 0.5 * abs(full_kw)
+    out = decide(_constant(model, hint_kw / (1.0 - SURROGATE_SHAVE)))
+    pred = out["prediction_debug"]
+    assert pred["planner_surrogate"] == 1.0 and pred["planner_frontier"] == 0.0
+    assert pred["planner_candidates"] == 2.0
+    assert out["approved_deltaP_kw"] == pytest.approx(-hint_kw)
+    assert np.all(np.asarray(out["plan"]["columns"]["rack_temp_c"]) < cfg.T_max - 0.5)
+
+    # Fallback: an over-optimistic prediction fails verification; the full search answers.
+    out = decide(_constant(model, 1e5))
+    assert out["prediction_debug"]["planner_surrogate"] == 0.0
+    assert out["approved_deltaP_kw"] == pytest.approx(full_kw, rel=1e-4)
+
+    # Skipped: ramp rate outside the training box.
+    decide(model, ramp=900.0)
+
+    metrics = svc.get_planner_metrics()["surrogate"]
+    assert (metrics["hits"], metrics["fallbacks"], metrics["skipped"]) == (1.0, 1.0, 1.0)
+    assert metrics["hit_rate"] == metrics["fallback_rate"] == pytest.approx(1.0 / 3.0)
+
+    svc.surrogate = None
+    assert svc.get_planner_metrics()["surrogate"] is None
@@ -0,0 +1,98 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.services.digital_twin import DigitalTwinService
+from app.services.telemetry_buffer import TELEMETRY_FIELDS, TelemetryRing
+
+T0 = datetime(2026, 3, 1, 12, 0, 0, 123457)
+
+
+def _point(k: int, scenario_id=None):
+    point = {name: float(k) + 0.1 * i for i, name in enumerate(TELEMETRY_FIELDS)}
+    point["t_sim_s"] = None if scenario_id is None else float(k)
+    point["ts"] = (T0 + timedelta(seconds=k)).isoformat()
+    point["scenario_id"] = scenario_id
+    return point
+
+
+def test_ring_round_trips_wraps_and_slices_windows():
+    ring = TelemetryRing(capacity=100)
+    pts = [_point(k, "heat_wave" if 40 <= k < 60 else None) for k in range(250)]
+    for p in pts[:60]:
+        ring.append(p)
+    assert ring.window(T0 - timedelta(seconds=1), T0 + timedelta(seconds=59)) == pts[:60]
+
+    for p in pts[60:]:
+        ring.append(p)
+    assert len(ring) == 100 and ring.head == 50
+    assert ring.last_ts() == T0 + timedelta(seconds=249)
+    # The window straddles the wrap point; the bounds are (start, end].
+    assert ring.window(T0 + timedelta(seconds=160), T0 + timedelta(seconds=230)) == pts[161:231]
+    assert ring.window(T0, T0 + timedelta(seconds=149)) == []  # overwritten
+
+    strided = ring.window(T0, T0 + timedelta(seconds=300), max_points=7)
+    assert len(strided) <= 7 and strided[-1] == pts[-1]
+    assert [p["ts"] for p in strided] == sorted(p["ts"] for p in strided)
+
+
+def test_timeseries_serves_recorded_ticks():
+    svc = DigitalTwinService()
+    svc.set_demo_mode(False, deterministic=True, seed=5)
+    svc.telemetry = TelemetryRing(capacity=50)
+    assert len(svc.get_timeseries(window_s=60)) == 60  # nothing recorded yet: synthetic window
+
+    latest = []
+    for _ in range(80):
+        asyncio.run(svc.tick(dt_s=1.0))
+        latest.append(svc.get_latest_telemetry())
+    points = svc.get_timeseries(window_s=3600)
+    assert points == latest[-50:]
+    assert points[-1] == svc.get_latest_telemetry()
+    assert np.all(np.diff([p["rack_temp_c"] for p in points]) != 0.0)
+
+    assert svc.get_timeseries(window_s=3600, max_points=10)[-1] == latest[-1]
+    replay_end = datetime.fromisoformat(latest[-20]["ts"])
+    replay = svc.get_timeseries(window_s=60, end_ts=replay_end.isoformat(), mode="replay")
+    assert replay == latest[-50:-19]
+
+
+def test_rollups_match_brute_force_aggregates():
+    ring = TelemetryRing(capacity=10, tiers=((1, 50), (10, 50), (60, 50)))
+    rng = np.random.default_rng(0)
+    start = datetime(2026, 3, 1, 12, 0, 0)  # on a minute boundary
+    pts = []
+    for k in range(600):
+        p = _point(k, "heat_wave" if 330 <= k < 420 else None)
+        p["ts"] = (start + timedelta(seconds=k, microseconds=500_000)).isoformat()
+        p["rack_temp_c"] = float(rng.normal(30.0, 1.0))
+        ring.append(p)
+        pts.append(p)
+    end = start + timedelta(seconds=600)
+    temps = np.array([p["rack_temp_c"] for p in pts])
+
+    # 10 min at 10 points: the 1 min tier, one bucket per point.
+    series = {stat: ring.rollup(end - timedelta(seconds=600), end, 10, stat=stat) for stat in ("mean", "min", "max", "last")}
+    per_min = temps.reshape(10, 60)
+    assert [p["bucket_s"] for p in series["mean"]] == [60.0] * 10
+    np.testing.assert_allclose([p["rack_temp_c"] for p in series["mean"]], per_min.mean(axis=1))
+    np.testing.assert_array_equal([p["rack_temp_c"] for p in series["min"]], per_min.min(axis=1))
+    np.testing.assert_array_equal([p["rack_temp_c"] for p in series["max"]], per_min.max(axis=1))
+    assert series["last"] == [dict(pts[60 * i + 59], bucket_s=60.0) for i in range(10)]
+    # t_sim_s is missing outside the scenario: min/max skip it, the mean does not.
+    assert series["max"][5]["t_sim_s"] == 359.0 and series["mean"][5]["t_sim_s"] is None
+
+    # 10 min at 25 points: the 10 s tier (60 buckets, 50 kept) merged 2 by 2, newest group whole.
+    merged = ring.rollup(end - timedelta(seconds=600), end, 25, stat="max")
+    assert len(merged) == 25 and {p["bucket_s"] for p in merged} == {20.0}
+    np.testing.assert_array_equal([p["rack_temp_c"] for p in merged], temps[100:].reshape(25, 20).max(axis=1))
+    assert merged[-1]["ts"] == pts[-1]["ts"]
+
+    # Short windows fall to the finest tier.
+    fine = ring.rollup(end - timedelta(seconds=30), end, 100, stat="last")
+    assert [p["ts"] for p in fine] == [p["ts"] for p in pts[-30:]]
+
+    with pytest.raises(ValueError):
+        ring.rollup(start, end, 10, stat="median")
@@ -0,0 +1,97 @@
+import time
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from app.models.domain import ThermalTwinConfig
+from app.services.physics_engine import ThermalTwinBatch
+from app.services.thermal_network import ThermalNetwork, build_row_network
+
+
+def _passive_batch(T_c, C_mass):
+    # No ambient loss, no cooling, constant mass: only the coupling moves heat.
+    return ThermalTwinBatch(
+        ThermalTwinConfig(),
+        T_c,
+        0.0,
+        C_mass=C_mass,
+        K_transfer=0.0,
+        Cooling_Min_KW=0.0,
+        Cooling_Max_KW=0.0,
+        use_dynamic_coolant_mass=False,
+        T_min=-100.0,
+    )
+
+
+def test_uncoupled_network_matches_batch():
+    cfg = ThermalTwinConfig()
+    T0 = np.array([28.0, 35.0, 41.0])
+    net = ThermalNetwork(ThermalTwinBatch(cfg, T0, 200.0), ["rack"] * 3, [], [], [])
+    batch = ThermalTwinBatch(cfg, T0, 200.0)
+    load = np.array([300.0, 800.0, 1200.0])
+    for _ in range(20):
+        pred = net.step(load, 1.0)
+        expected = batch.step(load, 1.0)
+        np.testing.assert_array_equal(pred["rack_temp_c_next"], expected["rack_temp_c_next"])
+        assert not pred["q_exchange_kw"].any()
+
+
+def test_coupling_conserves_heat_and_equalizes():
+    C = np.array([100.0, 300.0, 200.0, 150.0])
+    net = ThermalNetwork(_passive_batch([20.0, 40.0, 30.0, 50.0], C), ["rack", "aisle", "aisle", "crac"],
+                         [0, 1, 2], [1, 2, 3], [5.0, 10.0, 2.0])
+    energy0 = float(C @ net.T_c)
+    for _ in range(2000):
+        net.step(0.0, 1.0)
+    assert float(C @ net.T_c) == pytest.approx(energy0, rel=1e-12)
+    np.testing.assert_allclose(net.T_c, energy0 / C.sum(), atol=1e-6)
+
+
+def test_bincount_fallback_matches_sparse():
+    pytest.importorskip("scipy")
+    net = build_row_network(ThermalTwinConfig(), rows=3, racks_per_row=12, racks_per_crac=4)
+    with patch("app.services.thermal_network.csr_matrix", None):
+        dense_free = build_row_network(ThermalTwinConfig(), rows=3, racks_per_row=12, racks_per_crac=4)
+    T = np.linspace(20.0, 45.0, len(net))
+    np.testing.assert_allclose(dense_free.exchange_kw(T), net.exchange_kw(T), atol=1e-12)
+
+
+def test_hottest_zone_margin_query():
+    net = build_row_network(ThermalTwinConfig(), rows=4, racks_per_row=20)
+    load = np.where(net.kinds == "rack", 20.0, 0.0)
+    load[7] = 60.0  # one hot rack
+    T_before = net.T_c.copy()
+
+    zone, step, margin = net.margin_over_horizon(load, 1.0, 60)
+    np.testing.assert_array_equal(net.T_c, T_before)  # the query does not advance the network
+    assert zone == 7 and 0 <= step < 60
+
+    for _ in range(step + 1):
+        net.step(load, 1.0)
+    assert net.hottest_zone() == (7, pytest.approx(margin))
+
+
+def test_unstable_dt_rejected():
+    net = ThermalNetwork(_passive_batch([20.0, 40.0], 10.0), ["rack", "rack"], [0], [1], [8.0])
+    assert net.max_stable_dt_s() == pytest.approx(10.0 / 8.0)
+    with pytest.raises(ValueError):
+        net.step(0.0, 2.0)
+    with pytest.raises(ValueError):
+        ThermalNetwork(_passive_batch([20.0, 40.0], 10.0), ["rack", "rack"], [0], [0], [1.0])
+
+
+def test_network_tick_thousands_of_zones():
+    """Benchmark: one tick over ~10k zones stays in the millisecond range."""
+    net = build_row_network(ThermalTwinConfig(), rows=100, racks_per_row=90)
+    assert len(net) > 9000
+    load = np.where(net.kinds == "rack", 15.0, 0.0)
+    net.step(load, 1.0)
+
+    ticks = 20
+    start = time.perf_counter()
+    for _ in range(ticks):
+        net.step(load, 1.0)
+    per_tick_ms = (time.perf_counter() - start) / ticks * 1000.0
+    assert np.isfinite(net.T_c).all()
+    assert per_tick_ms < 50.0
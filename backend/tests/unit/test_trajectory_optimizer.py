@@ -0,0 +1,76 @@
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from app.models.domain import ThermalTwinConfig, ThermalTwinState
+from app.services.policy_engine import build_ramp_plan, simulate_candidates, simulate_profile
+from app.services.trajectory_optimizer import thermal_sensitivity
+
+SITE_KW = 2800.0
+
+
+@pytest.fixture
+def cfg():
+    return ThermalTwinConfig()
+
+
+@pytest.fixture
+def state():
+    return ThermalTwinState(T_c=45.0, P_cool_kw=250.0)
+
+
+def test_profile_rollout_matches_constant_ramp(cfg, state):
+    desired = np.array([-400.0, -1500.0, 600.0])
+    ramps = simulate_candidates(SITE_KW, cfg, state, desired, 30, 1.0, 50.0, resolution="fine")
+    profiles = np.sign(desired)[:, None] * np.minimum(50.0 * np.arange(1, 31), np.abs(desired)[:, None])
+    out = simulate_profile(SITE_KW, cfg, state, profiles, 1.0, 50.0)
+
+    np.testing.assert_array_equal(out.fail_step, ramps.fail_step)
+    np.testing.assert_array_equal(out.reason, ramps.reason)
+    np.testing.assert_allclose(out.cap_loss, ramps.cap_loss, rtol=1e-12)
+    ok = np.arange(30)[None, :] <= ramps.fail_step[:, None]
+    np.testing.assert_allclose(np.where(ok, out.rack_temp_c, 0.0), np.where(ok, ramps.rack_temp_c, 0.0), rtol=1e-12)
+
+
+def test_sensitivity_matches_finite_differences(cfg, state):
+    profile = np.minimum(50.0 * np.arange(1, 31), 800.0)
+    temps, G = thermal_sensitivity(SITE_KW, cfg, state, profile, 1.0)
+    base = simulate_profile(SITE_KW, cfg, state, profile, 1.0, 50.0)
+    assert base.feasible[0]
+    np.testing.assert_allclose(temps, base.rack_temp_c[0], rtol=1e-12)
+    assert np.allclose(np.triu(G, 1), 0.0)
+
+    h = 1e-3
+    bumped = np.repeat(profile[None, :], profile.size, axis=0) + h * np.eye(profile.size)
+    fd = (simulate_profile(SITE_KW, cfg, state, bumped, 1.0, 50.0).rack_temp_c - temps[None, :]) / h
+    np.testing.assert_allclose(G, fd.T, atol=1e-6)
+
+
+def test_trajectory_engine_beats_constant_ramp(cfg, state):
+    pytest.importorskip("scipy")
+    kwargs = dict(P_site_kw=SITE_KW, grid_headroom_kw=1e9, cfg=cfg, state=state, deltaP_request_kw=-2000.0, horizon_s=30)
+    _, ramp_plan, ramp = build_ramp_plan(**kwargs)
+    kw, plan, dbg = build_ramp_plan(engine="trajectory", **kwargs)
+
+    assert dbg["planner_trajectory"] == 1.0
+    assert 1.0 <= dbg["planner_lp_solves"] <= 3.0
+    assert dbg["planner_energy_kwh"] > ramp["planner_energy_kwh"]
+    assert not plan.blocked and len(plan.columns) == 30
+
+    profile = plan.columns.proposed_deltaP_kw
+    assert kw == pytest.approx(profile.min())
+    assert np.all(profile <= 0.0) and np.all(profile >= -2000.0)
+    assert np.all(np.abs(np.diff(profile, prepend=0.0)) <= 50.0 + 1e-6)
+    assert np.all(plan.columns.rack_temp_c < cfg.T_max - 0.5)
+    assert plan.columns.thermal_ok.all()
+
+
+def test_trajectory_engine_falls_back_without_scipy(cfg, state):
+    kwargs = dict(P_site_kw=SITE_KW, grid_headroom_kw=1e9, cfg=cfg, state=state, deltaP_request_kw=-2000.0, horizon_s=30)
+    with patch("app.services.trajectory_optimizer.linprog", None):
+        kw, plan, dbg = build_ramp_plan(engine="trajectory", **kwargs)
+    vector_kw, vector_plan, _ = build_ramp_plan(**kwargs)
+    assert dbg["planner_trajectory"] == 0.0
+    assert kw == vector_kw
+    assert plan == vector_plan